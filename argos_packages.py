@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线优先的Argos翻译包管理
+以前每次启动都先调用 argostranslate.package.update_package_index()，没有网络时要等到超时或直接失败。
+现在启动时按以下顺序检查中英翻译包，全部只做本地I/O：
+1. 本地清单（已安装语言对及其目录），目录仍存在即视为已安装
+2. argos已安装的翻译包（检查后更新清单）
+3. 本地 .argosmodel 文件目录（ARGOS_PACKAGE_DIR），找到缺少的语言对就直接安装
+仍然缺少时，由调用方显式地在后台线程中更新包索引并下载（start_download）。
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+
+PAIRS = (("zh", "en"), ("en", "zh"))  # 需要的 (源语言, 目标语言)
+MANIFEST_PATH = os.path.join(os.path.expanduser("~"), ".realtime_translator", "argos_manifest.json")
+DEFAULT_PACKAGE_DIR = os.environ.get("ARGOS_PACKAGE_DIR")  # 存放 .argosmodel 文件的本地目录
+
+
+def _key(pair):
+    return f"{pair[0]}-{pair[1]}"
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """读取本地清单，不存在或损坏时返回空清单"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest if isinstance(manifest.get("pairs"), dict) else {"pairs": {}}
+    except (OSError, ValueError):
+        return {"pairs": {}}
+
+
+def _manifest_missing(manifest, pairs):
+    missing = []
+    for pair in pairs:
+        entry = manifest["pairs"].get(_key(pair))
+        if entry is None or not os.path.isdir(entry.get("path", "")):
+            missing.append(pair)
+    return missing
+
+
+def record_installed(path=MANIFEST_PATH):
+    """按argos已安装的翻译包重写本地清单并返回"""
+    import argostranslate.package
+
+    pairs = {}
+    for package in argostranslate.package.get_installed_packages():
+        pairs[_key((package.from_code, package.to_code))] = {
+            "path": str(package.package_path),
+            "version": getattr(package, "package_version", None),
+        }
+    manifest = {"pairs": pairs, "updated": time.time()}
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"翻译包清单写入失败: {e}")
+    return manifest
+
+
+def package_pair(path):
+    """.argosmodel 文件的 (源语言, 目标语言)：优先读包内的 metadata.json，其次解析文件名"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if name.count("/") <= 1 and name.endswith("metadata.json"):
+                    metadata = json.loads(archive.read(name))
+                    return metadata["from_code"], metadata["to_code"]
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        pass
+    match = re.match(r"translate-([a-z]+)_([a-z]+)", os.path.basename(path))
+    return (match.group(1), match.group(2)) if match else None
+
+
+def install_from_directory(directory, pairs=PAIRS):
+    """从本地目录安装缺少语言对的 .argosmodel 文件，返回安装的语言对"""
+    import argostranslate.package
+
+    installed = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".argosmodel"):
+            continue
+        path = os.path.join(directory, name)
+        pair = package_pair(path)
+        if pair in pairs and pair not in installed:
+            print(f"从本地安装翻译包 {name}")
+            argostranslate.package.install_from_path(path)
+            installed.append(pair)
+    return installed
+
+
+def ensure_local_packages(pairs=PAIRS, package_dir=DEFAULT_PACKAGE_DIR, manifest_path=MANIFEST_PATH):
+    """只用本地资源准备翻译包，不访问网络，返回仍然缺少的语言对"""
+    missing = _manifest_missing(load_manifest(manifest_path), pairs)
+    if not missing:
+        return []
+    manifest = record_installed(manifest_path)
+    missing = _manifest_missing(manifest, pairs)
+    if missing and package_dir and os.path.isdir(package_dir):
+        if install_from_directory(package_dir, missing):
+            missing = _manifest_missing(record_installed(manifest_path), pairs)
+    return missing
+
+
+def download_packages(pairs=PAIRS, manifest_path=MANIFEST_PATH):
+    """更新包索引并下载缺少的语言对（需要网络），返回仍然缺少的语言对"""
+    import argostranslate.package
+
+    missing = ensure_local_packages(pairs, None, manifest_path)
+    if not missing:
+        return []
+    argostranslate.package.update_package_index()
+    for package in argostranslate.package.get_available_packages():
+        if (package.from_code, package.to_code) in missing:
+            print(f"正在下载翻译包 {package.from_code}->{package.to_code}...")
+            argostranslate.package.install_from_path(package.download())
+    return _manifest_missing(record_installed(manifest_path), pairs)
+
+
+def start_download(on_done, pairs=PAIRS, manifest_path=MANIFEST_PATH):
+    """在后台线程中下载缺少的语言对，完成后在该线程中调用 on_done(仍缺少的语言对, 异常或None)"""
+    def worker():
+        try:
+            missing, error = download_packages(pairs, manifest_path), None
+        except Exception as e:
+            missing, error = list(pairs), e
+        on_done(missing, error)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    return thread
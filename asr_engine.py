@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音识别引擎
+三个前端通过统一的 ASREngine 接口转录，不直接依赖具体的识别库：
+- WhisperEngine: openai-whisper，支持按真实长度编码、增量梅尔谱和CPU int8量化
+- FasterWhisperEngine: 基于CTranslate2的faster-whisper，CPU上int8计算，可配置线程数，
+  同样大小的模型在CPU上通常快数倍
+"""
+
+import gc
+import time
+import numpy as np
+import torch
+from whisper.audio import SAMPLE_RATE
+import whisper_decode
+from audio_sources import SyntheticSource
+from speculative_decoding import DRAFT_TOKENS, DraftModel
+from streaming import StreamingTranscriber
+
+ASR_BACKENDS = ("whisper", "faster-whisper")
+LANGUAGE_DETECT_SECONDS = 20
+
+
+class ASREngine:
+    """语音识别引擎接口
+
+    transcribe 返回与 whisper.transcribe 相同结构的字典：{"text", "segments", "language"}，
+    segments 中每段至少包含 start、end、text。
+    """
+
+    name = "ASR"
+    n_mels = None  # 可以直接使用预先计算的梅尔谱时为梅尔通道数，否则为None
+
+    def transcribe(self, audio, language=None, initial_prompt=None, mel=None, **options):
+        """转录一段16kHz单声道float32音频
+
+        language: 为None时自动识别，识别结果在返回值的 "language" 中
+        mel: 该段音频预先计算好的梅尔谱（见 IncrementalLogMel），引擎不支持时忽略
+        options: whisper风格的解码参数（temperature、beam_size 等），
+            language_candidates 限制自动识别时可选的语言，例如 ("en", "zh")
+        """
+        raise NotImplementedError
+
+    def detect_language(self, audio):
+        """返回 (语言代码, 各语言概率字典)"""
+        raise NotImplementedError
+
+    def warmup(self, seconds=2.0, language="en"):
+        """用一小段合成音频解码一次，提前完成内存分配和算子初始化，避免第一段真实音频变慢
+
+        返回预热耗时（秒）
+        """
+        source = SyntheticSource(SAMPLE_RATE, speed=0, duration=seconds)
+        with source.recorder(SAMPLE_RATE, channels=1) as recorder:
+            audio = recorder.record(int(seconds * SAMPLE_RATE))[:, 0]
+        start = time.perf_counter()
+        self.transcribe(audio, language=language, temperature=0.0)
+        return time.perf_counter() - start
+
+    def stream(self, segmenter, language, step=0.5, normalize=None, context=None, **options):
+        """创建绑定到本引擎的流式转录会话（StreamingTranscriber）
+
+        normalize: 每次转录前把音频峰值标准化到该值，None表示不处理
+        context: RollingPrompt，提供时用滚动上下文代替 options 中固定的 initial_prompt
+        options: 传给每次 transcribe 调用的解码参数（不含language，语言跟随会话）
+        """
+        streamer = StreamingTranscriber(segmenter, None, language, step=step, context=context)
+        self.attach(streamer, normalize, **options)
+        return streamer
+
+    def attach(self, streamer, normalize=None, **options):
+        """让流式会话改用本引擎转录（例如切换模型时），会话中语句和已提交文本的状态保持不变"""
+        def transcribe_fn(audio):
+            if normalize:
+                peak = np.max(np.abs(audio))
+                if peak > 0:
+                    audio = audio * (normalize / peak)
+            call_options = options
+            if streamer.context is not None:
+                call_options = dict(options, initial_prompt=streamer.context.text())
+            result = self.transcribe(audio, language=streamer.language, **call_options)
+            return dict(result, text=result["text"].strip())
+
+        streamer.transcribe_fn = transcribe_fn
+
+    def close(self):
+        """释放模型占用的内存（显存），之后不能再使用本引擎"""
+        self.model = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+class WhisperEngine(ASREngine):
+    """openai-whisper 引擎
+
+    draft_model: 投机解码的草稿模型大小（例如 "tiny"），贪心解码时由它猜token、本模型验证，输出不变；
+        只用于按真实长度编码的路径（trim_encoder=True）
+    """
+
+    def __init__(self, model_size="small", device="cpu", int8=False, trim_encoder=True,
+                 draft_model=None, draft_tokens=DRAFT_TOKENS):
+        self.model_size = model_size
+        self.device = device
+        self.int8 = int8 and device == "cpu"
+        self.trim_encoder = trim_encoder
+        self.model = whisper_decode.load_model(model_size, device=device, int8=int8)
+        self.name = f"whisper {model_size}" + (" int8" if self.int8 else "")
+        self.draft = None
+        if draft_model and draft_model != model_size:
+            draft = DraftModel(whisper_decode.load_model(draft_model, device=device, int8=int8), draft_tokens)
+            if draft.compatible(self.model):
+                self.draft = draft
+                self.name += f" (草稿 {draft_model})"
+            else:
+                print(f"{draft_model} 与 {model_size} 的词表或梅尔通道数不同，不能作为草稿模型，已关闭投机解码")
+
+    @property
+    def n_mels(self):
+        return self.model.dims.n_mels if self.trim_encoder else None
+
+    def transcribe(self, audio, language=None, initial_prompt=None, mel=None, **options):
+        return whisper_decode.transcribe(self.model, audio, trim_encoder=self.trim_encoder, mel=mel,
+                                         language=language, initial_prompt=initial_prompt, draft=self.draft,
+                                         **options)
+
+    def detect_language(self, audio):
+        # 语言检测只需要开头一段音频
+        mel = whisper_decode.log_mel(self.model, audio[:LANGUAGE_DETECT_SECONDS * SAMPLE_RATE])
+        if self.device == "cuda":
+            mel = mel.half()
+        return whisper_decode.detect_language(self.model, whisper_decode.encode(self.model, mel))
+
+    def close(self):
+        self.draft = None
+        super().close()
+
+
+class FasterWhisperEngine(ASREngine):
+    """faster-whisper（CTranslate2）引擎
+
+    intra_threads: 每次推理使用的CPU线程数（0为自动）
+    inter_threads: 可以并行执行的推理数
+    """
+
+    # whisper风格参数名 -> faster-whisper参数名，不在表中的参数原样传递
+    _OPTION_NAMES = {"logprob_threshold": "log_prob_threshold"}
+    _UNSUPPORTED_OPTIONS = ("fp16", "verbose", "decode_budget")  # 不支持解码时间预算，只能限制回退次数
+
+    def __init__(self, model_size="small", device="cpu", compute_type=None, intra_threads=0, inter_threads=1):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError("使用faster-whisper引擎需要先安装: pip install faster-whisper")
+
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type or ("float16" if device == "cuda" else "int8")
+        self.model = WhisperModel(model_size, device=device, compute_type=self.compute_type,
+                                  cpu_threads=intra_threads, num_workers=inter_threads)
+        self.name = f"faster-whisper {model_size} {self.compute_type}"
+
+    def _options(self, options):
+        options = dict(options)
+        max_fallbacks = options.pop("max_fallbacks", None)
+        if max_fallbacks is not None:
+            temperatures = options.get("temperature", whisper_decode.DEFAULT_TEMPERATURES)
+            options["temperature"] = whisper_decode.limit_temperatures(temperatures, max_fallbacks)
+        converted = {}
+        for key, value in options.items():
+            if key in self._UNSUPPORTED_OPTIONS:
+                continue
+            if key == "suppress_tokens" and isinstance(value, str):
+                value = [int(token) for token in value.split(",") if token.strip()]
+            converted[self._OPTION_NAMES.get(key, key)] = value
+        return converted
+
+    def transcribe(self, audio, language=None, initial_prompt=None, mel=None, **options):
+        options = self._options(options)
+        candidates = options.pop("language_candidates", None)
+        segments, info = self.model.transcribe(audio, language=language, initial_prompt=initial_prompt, **options)
+        if language is None and candidates and info.language not in candidates:
+            # 分段是惰性解码的，此时还没有解码：改用候选语言中概率最高的重新开始
+            probs = dict(info.all_language_probs or [])
+            language = max(candidates, key=lambda code: probs.get(code, 0.0))
+            segments, info = self.model.transcribe(audio, language=language, initial_prompt=initial_prompt,
+                                                   **options)
+        result_segments = []
+        for segment in segments:
+            item = {"start": segment.start, "end": segment.end, "text": segment.text,
+                    "avg_logprob": segment.avg_logprob, "no_speech_prob": segment.no_speech_prob,
+                    "compression_ratio": segment.compression_ratio, "temperature": segment.temperature}
+            if segment.words:
+                item["words"] = [{"start": w.start, "end": w.end, "word": w.word} for w in segment.words]
+            result_segments.append(item)
+        text = "".join(segment["text"] for segment in result_segments)
+        return {"text": text, "segments": result_segments, "language": info.language}
+
+    def detect_language(self, audio):
+        _, info = self.model.transcribe(audio, language=None)
+        probs = dict(info.all_language_probs or [(info.language, info.language_probability)])
+        return info.language, probs
+
+
+def create_engine(backend="whisper", model_size="small", device="cpu", int8=False, trim_encoder=True,
+                  intra_threads=0, inter_threads=1, draft_model=None):
+    """按名称创建识别引擎
+
+    backend: "whisper" 或 "faster-whisper"
+    int8: CPU上whisper引擎做动态量化，faster-whisper使用int8计算类型（否则为float32）
+    intra_threads/inter_threads: 仅faster-whisper使用
+    draft_model: 投机解码的草稿模型大小，仅whisper引擎使用
+    """
+    if backend == "whisper":
+        return WhisperEngine(model_size, device=device, int8=int8, trim_encoder=trim_encoder,
+                             draft_model=draft_model)
+    if backend == "faster-whisper":
+        if draft_model:
+            print("faster-whisper引擎不支持投机解码，忽略草稿模型")
+        compute_type = None if device == "cuda" or int8 else "float32"
+        return FasterWhisperEngine(model_size, device=device, compute_type=compute_type,
+                                   intra_threads=intra_threads, inter_threads=inter_threads)
+    raise ValueError(f"未知的识别引擎: {backend}，可选: {', '.join(ASR_BACKENDS)}")
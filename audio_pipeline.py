@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频翻译流水线
+采集、转录、翻译三个阶段分别运行在独立线程中，通过有界队列衔接，
+模型推理耗时再长也不会阻塞音频采集
+"""
+
+import threading
+import queue
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from collections import deque
+import numpy as np
+from audio_sources import AudioSourceExhausted
+from stage_queue import BoundedQueue, merge_audio, merge_text
+
+
+class AudioPipeline:
+    """三阶段音频翻译流水线
+
+    - 采集线程: 持续调用 recorder.record() 读取固定长度的小块音频
+    - 转录线程: 从音频队列取出音频块交给 process_audio，返回待翻译文本（或文本列表）
+    - 翻译线程: 从文本队列取出文本交给 translate_fn（或提交给 submit_fn），结果按原顺序通过 on_result 回调输出
+    """
+
+    def __init__(self, open_recorder, block_frames, process_audio, translate_fn,
+                 on_result, on_error=None, on_finished=None, audio_queue_size=8, text_queue_size=16,
+                 audio_policy="merge", text_policy="block", max_merged_blocks=4, submit_fn=None, max_in_flight=2,
+                 drain_timeout=3.0):
+        """
+        open_recorder: 返回录音上下文管理器的函数，例如 lambda: device.recorder(...)
+        block_frames: 每次采集的帧数
+        process_audio(audio) -> str|list|None: 处理一块音频，返回需要翻译的文本或文本列表
+        translate_fn(text) -> str: 翻译文本
+        on_result(source_text, target_text): 翻译完成回调
+        on_error(message): 采集出错回调
+        on_finished(): 回放音频源播放完毕回调，此后转录和翻译线程继续处理剩余数据
+        audio_policy: 音频队列满时的策略，默认把相邻音频块合并（一次转录处理更多音频），
+            合并超过 max_merged_blocks 块后丢弃最旧的音频，积压最多约
+            audio_queue_size * max_merged_blocks 块，过载时仍能贴近实时
+        text_policy: 文本队列满时的策略，默认阻塞转录线程，压力最终传回音频队列
+        submit_fn(text) -> Future: 提交给翻译服务（例如 TranslationService）而不是在翻译线程中调用 translate_fn，
+            最多 max_in_flight 个请求同时进行，结果仍按提交顺序输出
+        drain_timeout: 停止时最多等待已提交的翻译请求完成的时长（秒），完成的译文仍通过 on_result 输出
+        """
+        self.open_recorder = open_recorder
+        self.block_frames = int(block_frames)
+        self.process_audio = process_audio
+        self.translate_fn = translate_fn
+        self.submit_fn = submit_fn
+        self.max_in_flight = max_in_flight
+        self.drain_timeout = drain_timeout
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_finished = on_finished
+
+        self.audio_queue = BoundedQueue(audio_queue_size, audio_policy, merge_fn=merge_audio,
+                                        max_item_size=self.block_frames * max_merged_blocks, name="audio")
+        self.text_queue = BoundedQueue(text_queue_size, text_policy, merge_fn=merge_text, name="text")
+
+        self._running = threading.Event()
+        self._threads = []
+
+    @property
+    def is_running(self):
+        return self._running.is_set()
+
+    @property
+    def alive(self):
+        """是否还有工作线程没有退出（停止后仍在完成当前的转录或翻译）"""
+        return any(thread.is_alive() for thread in self._threads)
+
+    @property
+    def dropped_audio_blocks(self):
+        return self.audio_queue.dropped
+
+    def stats(self):
+        """各阶段队列的丢弃、合并和阻塞计数"""
+        return [self.audio_queue.stats(), self.text_queue.stats()]
+
+    def start(self):
+        """启动三个工作线程"""
+        self._running.set()
+        self._threads = [
+            threading.Thread(target=self._capture_worker, name="audio-capture", daemon=True),
+            threading.Thread(target=self._transcribe_worker, name="audio-transcribe", daemon=True),
+            threading.Thread(target=self._translate_worker, name="audio-translate", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        """停止流水线，timeout不为None时依次等待采集、转录、翻译线程退出
+
+        翻译线程退出前最多等待 drain_timeout 秒，把已提交的翻译请求的结果输出完。
+        返回所有线程是否都已退出；没有退出时不能复用转录状态（分段器、流式会话等）
+        """
+        self._running.clear()
+        if timeout is not None:
+            for thread in self._threads:
+                if thread is not threading.current_thread():
+                    extra = self.drain_timeout if thread.name == "audio-translate" else 0
+                    thread.join(timeout + extra)
+        for stats in self.stats():
+            if stats["dropped"] or stats["merged"] or stats["blocked_seconds"] > 1:
+                print(f"队列 {stats['name']} ({stats['policy']}): 放入 {stats['put']}，丢弃 {stats['dropped']}，"
+                      f"合并 {stats['merged']}，阻塞 {stats['blocked_seconds']:.1f}秒")
+        return not self.alive
+
+    def _capture_worker(self):
+        """采集线程：只负责录音，永不等待推理"""
+        try:
+            with self.open_recorder() as recorder:
+                while self._running.is_set():
+                    data = recorder.record(numframes=self.block_frames)
+                    audio_np = data.flatten().astype(np.float32)
+                    self._put_audio(audio_np)
+        except AudioSourceExhausted:
+            print("音频源已播放完毕")
+            if self.on_finished:
+                self.on_finished()
+        except Exception as e:
+            print(f"音频录制错误: {e}")
+            if self.on_error:
+                self.on_error(f"音频录制失败: {str(e)}")
+            self._running.clear()
+
+    def _put_audio(self, audio_np):
+        """放入音频队列，队列已满时按 audio_policy 合并或丢弃，block 策略下等待空位"""
+        dropped, merged = self.audio_queue.dropped, self.audio_queue.merged
+        while self._running.is_set():
+            try:
+                self.audio_queue.put(audio_np, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        if self.audio_queue.dropped > dropped:
+            print(f"警告: 转录跟不上采集，已丢弃 {self.audio_queue.dropped} 个音频块")
+        elif self.audio_queue.merged > merged and self.audio_queue.merged % 10 == 1:
+            print(f"提示: 转录积压，已合并 {self.audio_queue.merged} 次相邻音频块")
+
+    def _transcribe_worker(self):
+        """转录线程"""
+        while self._running.is_set():
+            try:
+                audio_np = self.audio_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                source_texts = self.process_audio(audio_np)
+            except Exception as e:
+                print(f"转录错误: {e}")
+                continue
+
+            if not source_texts:
+                continue
+            if isinstance(source_texts, str):
+                source_texts = [source_texts]
+
+            for source_text in source_texts:
+                self._put_text(source_text)
+
+    def _put_text(self, source_text):
+        """放入文本队列，队列已满时阻塞转录线程，采集线程不受影响"""
+        while self._running.is_set():
+            try:
+                self.text_queue.put(source_text, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _translate_worker(self):
+        """翻译线程"""
+        if self.submit_fn is not None:
+            self._submit_worker()
+            return
+        while self._running.is_set():
+            try:
+                source_text = self.text_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                target_text = self.translate_fn(source_text)
+                self.on_result(source_text, target_text)
+            except Exception as e:
+                print(f"翻译错误: {e}")
+
+    def _submit_worker(self):
+        """翻译线程（翻译服务模式）：提交请求后不等待，已完成的结果按提交顺序输出"""
+        in_flight = deque()  # (原文, Future)
+        while self._running.is_set():
+            while in_flight and in_flight[0][1].done():
+                source_text, future = in_flight.popleft()
+                try:
+                    self.on_result(source_text, future.result())
+                except Exception as e:
+                    print(f"翻译错误: {e}")
+
+            if len(in_flight) >= self.max_in_flight:
+                # 最早的请求完成前不再提交新请求
+                try:
+                    in_flight[0][1].exception(timeout=0.1)
+                except Exception:
+                    pass
+                continue
+
+            try:
+                source_text = self.text_queue.get(timeout=0.05 if in_flight else 0.1)
+            except queue.Empty:
+                continue
+            try:
+                in_flight.append((source_text, self.submit_fn(source_text)))
+            except Exception as e:
+                print(f"翻译错误: {e}")
+        self._drain(in_flight)
+
+    def _drain(self, in_flight):
+        """停止后按顺序输出仍在进行的翻译请求，超过 drain_timeout 时放弃剩余的请求"""
+        deadline = time.monotonic() + self.drain_timeout
+        while in_flight:
+            source_text, future = in_flight[0]
+            try:
+                target_text = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                print(f"停止时仍有 {len(in_flight)} 句没有翻译完，已丢弃")
+                for _, future in in_flight:
+                    future.cancel()
+                return
+            except Exception as e:
+                print(f"翻译错误: {e}")
+            else:
+                try:
+                    self.on_result(source_text, target_text)
+                except Exception as e:
+                    print(f"翻译错误: {e}")
+            in_flight.popleft()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频源
+统一声卡采集、WAV/NumPy回放和合成信号三种输入，接口与soundcard的麦克风对象一致：
+source.name 和 source.recorder(samplerate, channels) -> 带 record(numframes) 的上下文管理器。
+回放和合成音频源不依赖声卡，可以在无音频硬件的Linux服务器上运行和测速。
+"""
+
+import time
+import wave
+import numpy as np
+
+
+class AudioSourceExhausted(EOFError):
+    """回放音频已经读完"""
+
+
+class AudioSource:
+    """音频源接口"""
+
+    name = "音频源"
+
+    def recorder(self, samplerate, channels=1):
+        """返回录音上下文管理器，进入后可调用 record(numframes)"""
+        raise NotImplementedError
+
+
+class SoundcardSource(AudioSource):
+    """soundcard麦克风/回环设备"""
+
+    def __init__(self, device, label=None):
+        self.device = device
+        self.name = label or device.name
+        self.is_loopback = bool(getattr(device, 'isloopback', False))
+
+    def recorder(self, samplerate, channels=1):
+        return self.device.recorder(samplerate=samplerate, channels=channels)
+
+
+def list_soundcard_sources(include_loopback=True):
+    """列出所有声卡输入设备"""
+    import soundcard as sc
+    return [SoundcardSource(mic) for mic in sc.all_microphones(include_loopback=include_loopback)]
+
+
+def get_soundcard_source(name, include_loopback=False):
+    """按名称获取声卡输入设备"""
+    import soundcard as sc
+    return SoundcardSource(sc.get_microphone(name, include_loopback=include_loopback))
+
+
+def default_loopback_source():
+    """默认扬声器的回环设备（系统音频）"""
+    import soundcard as sc
+    return get_soundcard_source(sc.default_speaker().name, include_loopback=True)
+
+
+def resample(audio, from_rate, to_rate):
+    """线性插值重采样"""
+    if from_rate == to_rate or len(audio) == 0:
+        return audio.astype(np.float32, copy=False)
+    duration = len(audio) / from_rate
+    target_len = int(round(duration * to_rate))
+    positions = np.arange(target_len) * (from_rate / to_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def load_wav(path):
+    """读取PCM WAV文件，返回 (单声道float32音频, 采样率)"""
+    with wave.open(str(path), 'rb') as wav:
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        frames = wav.readframes(wav.getnframes())
+
+    if sample_width == 1:
+        audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif sample_width == 2:
+        audio = np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8)
+                | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        audio = ints.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        audio = np.frombuffer(frames, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"不支持的WAV采样位宽: {sample_width * 8} bit")
+
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio.astype(np.float32), sample_rate
+
+
+class _PacedRecorder:
+    """按指定倍速输出音频的录音器
+
+    speed=1.0 与真实声卡一样按实时速度阻塞；speed=4.0 为4倍速；
+    speed=0 或 None 表示不等待，尽可能快地输出（用于吞吐量测试）。
+    """
+
+    def __init__(self, read_fn, samplerate, channels, speed):
+        self.read_fn = read_fn
+        self.samplerate = samplerate
+        self.channels = channels
+        self.speed = speed
+        self.frames_emitted = 0
+        self._start_time = None
+
+    def __enter__(self):
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def record(self, numframes):
+        audio = self.read_fn(int(numframes))
+        if audio is None or len(audio) == 0:
+            raise AudioSourceExhausted("音频源已播放完毕")
+
+        self.frames_emitted += len(audio)
+        if self.speed:
+            due = self._start_time + self.frames_emitted / self.samplerate / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        return np.repeat(audio[:, None], self.channels, axis=1)
+
+
+class ReplaySource(AudioSource):
+    """回放内存中的音频或WAV文件"""
+
+    def __init__(self, audio, sample_rate=16000, speed=1.0, loop=False, name=None):
+        self.audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.loop = loop
+        self.name = name or f"NumPy回放 ({len(self.audio) / sample_rate:.1f}秒)"
+
+    @classmethod
+    def from_wav(cls, path, speed=1.0, loop=False):
+        audio, sample_rate = load_wav(path)
+        return cls(audio, sample_rate, speed=speed, loop=loop, name=f"WAV回放: {path}")
+
+    @property
+    def duration(self):
+        return len(self.audio) / self.sample_rate
+
+    def recorder(self, samplerate, channels=1):
+        audio = resample(self.audio, self.sample_rate, samplerate)
+        position = 0
+
+        def read(numframes):
+            nonlocal position
+            if len(audio) == 0:
+                return None
+            if self.loop:
+                indices = (np.arange(position, position + numframes)) % len(audio)
+                position = (position + numframes) % len(audio)
+                return audio[indices]
+            chunk = audio[position:position + numframes]
+            position += len(chunk)
+            return chunk
+
+        return _PacedRecorder(read, samplerate, channels, self.speed)
+
+
+class SyntheticSource(AudioSource):
+    """确定性合成信号：类语音的调幅谐波脉冲与带噪静音交替出现
+
+    相同参数和相同的读取序列总是产生完全相同的音频，便于在不同版本之间对比吞吐量。
+    duration为None时无限输出。
+    """
+
+    def __init__(self, sample_rate=16000, speed=1.0, duration=None, burst=2.0,
+                 pause=1.0, noise_level=0.003, seed=0, name=None):
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self.duration = duration
+        self.burst = burst
+        self.pause = pause
+        self.noise_level = noise_level
+        self.seed = seed
+        self.name = name or "合成测试信号"
+
+    def _generate(self, start, numframes, samplerate, rng):
+        t = (start + np.arange(numframes)) / samplerate
+        period = self.burst + self.pause
+        burst_index = np.floor(t / period).astype(np.int64)
+        in_burst = (t - burst_index * period) < self.burst
+
+        # 每个脉冲的基频由 seed 和脉冲序号决定，100~250Hz
+        f0 = 100.0 + 150.0 * ((burst_index * 2654435761 + self.seed) % 1000) / 1000.0
+        envelope = 0.5 * (1.0 + np.sin(2 * np.pi * 4.0 * t))  # 约4Hz的音节起伏
+        voice = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 5))
+        signal = np.where(in_burst, 0.2 * envelope * voice, 0.0)
+        signal += self.noise_level * rng.standard_normal(numframes)
+        return signal.astype(np.float32)
+
+    def recorder(self, samplerate, channels=1):
+        rng = np.random.default_rng(self.seed)
+        total = None if self.duration is None else int(self.duration * samplerate)
+        position = 0
+
+        def read(numframes):
+            nonlocal position
+            if total is not None:
+                numframes = min(numframes, total - position)
+                if numframes <= 0:
+                    return None
+            chunk = self._generate(position, numframes, samplerate, rng)
+            position += numframes
+            return chunk
+
+        return _PacedRecorder(read, samplerate, channels, self.speed)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分句批量翻译
+平衡模式把文本分句后逐句调用 argostranslate.translate.translate，每句都要重新查找模型、
+分词并单独运行一次前向。这里直接使用argos翻译包底层的CTranslate2翻译器：
+所有句子一起分词，一次 translate_batch 调用翻译（按 max_batch_size 分批），按原顺序返回译文。
+argos版本不兼容（找不到分词器或翻译器）时退回逐句翻译。
+"""
+
+import threading
+
+from translator_registry import direction_codes
+
+TRANSLATION_BATCH_SIZE = 16  # 每批最多的句子数
+BEAM_SIZE = 4  # 与 argostranslate.translate.translate 的默认束宽相同
+
+
+class _PackageTranslator:
+    """一个翻译方向的argos翻译包：CTranslate2翻译器、分词器和目标语言前缀"""
+
+    def __init__(self, translation):
+        import ctranslate2
+        from argostranslate import settings
+
+        translation = getattr(translation, "underlying", translation)  # 去掉argos的 CachedTranslation 包装
+        pkg = translation.pkg
+        if getattr(translation, "translator", None) is None:
+            # 与argos共用同一个翻译器实例，模型只加载一次
+            translation.translator = ctranslate2.Translator(
+                str(pkg.package_path / "model"), device=getattr(settings, "device", "cpu"))
+        self.translator = translation.translator
+        self.target_prefix = getattr(pkg, "target_prefix", "") or ""
+
+        tokenizer = getattr(pkg, "tokenizer", None)
+        if tokenizer is not None:
+            self.encode, self.decode = tokenizer.encode, tokenizer.decode
+        else:
+            # 旧版argos没有 pkg.tokenizer，直接使用翻译包里的sentencepiece模型
+            import sentencepiece
+            processor = sentencepiece.SentencePieceProcessor(model_file=str(pkg.package_path / "sentencepiece.model"))
+            self.encode = lambda text: processor.encode(text, out_type=str)
+            self.decode = lambda tokens: "".join(tokens).replace("▁", " ").strip()
+
+    def translate(self, sentences, max_batch_size):
+        tokenized = [self.encode(sentence) for sentence in sentences]
+        target_prefix = [[self.target_prefix]] * len(tokenized) if self.target_prefix else None
+        results = self.translator.translate_batch(
+            tokenized, target_prefix=target_prefix, max_batch_size=max_batch_size,
+            beam_size=BEAM_SIZE, num_hypotheses=1, replace_unknowns=True, length_penalty=0.2)
+        translations = []
+        for result in results:
+            tokens = result.hypotheses[0]
+            if self.target_prefix and tokens and tokens[0] == self.target_prefix:
+                tokens = tokens[1:]
+            translations.append(self.decode(tokens))
+        return translations
+
+
+class BatchTranslator:
+    """把多句话放在一次CTranslate2调用中翻译，可被多个线程共用
+
+    翻译包来自已加载的 TranslatorRegistry，每个方向只解析一次分词器和翻译器
+    """
+
+    def __init__(self, registry, max_batch_size=TRANSLATION_BATCH_SIZE):
+        self.registry = registry
+        self.max_batch_size = max_batch_size
+        self._translators = {}  # (源语言, 目标语言) -> _PackageTranslator，None表示只能逐句翻译
+        self._lock = threading.Lock()
+        self.batch_calls = 0  # translate_batch 调用次数
+        self.sentences = 0  # 批量翻译的句子数
+
+    def _translator(self, direction):
+        key = direction_codes(direction)
+        translation = self.registry.translation(direction)  # 未加载时抛出 KeyError
+        with self._lock:
+            if key not in self._translators:
+                try:
+                    self._translators[key] = _PackageTranslator(translation)
+                except Exception as e:
+                    print(f"批量翻译不可用（{key[0]}->{key[1]}），改为逐句翻译: {e}")
+                    self._translators[key] = None
+            return self._translators[key]
+
+    def translate(self, sentences, direction):
+        """按顺序返回每句话的译文"""
+        sentences = [sentence.strip() for sentence in sentences]
+        if not sentences:
+            return []
+        translator = self._translator(direction)
+        if translator is None:
+            return [self.registry.translate(sentence, direction) for sentence in sentences]
+        translations = translator.translate(sentences, self.max_batch_size)
+        self.batch_calls += 1
+        self.sentences += len(sentences)
+        return translations
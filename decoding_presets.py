@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解码预设
+whisper.transcribe 默认在低置信度片段上按6个温度依次重新解码，最坏情况下一块音频要解码6次，
+实时翻译的延迟无法预期。这里按 fast/balanced/accurate 质量模式给出解码参数：
+限制回退次数，并为每块音频设置解码时间预算，超出预算时直接使用当前结果。
+三个前端共用这些预设。
+"""
+
+from collections import namedtuple
+
+from whisper_decode import DEFAULT_TEMPERATURES
+
+# temperatures: 温度序列；max_fallbacks: 最多回退次数；budget: 每块音频的解码时间预算（秒）；
+# beam_size/best_of 为None表示贪心解码/单次采样
+DecodingPreset = namedtuple("DecodingPreset", ["temperatures", "max_fallbacks", "budget", "beam_size", "best_of"])
+
+DECODING_PRESETS = {
+    "fast": DecodingPreset((0.0,), 0, 1.0, None, None),
+    "balanced": DecodingPreset((0.0, 0.4, 0.8), 1, 2.0, None, 3),
+    "accurate": DecodingPreset(DEFAULT_TEMPERATURES, 3, 4.0, 5, 5),
+}
+QUALITY_MODES = tuple(DECODING_PRESETS)
+
+
+def preset_options(quality="balanced"):
+    """质量模式对应的 transcribe 解码参数
+
+    quality 可以带说明文字，例如界面上的 "balanced (平衡)"
+    """
+    name = quality.split()[0] if quality else "balanced"
+    if name not in DECODING_PRESETS:
+        raise ValueError(f"未知的质量模式: {quality}，可选: {', '.join(QUALITY_MODES)}")
+    preset = DECODING_PRESETS[name]
+    options = {"temperature": preset.temperatures, "max_fallbacks": preset.max_fallbacks,
+               "decode_budget": preset.budget}
+    if preset.beam_size:
+        options["beam_size"] = preset.beam_size
+    if preset.best_of:
+        options["best_of"] = preset.best_of
+    return options
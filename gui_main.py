@@ -1,14 +1,29 @@
-import soundcard as sc
 import numpy as np
-import whisper
 import translators as ts
 import torch
 import tkinter as tk
-from tkinter import ttk, scrolledtext
+from tkinter import ttk, scrolledtext, filedialog
 import threading
 import queue
+from audio_sources import (AudioSourceExhausted, ReplaySource, SyntheticSource,
+                           default_loopback_source, get_soundcard_source, list_soundcard_sources)
+from ring_buffer import AudioRingBuffer
+from stage_queue import BoundedQueue
+from vad import UtteranceSegmenter
+from stitching import TranscriptStitcher, SegmentCommitter
+from prompt_context import RollingPrompt
+from decoding_presets import preset_options
+from language_router import AUTO_MODE, LanguageRouter, source_language
+from whisper_decode import IncrementalLogMel
+from asr_engine import create_engine
 import time
 
+# 源语言 -> (固定的initial_prompt, 最短文本长度, 翻译源语言, 翻译目标语言)
+SOURCE_SETTINGS = {
+    'en': ("This is a conversation in English.", 3, 'en', 'zh-CN'),
+    'zh': ("这是一段中文对话。", 1, 'zh-CN', 'en'),
+}
+
 class RealtimeTranslationGUI:
     def __init__(self, root):
         self.root = root
@@ -22,14 +37,35 @@ class RealtimeTranslationGUI:
         self.MODEL_SIZE = "small"  # 使用更准确的模型
         self.FORCE_CPU = False  # 启用GPU模式，提升性能
         self.MIN_AUDIO_LENGTH = 1.0  # 最小音频长度（秒）
-        self.TRANSLATION_MODE = "en_to_zh"  # "en_to_zh" (英文转中文) 或 "zh_to_en" (中文转英文)
+        self.TRANSLATION_MODE = "en_to_zh"  # "en_to_zh" (英文转中文)、"zh_to_en" (中文转英文) 或 "auto" (每句识别中英文)
+        self.SEGMENTATION_MODE = "vad"  # "vad" (按语音停顿切分) 或 "fixed" (固定INTERVAL/OVERLAP窗口)
+        self.VAD_BLOCK = 0.5  # seconds - VAD模式下每次录制的时长
+        self.VAD_MAX_UTTERANCE = 15  # seconds - 单句最长时长，超过后强制切分
+        self.VAD_HANGOVER = 0.5  # seconds - 连续静音超过该时长视为一句话结束
+        self.CARRY_TAIL = True  # 固定窗口模式下只提交远离窗口末尾的分段，未完成的句子留到下一窗口；False时使用OVERLAP重叠去重
+        self.COMMIT_GUARD = 1.0  # seconds - 结束时间距窗口末尾不足该值的分段留到下一窗口
+        self.ROLLING_PROMPT = True  # 用最近提交的转录文本作为下一次转录的提示
+        self.PROMPT_MAX_TOKENS = 48  # 滚动提示最多保留的token数
+        self.TRIM_ENCODER = True  # 编码器只处理真实音频长度而不是补零到30秒
+        self.CPU_INT8 = True  # CPU推理时对线性层做动态int8量化
+        self.ASR_BACKEND = "whisper"  # "whisper" 或 "faster-whisper" (CTranslate2)
+        self.ASR_THREADS = 0  # faster-whisper每次推理使用的CPU线程数，0为自动
+        self.QUALITY_MODE = "balanced"  # 解码预设: "fast"、"balanced" 或 "accurate"
+        self.DRAFT_MODEL = None  # 投机解码的草稿模型（例如 "tiny"），None关闭
         
         # State variables
         self.is_running = False
-        self.model = None
+        self.engine = None  # 语音识别引擎
         self.audio_device = None
-        self.translation_queue = queue.Queue()
-        self.audio_buffer = np.array([], dtype=np.float32)  # 音频缓冲区
+        self.replay_files = []  # 用户添加的WAV回放文件
+        self.translation_queue = BoundedQueue(256, "drop_oldest", name="translation")  # 界面卡顿时丢弃最旧的结果
+        self.audio_buffer = AudioRingBuffer(self.SAMPLE_RATE * self.window_history(), self.SAMPLE_RATE)  # 音频环形缓冲区
+        self.stitcher = self.create_stitcher()  # 重叠窗口去重或未完成句子的延后提交
+        self.context = None  # 滚动转录提示，每次开始翻译时重新创建
+        self.language_router = None  # auto模式下按说话轮次识别语言、选择翻译方向
+        self.mel_features = None  # 重叠窗口的增量梅尔谱，模型加载后按其梅尔通道数创建
+        self.segmenter = UtteranceSegmenter(self.SAMPLE_RATE, max_utterance=self.VAD_MAX_UTTERANCE,
+                                            hangover=self.VAD_HANGOVER)  # 语音端点检测
         
         self.setup_ui()
         self.initialize_model()
@@ -62,7 +98,7 @@ class RealtimeTranslationGUI:
         ttk.Label(mode_frame, text="翻译模式:").grid(row=0, column=0, padx=(0, 10))
         self.mode_var = tk.StringVar(value="en_to_zh")
         mode_combo = ttk.Combobox(mode_frame, textvariable=self.mode_var, state="readonly", width=20)
-        mode_combo['values'] = ("en_to_zh (英文转中文)", "zh_to_en (中文转英文)")
+        mode_combo['values'] = ("en_to_zh (英文转中文)", "zh_to_en (中文转英文)", "auto (自动识别中英文)")
         mode_combo.grid(row=0, column=1, sticky=(tk.W, tk.E))
         mode_combo.bind('<<ComboboxSelected>>', self.on_mode_change)
         
@@ -79,6 +115,10 @@ class RealtimeTranslationGUI:
         refresh_button = ttk.Button(device_frame, text="刷新设备", command=self.refresh_devices)
         refresh_button.grid(row=0, column=2, padx=(10, 0))
         
+        # Open WAV file for replay
+        open_wav_button = ttk.Button(device_frame, text="打开WAV", command=self.add_replay_file)
+        open_wav_button.grid(row=0, column=3, padx=(10, 0))
+        
         # Translation display
         display_frame = ttk.Frame(main_frame)
         display_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
@@ -112,7 +152,11 @@ class RealtimeTranslationGUI:
     def on_mode_change(self, event=None):
         """处理翻译模式切换"""
         mode_value = self.mode_var.get()
-        if "en_to_zh" in mode_value:
+        if AUTO_MODE in mode_value:
+            self.TRANSLATION_MODE = AUTO_MODE
+            self.source_label.config(text="原文（自动识别）:")
+            self.target_label.config(text="翻译:")
+        elif "en_to_zh" in mode_value:
             self.TRANSLATION_MODE = "en_to_zh"
             self.source_label.config(text="英文原文:")
             self.target_label.config(text="中文翻译:")
@@ -148,7 +192,13 @@ class RealtimeTranslationGUI:
                     device = "cpu"
                     device_info = "CPU (未检测到CUDA)"
                 
-                self.model = whisper.load_model(self.MODEL_SIZE, device=device)
+                engine = create_engine(self.ASR_BACKEND, self.MODEL_SIZE, device, int8=self.CPU_INT8,
+                                       trim_encoder=self.TRIM_ENCODER, intra_threads=self.ASR_THREADS,
+                                       draft_model=self.DRAFT_MODEL)
+                self.status_label.config(text="状态: 正在预热模型...")
+                engine.warmup(language=source_language(self.TRANSLATION_MODE) or 'en')
+                self.engine = engine
+                device_info += f", {engine.name}"
                 self.status_label.config(text=f"状态: 模型加载完成 ({device_info})")
             except Exception as e:
                 self.status_label.config(text=f"状态: 模型加载失败 - {str(e)}")
@@ -157,14 +207,14 @@ class RealtimeTranslationGUI:
         
     def refresh_devices(self):
         """Refresh audio device list"""
+        device_names = []
         try:
             # Get loopback microphones (for system audio)
-            loopback_mics = sc.all_microphones(include_loopback=True)
-            device_names = []
+            loopback_mics = list_soundcard_sources(include_loopback=True)
             
             # Try to get default speaker loopback
             try:
-                default_speaker = sc.get_microphone(sc.default_speaker().name, include_loopback=True)
+                default_speaker = default_loopback_source()
                 device_names.append(f"默认扬声器: {default_speaker.name}")
             except:
                 pass
@@ -175,32 +225,51 @@ class RealtimeTranslationGUI:
                     device_names.append(f"回环设备: {mic.name}")
             
             # Add regular microphones as fallback
-            regular_mics = sc.all_microphones(include_loopback=False)
+            regular_mics = list_soundcard_sources(include_loopback=False)
             for mic in regular_mics:
                 device_names.append(f"麦克风: {mic.name}")
-            
-            self.device_combo['values'] = device_names
-            if device_names:
-                self.device_combo.current(0)
                 
         except Exception as e:
             self.status_label.config(text=f"状态: 设备刷新失败 - {str(e)}")
+        
+        # Sources that work without sound hardware
+        for path in self.replay_files:
+            device_names.append(f"WAV回放: {path}")
+        device_names.append("合成信号: 合成测试信号")
+        
+        self.device_combo['values'] = device_names
+        if device_names:
+            self.device_combo.current(0)
+    
+    def add_replay_file(self):
+        """Add a WAV file as a replay source and select it"""
+        path = filedialog.askopenfilename(filetypes=[("WAV文件", "*.wav"), ("所有文件", "*.*")])
+        if not path:
+            return
+        if path not in self.replay_files:
+            self.replay_files.append(path)
+        self.refresh_devices()
+        self.device_var.set(f"WAV回放: {path}")
     
     def get_selected_device(self):
-        """Get the selected audio device"""
+        """Get the selected audio source"""
         selected = self.device_var.get()
         if not selected:
             return None
             
         try:
             if selected.startswith("默认扬声器:"):
-                return sc.get_microphone(sc.default_speaker().name, include_loopback=True)
+                return default_loopback_source()
             elif selected.startswith("回环设备:"):
                 device_name = selected.replace("回环设备: ", "")
-                return sc.get_microphone(device_name, include_loopback=True)
+                return get_soundcard_source(device_name, include_loopback=True)
             elif selected.startswith("麦克风:"):
                 device_name = selected.replace("麦克风: ", "")
-                return sc.get_microphone(device_name, include_loopback=False)
+                return get_soundcard_source(device_name, include_loopback=False)
+            elif selected.startswith("WAV回放:"):
+                return ReplaySource.from_wav(selected.replace("WAV回放: ", ""))
+            elif selected.startswith("合成信号:"):
+                return SyntheticSource(self.SAMPLE_RATE)
         except Exception as e:
             print(f"Error getting device: {e}")
             return None
@@ -214,7 +283,7 @@ class RealtimeTranslationGUI:
     
     def start_translation(self):
         """Start real-time translation"""
-        if not self.model:
+        if not self.engine:
             self.status_label.config(text="状态: 请等待模型加载完成")
             return
             
@@ -248,104 +317,68 @@ class RealtimeTranslationGUI:
         """Worker thread for audio processing and translation"""
         try:
             # 重置音频缓冲区
-            self.audio_buffer = np.array([], dtype=np.float32)
+            self.audio_buffer.clear()
+            self.segmenter.reset()
+            self.stitcher = self.create_stitcher()
+            self.mel_features = (IncrementalLogMel(self.engine.n_mels, history=self.window_history())
+                                 if self.engine.n_mels else None)
+            self.context = RollingPrompt(max_tokens=self.PROMPT_MAX_TOKENS) if self.ROLLING_PROMPT else None
+            self.language_router = LanguageRouter() if self.TRANSLATION_MODE == AUTO_MODE else None
             
             with self.audio_device.recorder(samplerate=self.SAMPLE_RATE, channels=1) as recorder:
                 while self.is_running:
                     try:
+                        if self.SEGMENTATION_MODE == "vad":
+                            # 短块录制并送入VAD，说话人停顿时立即转录这一句
+                            data = recorder.record(numframes=int(self.SAMPLE_RATE * self.VAD_BLOCK))
+                            for utterance in self.segmenter.feed(data.astype(np.float32).reshape(-1)):
+                                self.transcribe_utterance(utterance)
+                            continue
+                        
                         # Record audio
-                        data = recorder.record(numframes=self.SAMPLE_RATE * self.INTERVAL)
+                        data = recorder.record(numframes=self.stitcher.samples_needed(
+                            self.SAMPLE_RATE * self.INTERVAL, self.SAMPLE_RATE))
                         
                         # 检查音频数据质量
                         if len(data) == 0 or np.max(np.abs(data)) < 0.001:
+                            if self.context is not None:
+                                self.context.reset("静音")  # 跳过的静音不计入样本时钟，直接清空上下文
+                            if self.language_router is not None:
+                                self.language_router.end_turn()
                             continue  # 跳过静音或无效数据
                         
                         # Convert to float32 numpy array
-                        current_audio = data.astype(np.float32).flatten()
+                        current_audio = data.astype(np.float32).reshape(-1)
                         
-                        # 音频预处理：音量标准化
+                        # 音频预处理：音量标准化（原地缩放，避免额外分配）
                         max_val = np.max(np.abs(current_audio))
                         if max_val > 0:
-                            current_audio = current_audio / max_val * 0.8  # 标准化到80%音量
+                            current_audio *= 0.8 / max_val  # 标准化到80%音量
                         
-                        # 实现重叠录制：将当前音频与缓冲区合并
-                        if len(self.audio_buffer) > 0:
-                            # 保留上一段音频的重叠部分
-                            overlap_samples = int(self.SAMPLE_RATE * self.OVERLAP)
-                            if len(self.audio_buffer) >= overlap_samples:
-                                overlap_audio = self.audio_buffer[-overlap_samples:]
-                                # 合并重叠音频和当前音频
-                                audio_data = np.concatenate([overlap_audio, current_audio])
-                            else:
-                                audio_data = np.concatenate([self.audio_buffer, current_audio])
-                        else:
-                            audio_data = current_audio
-                        
-                        # 更新缓冲区
-                        self.audio_buffer = current_audio
+                        # 写入环形缓冲区后直接取"上一段重叠部分（或未提交的尾部） + 当前音频"的视图
+                        self.audio_buffer.append(current_audio)
+                        if self.mel_features:
+                            self.mel_features.feed(current_audio)  # 只为新音频计算梅尔帧
+                        audio_data, window_start = self.stitcher.window(self.audio_buffer, len(current_audio))
+                        mel = self.mel_features.last(len(audio_data)) if self.mel_features else None
                         
                         # 检查音频长度是否足够
                         audio_duration = len(audio_data) / self.SAMPLE_RATE
                         if audio_duration < self.MIN_AUDIO_LENGTH:
                             continue
                         
-                        # 根据翻译模式进行转录和翻译
-                        if self.TRANSLATION_MODE == "en_to_zh":
-                            # 英文转中文模式
-                            result = self.model.transcribe(
-                                audio_data, 
-                                fp16=torch.cuda.is_available(),
-                                language='en',  # 明确指定语言为英文
-                                task='transcribe',  # 明确指定任务
-                                temperature=0.0,  # 降低随机性
-                                best_of=1,  # 减少计算量但保持质量
-                                beam_size=1,  # 简化beam search
-                                patience=1.0,  # 提高耐心等待完整句子
-                                length_penalty=1.0,  # 不惩罚长句子
-                                suppress_tokens="-1",  # 不抑制任何token
-                                initial_prompt="This is a conversation in English."  # 提供上下文提示
-                            )
-                            source_text = result.get("text", "").strip()
-                            
-                            if source_text and len(source_text) > 3:  # 过滤过短的转录结果
-                                # 翻译为中文
-                                try:
-                                    target_text = ts.translate_text(source_text, from_language='en', to_language='zh-CN')
-                                except Exception as e:
-                                    target_text = f"翻译失败: {str(e)}"
-                                
-                                # Add to queue for UI update
-                                timestamp = time.strftime("%H:%M:%S")
-                                self.translation_queue.put((timestamp, source_text, target_text))
-                                
-                        else:
-                            # 中文转英文模式
-                            result = self.model.transcribe(
-                                audio_data, 
-                                fp16=torch.cuda.is_available(),
-                                language='zh',  # 明确指定语言为中文
-                                task='transcribe',  # 明确指定任务
-                                temperature=0.0,  # 降低随机性
-                                best_of=1,  # 减少计算量但保持质量
-                                beam_size=1,  # 简化beam search
-                                patience=1.0,  # 提高耐心等待完整句子
-                                length_penalty=1.0,  # 不惩罚长句子
-                                suppress_tokens="-1",  # 不抑制任何token
-                                initial_prompt="这是一段中文对话。"  # 提供中文上下文提示
-                            )
-                            source_text = result.get("text", "").strip()
-                            
-                            if source_text and len(source_text) > 1:  # 中文字符较短，调整过滤条件
-                                # 翻译为英文
-                                try:
-                                    target_text = ts.translate_text(source_text, from_language='zh-CN', to_language='en')
-                                except Exception as e:
-                                    target_text = f"翻译失败: {str(e)}"
-                                
-                                # Add to queue for UI update
-                                timestamp = time.strftime("%H:%M:%S")
-                                self.translation_queue.put((timestamp, source_text, target_text))
+                        # 根据翻译模式进行转录和翻译，只输出上一窗口没有输出过的文本
+                        self.transcribe_and_translate(audio_data, window_start, mel)
                             
+                    except AudioSourceExhausted:
+                        # Replay finished: transcribe the last unfinished utterance
+                        utterance = self.segmenter.flush()
+                        if self.SEGMENTATION_MODE == "vad" and utterance is not None:
+                            self.transcribe_utterance(utterance)
+                        elif self.SEGMENTATION_MODE == "fixed" and self.CARRY_TAIL:
+                            self.transcribe_carried_tail()
+                        self.translation_queue.put(("END", "音频源已播放完毕", ""))
+                        break
                     except Exception as e:
                         if self.is_running:  # Only show error if still running
                             self.translation_queue.put(("ERROR", str(e), ""))
@@ -355,6 +388,105 @@ class RealtimeTranslationGUI:
             if self.is_running:
                 self.translation_queue.put(("ERROR", f"录音失败: {str(e)}", ""))
     
+    def create_stitcher(self):
+        """Fixed-window stitcher for the current translation mode"""
+        language = source_language(self.TRANSLATION_MODE) or 'en'  # auto mode updates it after each window
+        if self.CARRY_TAIL:
+            return SegmentCommitter(language, guard=self.COMMIT_GUARD, max_carry=self.INTERVAL / 2)
+        return TranscriptStitcher(language, overlap=self.OVERLAP)
+
+    def window_history(self):
+        """Seconds of audio a fixed window may span: one interval plus the overlap (a carried tail shortens the next recording instead)"""
+        return self.INTERVAL + self.OVERLAP
+
+    def transcribe_carried_tail(self):
+        """Commit whatever the last fixed window left uncommitted"""
+        audio_data, window_start = self.stitcher.window(self.audio_buffer, 0)
+        if len(audio_data) < self.SAMPLE_RATE * self.MIN_AUDIO_LENGTH:
+            return
+        mel = self.mel_features.last(len(audio_data)) if self.mel_features else None
+        self.transcribe_and_translate(audio_data, window_start, mel, final=True)
+
+    def transcribe_utterance(self, utterance):
+        """Skip too-short VAD utterances, normalize volume and transcribe"""
+        audio_data = utterance.audio
+        if len(audio_data) < self.SAMPLE_RATE * self.MIN_AUDIO_LENGTH:
+            return
+        max_val = np.max(np.abs(audio_data))
+        if max_val > 0:
+            audio_data *= 0.8 / max_val  # 标准化到80%音量
+        self.transcribe_and_translate(audio_data, start_time=utterance.start_sample / self.SAMPLE_RATE)
+    
+    def transcribe_and_translate(self, audio_data, window_start=None, mel=None, final=False, start_time=None):
+        """Transcribe one audio segment and queue the translation for the UI
+
+        window_start (seconds on the ring buffer clock) enables stitching: text already
+        emitted for the previous window is dropped, and with CARRY_TAIL segments too close
+        to the window edge are left for the next window (final commits everything).
+        mel is the incrementally computed log-mel of audio_data, if available.
+        start_time (seconds) dates an unstitched segment for the rolling prompt's silence reset.
+        """
+        if window_start is not None:
+            start_time = window_start
+        window_end = window_start + len(audio_data) / self.SAMPLE_RATE if window_start is not None else None
+        end_time = start_time + len(audio_data) / self.SAMPLE_RATE if start_time is not None else None
+        # 源语言：固定翻译模式下已知；auto模式下同一说话轮次沿用已识别的语言，新轮次由Whisper在中英文中识别
+        router = self.language_router
+        language = router.language_for(start_time) if router is not None else source_language(self.TRANSLATION_MODE)
+        options = {"language_candidates": router.languages} if language is None else {}
+        base_prompt = SOURCE_SETTINGS[language][0] if language else None
+        result = self.engine.transcribe(
+            audio_data, 
+            mel=mel,  # 增量计算好的梅尔谱，引擎不支持时忽略
+            fp16=torch.cuda.is_available(),
+            language=language,  # 明确指定源语言（auto模式的新轮次为None）
+            task='transcribe',  # 明确指定任务
+            **preset_options(self.QUALITY_MODE),  # 解码预设：限制温度回退次数和每块的解码时间
+            length_penalty=1.0,  # 不惩罚长句子
+            suppress_tokens="-1",  # 不抑制任何token
+            initial_prompt=self.initial_prompt(base_prompt, start_time),  # 提供上下文提示
+            **options
+        )
+        if router is not None:
+            language = result.get("language")
+            if self.context is not None and router.switched(language):
+                self.context.reset("语言切换")
+            mode = router.route(language, start_time, end_time, has_speech=bool(result.get("text", "").strip()))
+            language = source_language(mode)
+            self.stitcher.language = language
+        source_text = self.new_source_text(result, window_start, window_end, final)
+        self.update_context(result, source_text, end_time)
+        
+        _, min_length, from_language, to_language = SOURCE_SETTINGS[language]
+        if source_text and len(source_text) > min_length:  # 过滤过短的转录结果，中文字符较短，过滤条件更宽
+            try:
+                target_text = ts.translate_text(source_text, from_language=from_language, to_language=to_language)
+            except Exception as e:
+                target_text = f"翻译失败: {str(e)}"
+            
+            # Add to queue for UI update
+            timestamp = time.strftime("%H:%M:%S")
+            if router is not None:
+                source_text = f"[{'EN' if language == 'en' else '中'}] {source_text}"
+            self.translation_queue.put((timestamp, source_text, target_text))
+    
+    def initial_prompt(self, base_prompt, start_time=None):
+        """Rolling prompt from recently committed text, or base_prompt when there is none"""
+        if self.context is None:
+            return base_prompt
+        return self.context.text(start_time) or base_prompt
+
+    def update_context(self, result, source_text, end_time=None):
+        """Add committed text to the rolling prompt (reset instead on hallucination)"""
+        if self.context is not None:
+            self.context.update(result, source_text, end_time)
+
+    def new_source_text(self, result, window_start, window_end=None, final=False):
+        """Text of a transcription result that was not emitted for the previous window"""
+        if window_start is None:
+            return result.get("text", "").strip()
+        return self.stitcher.stitch(result, window_start, window_end, final=final).strip()
+    
     def update_ui(self):
         """Update UI with new translations"""
         try:
@@ -366,6 +498,11 @@ class RealtimeTranslationGUI:
                     self.stop_translation()
                     return
                 
+                if timestamp == "END":
+                    self.stop_translation()
+                    self.status_label.config(text=f"状态: {source}")
+                    return
+                
                 # Add to text areas
                 self.source_text.insert(tk.END, f"[{timestamp}] {source}\n\n")
                 self.target_text.insert(tk.END, f"[{timestamp}] {target}\n\n")
@@ -5,18 +5,32 @@
 同时包含实时音频翻译和文本翻译功能
 """
 
-import soundcard as sc
-import numpy as np
-import whisper
 import torch
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
+from tkinter import ttk, scrolledtext, messagebox, filedialog
 import threading
 import queue
 import time
+from audio_pipeline import AudioPipeline
+from stage_queue import BoundedQueue, merge_partial_events
+from audio_sources import ReplaySource, SyntheticSource, list_soundcard_sources
+from ring_buffer import AudioRingBuffer
+from vad import UtteranceSegmenter
+from stitching import TranscriptStitcher, SegmentCommitter
+from prompt_context import RollingPrompt
+from decoding_presets import preset_options
+from language_router import AUTO_MODE, LanguageRouter, source_language
+from translation_cache import TranslationCache
+from batch_translation import BatchTranslator
+from translator_registry import TranslatorRegistry
+from mt_service import PRIORITY_AUDIO, PRIORITY_TEXT, TranslationService
+from argos_packages import DEFAULT_PACKAGE_DIR as ARGOS_PACKAGE_DIR, ensure_local_packages, start_download
+from translation_memory import DEFAULT_PATH as TRANSLATION_MEMORY_PATH, TranslationMemory
+from whisper_decode import IncrementalLogMel
+from asr_engine import create_engine
+from rtf_controller import RTFController, apply_level, build_ladder
 try:
     import argostranslate.package
-    import argostranslate.translate
     ARGOS_AVAILABLE = True
 except ImportError:
     ARGOS_AVAILABLE = False
@@ -35,21 +49,77 @@ class IntegratedTranslator:
         self.MODEL_SIZE = tk.StringVar(value="small")
         self.FORCE_CPU = False
         self.MIN_AUDIO_LENGTH = 1.0
-        self.AUDIO_TRANSLATION_MODE = "en_to_zh"
+        self.CAPTURE_BLOCK = 0.5  # 采集线程每次录制的时长（秒）
+        self.SEGMENTATION_MODE = "vad"  # "vad" (按语音停顿切分) 或 "fixed" (固定INTERVAL/OVERLAP窗口)
+        self.VAD_MAX_UTTERANCE = 15  # 单句最长时长（秒），超过后强制切分
+        self.VAD_HANGOVER = 0.5  # 连续静音超过该时长（秒）视为一句话结束
+        self.STREAM_STEP = 0.5  # 流式模式下两次重新转录的间隔（秒）
+        self.CARRY_TAIL = True  # 固定窗口模式下只提交远离窗口末尾的分段，未完成的句子留到下一窗口；False时使用OVERLAP重叠去重
+        self.COMMIT_GUARD = 1.0  # 结束时间距窗口末尾不足该值（秒）的分段留到下一窗口
+        self.ROLLING_PROMPT = True  # 用最近提交的转录文本作为下一次转录的提示，False时使用固定的initial_prompt
+        self.PROMPT_MAX_TOKENS = 48  # 滚动提示最多保留的token数，越长解码越慢
+        self.TRIM_ENCODER = True  # 编码器只处理真实音频长度而不是补零到30秒
+        self.CPU_INT8 = True  # CPU推理时对线性层做动态int8量化，medium也可以实时运行
+        self.ASR_BACKEND = "whisper"  # "whisper" 或 "faster-whisper" (CTranslate2)
+        self.ASR_THREADS = 0  # faster-whisper每次推理使用的CPU线程数，0为自动
+        self.ADAPTIVE_RTF = True  # 根据实时率自动调整模型大小、解码参数和窗口长度
+        self.RTF_HIGH = 0.9  # 滚动实时率超过该值时降级
+        self.RTF_LOW = 0.5  # 滚动实时率低于该值时升级
+        self.TRANSLATION_CACHE_SIZE = 1024  # 翻译结果缓存的条目数，0为不缓存
+        self.TRANSLATION_MEMORY_PATH = TRANSLATION_MEMORY_PATH  # 持久化翻译记忆（SQLite），None为关闭
+        self.TM_FUZZY_THRESHOLD = None  # 翻译记忆宽松匹配（只忽略大小写、标点和空白）的候选最低相似度，None为只做精确匹配
+        self.TRANSLATION_BATCH_SIZE = 16  # 平衡模式一次CTranslate2调用最多翻译的句子数
+        self.ARGOS_PACKAGE_DIR = ARGOS_PACKAGE_DIR  # 存放 .argosmodel 文件的本地目录，启动时优先从这里安装缺少的翻译包
+        self.DOWNLOAD_MISSING_MODELS = True  # 本地没有翻译包时在后台更新包索引并下载，False时只使用本地翻译包
+        self.MT_WORKERS = 2  # 音频和文本翻译共用的翻译工作线程数
+        self.MT_QUEUE_SIZE = 32  # 最多等待的翻译请求数
+        self.DRAFT_MODEL = None  # 投机解码的草稿模型（例如 "tiny"），贪心解码时由它猜token、所选模型验证，None关闭
+        self.AUDIO_TRANSLATION_MODE = "en_to_zh"  # "en_to_zh"、"zh_to_en" 或 "auto"（每句识别中英文并选择方向）
         
         # 设备兼容性检测
         self.device_type = self.detect_optimal_device()
         self.available_models = ["tiny", "base", "small", "medium", "large"]
         
         # 翻译模型选择
+        self.translation_cache = TranslationCache(self.TRANSLATION_CACHE_SIZE)  # 音频和文本翻译共用
+        self.translation_memory = self.open_translation_memory()  # 缓存未命中时先查翻译记忆，再运行翻译模型
+        self.translators = TranslatorRegistry()  # 离线翻译初始化后解析并预热两个翻译方向
+        self.batch_translator = BatchTranslator(self.translators, self.TRANSLATION_BATCH_SIZE)  # 平衡模式分句后批量翻译
+        # 音频和文本翻译请求都提交给翻译服务，由同一组工作线程执行
+        self.mt_service = TranslationService(self.translate_with_quality_mode, workers=self.MT_WORKERS,
+                                             queue_size=self.MT_QUEUE_SIZE).start()
         self.translation_model_type = tk.StringVar(value="balanced")  # fast, balanced, accurate
+        self.translation_model_type.trace_add("write", self.on_quality_change)  # 同时选择语音识别的解码预设
         
         # 音频翻译状态变量
         self.is_audio_running = False
-        self.model = None
+        self.engine = None  # 语音识别引擎
+        self.model_loading = False  # 模型是否正在后台加载
+        self.model_generation = 0  # 每次请求加载模型时递增，过期的加载结果直接丢弃
+        self.pending_engine = None  # 已加载完成、等待在音频块之间切换的引擎
+        self.engine_lock = threading.Lock()
         self.audio_device = None
-        self.translation_queue = queue.Queue()
-        self.audio_buffer = np.array([], dtype=np.float32)
+        self.audio_sources = []  # 与设备下拉框一一对应的音频源
+        self.replay_files = []  # 用户添加的WAV回放文件
+        self.audio_pipeline = None
+        self.stopping_pipeline = None  # 已停止但线程还没有退出的流水线，退出前不能开始新的音频翻译
+        self.restart_pending = False  # 停止过程中点击了开始，线程退出后重新开始
+        # 界面队列有界：界面卡顿时丢弃最旧的结果 / 合并连续的临时字幕，恢复后直接显示最新内容
+        self.translation_queue = BoundedQueue(256, "drop_oldest", name="translation")
+        self.stream_queue = BoundedQueue(256, "merge", merge_fn=merge_partial_events, name="stream")  # 流式字幕事件 (类型, 文本)
+        self.streaming = False  # 本次音频翻译是否启用流式字幕
+        self.audio_buffer = AudioRingBuffer(self.SAMPLE_RATE * self.window_history(), self.SAMPLE_RATE)
+        self.pending_samples = 0  # 上次转录之后新采集的样本数
+        self.transcribed_samples = 0  # 当前音频块触发转录的音频样本数，用于计算实时率
+        self.active_interval = self.INTERVAL  # 固定窗口模式下当前的窗口间隔，可由实时率控制器缩短
+        self.rtf_controller = None  # 实时率控制器，开始音频翻译时创建
+        self.segmenter = UtteranceSegmenter(self.SAMPLE_RATE, max_utterance=self.VAD_MAX_UTTERANCE,
+                                            hangover=self.VAD_HANGOVER)
+        self.stitcher = self.create_stitcher()  # 固定窗口模式下去掉重复文本（或把未完成的句子留到下一窗口）
+        self.mel_features = None  # 固定窗口模式下的增量梅尔谱，模型加载后按其梅尔通道数创建
+        self.streamer = None  # 流式转录会话，开始音频翻译时由识别引擎创建
+        self.context = None  # 滚动转录提示，开始音频翻译时创建
+        self.language_router = None  # auto模式下按语句识别语言、选择翻译方向
         
         # 文本翻译模式
         self.text_translation_mode = tk.StringVar(value="zh_to_en")
@@ -116,10 +186,15 @@ class IntegratedTranslator:
         ttk.Label(mode_frame, text="翻译模式:").grid(row=0, column=0, padx=(0, 10))
         self.audio_mode_var = tk.StringVar(value="en_to_zh")
         audio_mode_combo = ttk.Combobox(mode_frame, textvariable=self.audio_mode_var, state="readonly", width=20)
-        audio_mode_combo['values'] = ("en_to_zh (英文转中文)", "zh_to_en (中文转英文)")
+        audio_mode_combo['values'] = ("en_to_zh (英文转中文)", "zh_to_en (中文转英文)", "auto (自动识别中英文)")
         audio_mode_combo.grid(row=0, column=1, sticky=(tk.W, tk.E))
         audio_mode_combo.bind('<<ComboboxSelected>>', self.on_audio_mode_change)
         
+        # 流式字幕：说话过程中显示灰色临时结果
+        self.streaming_var = tk.BooleanVar(value=False)
+        streaming_check = ttk.Checkbutton(mode_frame, text="流式字幕", variable=self.streaming_var)
+        streaming_check.grid(row=0, column=2, padx=(10, 0))
+        
         # Whisper模型选择
         model_frame = ttk.Frame(self.audio_frame)
         model_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
@@ -128,6 +203,7 @@ class IntegratedTranslator:
         model_combo = ttk.Combobox(model_frame, textvariable=self.MODEL_SIZE, state="readonly", width=15)
         model_combo['values'] = tuple(self.available_models)
         model_combo.grid(row=0, column=1, padx=(0, 20))
+        model_combo.bind("<<ComboboxSelected>>", self.on_model_size_change)
         
         ttk.Label(model_frame, text="翻译质量:").grid(row=0, column=2, padx=(0, 10))
         translation_combo = ttk.Combobox(model_frame, textvariable=self.translation_model_type, state="readonly", width=15)
@@ -147,6 +223,10 @@ class IntegratedTranslator:
         refresh_button = ttk.Button(device_frame, text="刷新设备", command=self.refresh_devices)
         refresh_button.grid(row=0, column=2, padx=(10, 0))
         
+        # 打开WAV文件回放
+        open_wav_button = ttk.Button(device_frame, text="打开WAV", command=self.add_replay_file)
+        open_wav_button.grid(row=0, column=3, padx=(10, 0))
+        
         # 翻译显示区域
         display_frame = ttk.Frame(self.audio_frame)
         display_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
@@ -156,6 +236,7 @@ class IntegratedTranslator:
         self.audio_source_label.grid(row=0, column=0, sticky=tk.W)
         self.audio_source_text = scrolledtext.ScrolledText(display_frame, height=8, wrap=tk.WORD, font=("Arial", 11))
         self.audio_source_text.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(5, 10))
+        self.audio_source_text.tag_configure("partial", foreground="gray")
         
         # 目标文本
         self.audio_target_label = ttk.Label(display_frame, text="中文翻译:", font=("Arial", 12, "bold"))
@@ -231,7 +312,11 @@ class IntegratedTranslator:
     def on_audio_mode_change(self, event=None):
         """处理音频翻译模式切换"""
         mode_value = self.audio_mode_var.get()
-        if "en_to_zh" in mode_value:
+        if AUTO_MODE in mode_value:
+            self.AUDIO_TRANSLATION_MODE = AUTO_MODE
+            self.audio_source_label.config(text="原文（自动识别）:")
+            self.audio_target_label.config(text="翻译:")
+        elif "en_to_zh" in mode_value:
             self.AUDIO_TRANSLATION_MODE = "en_to_zh"
             self.audio_source_label.config(text="英文原文:")
             self.audio_target_label.config(text="中文翻译:")
@@ -282,68 +367,214 @@ class IntegratedTranslator:
             return "cpu"
     
     def initialize_model(self):
-        """初始化Whisper模型"""
+        """初始化Whisper模型：在后台线程加载并预热，界面保持响应
+
+        运行中切换模型大小时同样调用本方法，旧模型在新模型就绪前继续转录
+        """
+        print(f"使用设备: {self.device_type}")
+        
+        # 根据设备类型调整模型大小，int8量化后CPU上medium仍可实时运行
+        model_size = self.MODEL_SIZE.get()
+        use_int8 = self.CPU_INT8 and self.device_type == "cpu"
+        too_large = ["large"] if use_int8 else ["large", "medium"]
+        if self.device_type == "cpu" and model_size in too_large:
+            print(f"CPU模式下将{model_size}模型降级为small以提高性能")
+            model_size = "small"
+            self.MODEL_SIZE.set("small")
+        
+        self.model_generation += 1
+        self.model_loading = True
+        self.set_audio_status(f"状态: 正在加载 {model_size} 模型 (1/2)...")
+        threading.Thread(target=self.load_model_worker, args=(model_size, use_int8, self.model_generation),
+                         name="model-loader", daemon=True).start()
+    
+    def on_model_size_change(self, event=None):
+        """运行时切换Whisper模型大小：后台加载新模型，当前模型继续服务"""
+        current = self.pending_engine or self.engine
+        if current is not None and current.model_size == self.MODEL_SIZE.get() and not self.model_loading:
+            return
+        if self.rtf_controller is not None:
+            # 手动选择的模型作为自适应控制的新起点
+            self.rtf_controller = self.create_rtf_controller()
+        self.initialize_model()
+    
+    def create_rtf_controller(self):
+        """按当前选择的模型、窗口长度和解码预设创建实时率控制器
+
+        第一档就是所选质量模式的解码方式，控制器从第一档开始，只在跟不上时往下降
+        """
+        preset = preset_options(self.translation_model_type.get())
+        # vad模式不读取窗口长度，缩短窗口的档位没有效果
+        short_interval = None if self.SEGMENTATION_MODE == "vad" else 3
+        levels = build_ladder(self.MODEL_SIZE.get(), self.INTERVAL, short_interval=short_interval,
+                              beam_size=preset.get("beam_size"), best_of=preset.get("best_of"))
+        # 每次转录记录一次（一句话或一个窗口），滚动窗口和冷却按转录次数计
+        return RTFController(levels, window=8, cooldown=4, high=self.RTF_HIGH, low=self.RTF_LOW)
+    
+    def apply_rtf_level(self, level):
+        """转录线程：应用实时率控制器选出的新档位"""
+        self.active_interval = level.interval
+        if self.streamer is not None:
+            self.engine.attach(self.streamer, **self.transcribe_options())
+        current = self.pending_engine or self.engine
+        if level.model_size != current.model_size:
+            self.root.after(0, self.switch_model_size, level.model_size)
+    
+    def on_quality_change(self, *args):
+        """质量模式改变后，正在进行的流式会话改用新的解码预设（其他模式每次转录时读取）
+
+        实时率档位表的第一档取自解码预设，音频翻译进行中时按新预设重建并回到第一档
+        """
+        with self.engine_lock:
+            if self.rtf_controller is not None and self.engine is not None:
+                self.rtf_controller = self.create_rtf_controller()
+                self.apply_rtf_level(self.rtf_controller.level)
+            elif self.streamer is not None and self.engine is not None:
+                self.engine.attach(self.streamer, **self.transcribe_options())
+    
+    def switch_model_size(self, model_size):
+        """主线程：切换到指定大小的模型（后台加载，就绪后在音频块之间切换）"""
+        self.MODEL_SIZE.set(model_size)
+        self.initialize_model()
+    
+    def load_model_worker(self, model_size, use_int8, generation):
+        """模型加载线程：加载模型后用合成音频预热一次，第一段真实音频不再承担初始化开销"""
         try:
-            self.audio_status_label.config(text="状态: 正在加载模型...")
-            self.root.update()
-            
-            print(f"使用设备: {self.device_type}")
+            engine = create_engine(self.ASR_BACKEND, model_size, self.device_type, int8=use_int8,
+                                   trim_encoder=self.TRIM_ENCODER, intra_threads=self.ASR_THREADS,
+                                   draft_model=self.DRAFT_MODEL)
+            print(f"已加载 {engine.name} 模型")
             
-            # 根据设备类型调整模型大小
-            model_size = self.MODEL_SIZE.get()
-            if self.device_type == "cpu" and model_size in ["large", "medium"]:
-                print(f"CPU模式下将{model_size}模型降级为small以提高性能")
-                model_size = "small"
-                self.MODEL_SIZE.set("small")
+            self.set_audio_status("状态: 正在预热模型 (2/2)...")
+            elapsed = engine.warmup(language=self.audio_source_language() or "en")
+            print(f"模型预热完成，耗时 {elapsed:.1f} 秒")
             
-            # 加载模型
-            self.model = whisper.load_model(model_size, device=self.device_type)
-            print(f"已加载 {model_size} 模型")
+            if generation != self.model_generation:
+                # 加载期间用户又选择了其他模型
+                print(f"丢弃过期的 {engine.name} 模型")
+                engine.close()
+                return
             
-            self.audio_status_label.config(text=f"状态: 模型加载完成 ({self.device_type.upper()})")
+            with self.engine_lock:
+                stale, self.pending_engine = self.pending_engine, engine
+            if stale is not None:
+                stale.close()
+            # 没有在转录时由主线程立即切换；否则由转录线程在下一个音频块开始前切换
+            self.root.after(0, self.swap_engine_if_idle)
             
         except Exception as e:
             error_msg = f"模型加载失败: {str(e)}"
             print(error_msg)
-            self.audio_status_label.config(text=f"状态: {error_msg}")
+            self.set_audio_status(f"状态: {error_msg}")
+        finally:
+            if generation == self.model_generation:
+                self.model_loading = False
+    
+    def swap_engine_if_idle(self):
+        """主线程：流水线未运行（且上一条流水线的线程都已退出）时直接切换到新引擎"""
+        if self.audio_pipeline is None and not self.pipeline_stopping():
+            self.swap_pending_engine()
+    
+    def pipeline_stopping(self):
+        """上一条流水线是否还有线程在完成当前的转录或翻译（线程退出后由 finish_stopping 清除）"""
+        return self.stopping_pipeline is not None
+    
+    def swap_pending_engine(self):
+        """把已加载好的新引擎换上并释放旧模型
+
+        只在两个音频块之间调用（转录线程或未运行时），任何一块音频都完整地由同一个模型转录
+        """
+        with self.engine_lock:
+            engine, self.pending_engine = self.pending_engine, None
+            if engine is None:
+                return
+            old_engine, self.engine = self.engine, engine
+            if self.streamer is not None:
+                engine.attach(self.streamer, **self.transcribe_options())
+            # 新模型的梅尔通道数可能不同，也可能不使用预先计算的梅尔谱（未裁剪编码器或其他后端）
+            self.mel_features = self.create_mel_features(engine, self.audio_buffer.get())
+        
+        if old_engine is not None:
+            old_engine.close()
+            print(f"已从 {old_engine.name} 切换到 {engine.name}，旧模型内存已释放")
+        self.root.after(0, self.show_engine_status, engine)
+    
+    def show_engine_status(self, engine):
+        """主线程：切换引擎后更新音频状态标签"""
+        device_info = f"{self.device_type.upper()}, {engine.name}"
+        if self.is_audio_running:
+            self.audio_status_label.config(text=f"状态: 正在翻译... ({device_info})")
+        else:
+            self.audio_status_label.config(text=f"状态: 模型加载完成 ({device_info})")
+    
+    def create_mel_features(self, engine, audio=None):
+        """按引擎的梅尔通道数创建增量梅尔谱，引擎不使用预先计算的梅尔谱时返回None
+
+        audio: 环形缓冲区中已有的音频，先计算其梅尔帧，使切换模型后的下一个窗口仍能复用
+        """
+        if not engine.n_mels:
+            return None
+        mel_features = IncrementalLogMel(engine.n_mels, history=self.window_history())
+        if audio is not None:
+            mel_features.feed(audio)
+        return mel_features
+    
+    def set_audio_status(self, text):
+        """更新音频状态标签，可在工作线程中调用"""
+        self.root.after(0, lambda: self.audio_status_label.config(text=text))
             
     def refresh_devices(self):
         """刷新音频设备列表"""
+        sources = []
         try:
             # 获取所有音频设备
-            devices = sc.all_microphones(include_loopback=True)
-            device_names = []
-            
-            for i, device in enumerate(devices):
-                device_name = device.name
-                if hasattr(device, 'isloopback') and device.isloopback:
-                    device_name += " (系统音频)"
-                device_names.append(f"{i}: {device_name}")
-            
-            # 更新下拉框
-            self.device_combo['values'] = device_names
-            
-            # 默认选择第一个设备
-            if device_names:
-                self.device_combo.current(0)
-                
+            sources.extend(list_soundcard_sources(include_loopback=True))
         except Exception as e:
             print(f"刷新设备失败: {e}")
-            self.device_combo['values'] = ["无可用设备"]
+        
+        # 不依赖声卡的音频源：WAV回放和合成信号
+        sources.extend(ReplaySource.from_wav(path) for path in self.replay_files)
+        sources.append(SyntheticSource(self.SAMPLE_RATE))
+        
+        device_names = []
+        for i, source in enumerate(sources):
+            device_name = source.name
+            if getattr(source, 'is_loopback', False):
+                device_name += " (系统音频)"
+            device_names.append(f"{i}: {device_name}")
+        
+        # 更新下拉框
+        self.audio_sources = sources
+        self.device_combo['values'] = device_names
+        
+        # 默认选择第一个设备
+        if device_names:
+            self.device_combo.current(0)
+            
+    def add_replay_file(self):
+        """添加WAV文件作为回放音频源并选中"""
+        path = filedialog.askopenfilename(filetypes=[("WAV文件", "*.wav"), ("所有文件", "*.*")])
+        if not path:
+            return
+        if path not in self.replay_files:
+            self.replay_files.append(path)
+        self.refresh_devices()
+        for i, source in enumerate(self.audio_sources):
+            if isinstance(source, ReplaySource) and source.name.endswith(path):
+                self.device_combo.current(i)
+                break
             
     def get_selected_device(self):
-        """获取选中的音频设备"""
+        """获取选中的音频源"""
         try:
             device_str = self.device_var.get()
-            if not device_str or device_str == "无可用设备":
+            if not device_str:
                 return None
                 
             # 提取设备索引
             device_index = int(device_str.split(':')[0])
-            devices = sc.all_microphones(include_loopback=True)
-            
-            if 0 <= device_index < len(devices):
-                return devices[device_index]
+            if 0 <= device_index < len(self.audio_sources):
+                return self.audio_sources[device_index]
             return None
             
         except Exception as e:
@@ -359,8 +590,17 @@ class IntegratedTranslator:
             
     def start_audio_translation(self):
         """开始音频翻译"""
-        if not self.model:
-            messagebox.showerror("错误", "模型未加载")
+        if self.pipeline_stopping():
+            # 旧的转录线程仍在使用分段器、流式会话等状态，等它退出后再开始
+            self.restart_pending = True
+            self.audio_status_label.config(text="状态: 正在停止，结束后重新开始...")
+            return
+        self.swap_pending_engine()
+        if not self.engine:
+            if self.model_loading:
+                messagebox.showinfo("提示", "模型正在后台加载，请稍候")
+            else:
+                messagebox.showerror("错误", "模型未加载")
             return
             
         self.audio_device = self.get_selected_device()
@@ -376,9 +616,40 @@ class IntegratedTranslator:
         self.audio_source_text.delete(1.0, tk.END)
         self.audio_target_text.delete(1.0, tk.END)
         
-        # 启动翻译线程
-        self.translation_thread = threading.Thread(target=self.audio_translation_worker, daemon=True)
-        self.translation_thread.start()
+        # 启动采集/转录/翻译流水线
+        self.audio_buffer.clear()
+        self.pending_samples = 0
+        self.active_interval = self.INTERVAL
+        self.rtf_controller = self.create_rtf_controller() if self.ADAPTIVE_RTF else None
+        self.segmenter.reset()
+        self.context = (RollingPrompt(self.transcribe_options().get("initial_prompt"), max_tokens=self.PROMPT_MAX_TOKENS)
+                        if self.ROLLING_PROMPT else None)
+        self.streamer = self.engine.stream(self.segmenter, self.audio_source_language() or "en", step=self.STREAM_STEP,
+                                           context=self.context, **self.transcribe_options())
+        self.language_router = LanguageRouter() if self.AUDIO_TRANSLATION_MODE == AUTO_MODE else None
+        self.stitcher = self.create_stitcher()
+        self.mel_features = self.create_mel_features(self.engine)
+        self.streaming = self.streaming_var.get() and self.SEGMENTATION_MODE == "vad"
+        if self.streaming and self.language_router is not None:
+            # 流式字幕在一句话说完之前就要显示，需要事先确定源语言
+            print("auto模式下每句话结束后才能识别语言，已关闭流式字幕")
+            self.streaming = False
+        device = self.audio_device
+        print(f"开始录制音频，设备: {device.name}")
+        self.audio_pipeline = AudioPipeline(
+            open_recorder=lambda: device.recorder(samplerate=self.SAMPLE_RATE, channels=1),
+            block_frames=self.SAMPLE_RATE * self.CAPTURE_BLOCK,
+            process_audio=self.process_audio_chunk,
+            translate_fn=lambda item: self.translate_with_quality_mode(*item),
+            submit_fn=lambda item: self.mt_service.submit(*item, priority=PRIORITY_AUDIO),
+            max_in_flight=self.MT_WORKERS,
+            # 流式模式下原文已经通过流式事件显示，只需追加译文
+            on_result=lambda item, target: self.translation_queue.put(
+                (None if self.streaming else self.display_source(*item), target)),
+            on_error=lambda message: self.translation_queue.put(("错误", message)),
+            on_finished=lambda: self.translation_queue.put(("提示", "音频源已播放完毕")),
+        )
+        self.audio_pipeline.start()
         
         # 启动UI更新
         self.update_audio_ui()
@@ -386,82 +657,223 @@ class IntegratedTranslator:
     def stop_audio_translation(self):
         """停止音频翻译"""
         self.is_audio_running = False
+        self.restart_pending = False
         self.audio_start_button.config(text="开始音频翻译")
+        if not self.audio_pipeline:
+            self.audio_status_label.config(text="状态: 已停止")
+            return
+        # 不在界面线程中等待：线程退出（并输出已提交的翻译请求的结果）后由 finish_stopping 收尾
+        self.stopping_pipeline, self.audio_pipeline = self.audio_pipeline, None
+        self.stopping_pipeline.stop()
+        self.audio_status_label.config(text="状态: 正在停止...")
+        self.root.after(100, self.finish_stopping)
+    
+    def finish_stopping(self):
+        """轮询已停止的流水线，线程全部退出后收尾，需要时重新开始"""
+        self.update_audio_ui()  # 显示停止后才完成的译文
+        if self.stopping_pipeline.alive:
+            self.root.after(100, self.finish_stopping)
+            return
+        self.stopping_pipeline = None
+        print(self.translation_cache.summary())
+        print(self.mt_service.summary())
+        if self.translation_memory is not None:
+            self.translation_memory.flush()
+            print(self.translation_memory.summary())
         self.audio_status_label.config(text="状态: 已停止")
+        if self.restart_pending:
+            self.restart_pending = False
+            self.start_audio_translation()
+        else:
+            self.swap_engine_if_idle()  # 停止期间加载完成的模型
         
-    def audio_translation_worker(self):
-        """音频翻译工作线程"""
-        try:
-            with self.audio_device.recorder(samplerate=self.SAMPLE_RATE, channels=1) as recorder:
-                print(f"开始录制音频，设备: {self.audio_device.name}")
-                
-                while self.is_audio_running:
-                    # 录制音频
-                    audio_data = recorder.record(numframes=int(self.SAMPLE_RATE * self.INTERVAL))
-                    audio_np = audio_data.flatten().astype(np.float32)
-                    
-                    # 添加到缓冲区
-                    self.audio_buffer = np.concatenate([self.audio_buffer, audio_np])
-                    
-                    # 保持缓冲区大小
-                    max_buffer_size = int(self.SAMPLE_RATE * (self.INTERVAL + self.OVERLAP))
-                    if len(self.audio_buffer) > max_buffer_size:
-                        self.audio_buffer = self.audio_buffer[-max_buffer_size:]
-                    
-                    # 检查音频长度
-                    if len(self.audio_buffer) < int(self.SAMPLE_RATE * self.MIN_AUDIO_LENGTH):
-                        continue
-                    
-                    # 转录音频
-                    try:
-                        if self.AUDIO_TRANSLATION_MODE == "en_to_zh":
-                            # 英文转中文模式
-                            result = self.model.transcribe(
-                                self.audio_buffer,
-                                language='en',
-                                initial_prompt="This is English speech for translation."
-                            )
-                        else:
-                            # 中文转英文模式
-                            result = self.model.transcribe(
-                                self.audio_buffer,
-                                language='zh',
-                                initial_prompt="这是中文语音，需要转录。"
-                            )
-                        
-                        source_text = result['text'].strip()
-                        
-                        # 过滤短文本
-                        if self.AUDIO_TRANSLATION_MODE == "en_to_zh":
-                            if len(source_text) <= 3:
-                                continue
-                        else:
-                            if len(source_text) <= 1:
-                                continue
-                        
-                        # 翻译文本
-                        target_text = self.translate_with_quality_mode(source_text, self.AUDIO_TRANSLATION_MODE)
-                        
-                        # 将结果放入队列
-                        self.translation_queue.put((source_text, target_text))
-                        
-                    except Exception as e:
-                        print(f"转录或翻译错误: {e}")
-                        continue
-                        
-        except Exception as e:
-            print(f"音频录制错误: {e}")
-            self.translation_queue.put(("错误", f"音频录制失败: {str(e)}"))
+    def process_audio_chunk(self, audio_np):
+        """转录线程：处理采集到的音频块，返回待翻译文本列表
+
+        处理耗时与实际转录的音频时长交给实时率控制器，转录跟不上时自动降档；
+        vad/fixed模式下只有凑够一句话或一个窗口的音频块才会转录，其余块不计入统计。
+        流式模式下每块音频都可能重新转录正在增长的语句，按采集的音频时长计算
+        """
+        if self.pending_engine is not None:
+            self.swap_pending_engine()  # 音频块边界：切换到新加载的模型
+        
+        start = time.perf_counter()
+        self.transcribed_samples = len(audio_np) if self.streaming else 0
+        texts = self.transcribe_chunk(audio_np)
+        
+        controller = self.rtf_controller
+        if controller is not None and not self.model_loading and self.transcribed_samples:
+            # 模型切换期间的耗时不代表新档位，不计入统计
+            level = controller.record(self.transcribed_samples / self.SAMPLE_RATE, time.perf_counter() - start)
+            if level is not None:
+                self.apply_rtf_level(level)
+        return texts
+    
+    def transcribe_chunk(self, audio_np):
+        """处理一块音频，返回待翻译的 (文本, 翻译方向) 列表
+
+        vad模式下每当说话人停顿就转录这一句；fixed模式下凑够一个窗口间隔后转录整个窗口
+        """
+        if self.streaming:
+            # 转录有积压时跳过中间的流式转录，只在语句结束时转录，先追上实时
+            backlog = self.audio_pipeline is not None and not self.audio_pipeline.audio_queue.empty()
+            texts = []
+            for kind, text in self.streamer.feed(audio_np, decode_partial=not backlog):
+                if kind == "translate":
+                    texts.append((text, self.AUDIO_TRANSLATION_MODE))
+                    self.stream_queue.put(("break", ""))
+                else:
+                    self.stream_queue.put((kind, text))
+            return texts
+        
+        if self.SEGMENTATION_MODE == "vad":
+            texts = []
+            for utterance in self.segmenter.feed(audio_np):
+                if len(utterance.audio) < int(self.SAMPLE_RATE * self.MIN_AUDIO_LENGTH):
+                    continue
+                item = self.transcribe_audio(utterance.audio, start_time=utterance.start_sample / self.SAMPLE_RATE)
+                if item:
+                    texts.append(item)
+            return texts
+        
+        # 添加到环形缓冲区（容量固定为 window_history() 秒）
+        self.audio_buffer.append(audio_np)
+        if self.mel_features:
+            self.mel_features.feed(audio_np)  # 每块音频只计算一次梅尔帧，重叠部分直接复用
+        self.pending_samples += len(audio_np)
+        
+        # 新音频加上一窗口留下的尾部不足一个间隔时继续采集
+        if self.pending_samples < self.stitcher.samples_needed(int(self.SAMPLE_RATE * self.active_interval),
+                                                               self.SAMPLE_RATE):
+            return None
+        self.pending_samples = 0
+        
+        # 检查音频长度
+        if len(self.audio_buffer) < int(self.SAMPLE_RATE * self.MIN_AUDIO_LENGTH):
+            return None
+        
+        audio_window, window_start = self.stitcher.window(self.audio_buffer, int(self.SAMPLE_RATE * self.active_interval))
+        mel = self.mel_features.last(len(audio_window)) if self.mel_features else None
+        item = self.transcribe_audio(audio_window, window_start, mel)
+        return [item] if item else None
+    
+    def transcribe_audio(self, audio_window, window_start=None, mel=None, start_time=None):
+        """转录一段音频，过滤过短的结果，返回 (原文, 翻译方向) 或None
+
+        传入 window_start（环形缓冲区时钟上的秒数）时按时间戳只输出上一窗口没有输出过的文本；
+        start_time 为不需要拼接的音频（VAD语句）的起始时间，用于滚动提示判断静音和auto模式划分说话轮次
+        """
+        self.transcribed_samples += len(audio_window)
+        if window_start is not None:
+            start_time = window_start
+        end_time = start_time + len(audio_window) / self.SAMPLE_RATE if start_time is not None else None
+        
+        mode = self.AUDIO_TRANSLATION_MODE
+        router = self.language_router
+        language = router.language_for(start_time) if router is not None else self.audio_source_language()
+        result = self.transcribe_result(audio_window, mel, start_time, language)
+        if router is not None:
+            # 同一说话轮次内沿用已识别的语言，新轮次的语言由这次转录在编码器输出上识别
+            detected = result.get("language") or language
+            if self.context is not None and router.switched(detected):
+                self.context.reset("语言切换")
+            mode = router.route(detected, start_time, end_time, has_speech=bool(result["text"].strip()))
+            self.stitcher.language = source_language(mode)
+        
+        if window_start is None:
+            source_text = result['text'].strip()
+        else:
+            window_end = window_start + len(audio_window) / self.SAMPLE_RATE
+            source_text = self.stitcher.stitch(result, window_start, window_end).strip()
+        if self.context is not None:
+            self.context.update(result, source_text, end_time)
+        
+        # 过滤短文本
+        if mode == "en_to_zh":
+            if len(source_text) <= 3:
+                return None
+        else:
+            if len(source_text) <= 1:
+                return None
+        
+        return source_text, mode
+    
+    def audio_source_language(self):
+        """音频翻译的源语言，auto模式下为None"""
+        return source_language(self.AUDIO_TRANSLATION_MODE)
+    
+    def display_source(self, text, mode):
+        """界面上显示的原文，auto模式下标出识别的语言"""
+        if self.AUDIO_TRANSLATION_MODE != AUTO_MODE:
+            return text
+        return f"[{'EN' if mode == 'en_to_zh' else '中'}] {text}"
+    
+    def create_stitcher(self):
+        """固定窗口模式的拼接方式"""
+        if self.CARRY_TAIL:
+            return SegmentCommitter(self.audio_source_language() or "en", guard=self.COMMIT_GUARD,
+                                    max_carry=self.INTERVAL / 2)
+        return TranscriptStitcher(self.audio_source_language() or "en", overlap=self.OVERLAP)
+    
+    def window_history(self):
+        """固定窗口最长覆盖的秒数：一个间隔加重叠部分（留下尾部时窗口总长为一个间隔，多出的是最后一块音频的余量）"""
+        return self.INTERVAL + self.OVERLAP
+    
+    def transcribe_options(self, language=None):
+        """按源语言（默认为当前翻译模式的源语言）、质量模式（解码预设）和实时率档位返回语言之外的转录参数"""
+        options = preset_options(self.translation_model_type.get())
+        language = language or self.audio_source_language()
+        if language == "en":
+            options["initial_prompt"] = "This is English speech for translation."
+        elif language == "zh":
+            options["initial_prompt"] = "这是中文语音，需要转录。"
+        if self.rtf_controller is not None:
+            options = apply_level(options, self.rtf_controller.level)
+        return options
+    
+    def transcribe_result(self, audio_window, mel=None, start_time=None, language=None):
+        """按源语言转录一段音频，返回包含分段时间戳的完整结果
+
+        language 为None时（auto模式新的说话轮次）在中英文中识别语言；
+        mel 为增量计算好的梅尔谱时不再从音频重新计算；启用滚动提示时用它代替固定的 initial_prompt
+        """
+        options = self.transcribe_options(language)
+        if self.context is not None:
+            options["initial_prompt"] = self.context.text(start_time) or options.get("initial_prompt")
+        if language is None and self.language_router is not None:
+            options["language_candidates"] = self.language_router.languages
+        return self.engine.transcribe(audio_window, language=language, mel=mel, **options)
+            
+    def show_stream_event(self, kind, text):
+        """在原文区域显示流式事件：已提交文本正常显示，临时文本灰色显示在末尾"""
+        widget = self.audio_source_text
+        ranges = widget.tag_ranges("partial")
+        if ranges:
+            widget.delete(ranges[0], ranges[1])
+        
+        separator = " " if self.AUDIO_TRANSLATION_MODE == "en_to_zh" else ""
+        line_start = widget.get("end-2c", "end-1c") in ("", "\n")
+        if kind == "commit":
+            widget.insert(tk.END, ("" if line_start else separator) + text)
+        elif kind == "partial" and text:
+            widget.insert(tk.END, ("" if line_start else separator) + text, "partial")
+        elif kind == "break":
+            widget.insert(tk.END, "\n\n")
+        widget.see(tk.END)
             
     def update_audio_ui(self):
         """更新音频翻译UI"""
         try:
+            while not self.stream_queue.empty():
+                self.show_stream_event(*self.stream_queue.get_nowait())
+            
             while not self.translation_queue.empty():
                 source_text, target_text = self.translation_queue.get_nowait()
                 
-                # 更新源文本
-                self.audio_source_text.insert(tk.END, source_text + "\n\n")
-                self.audio_source_text.see(tk.END)
+                # 更新源文本（流式模式下原文已显示）
+                if source_text is not None:
+                    self.audio_source_text.insert(tk.END, source_text + "\n\n")
+                    self.audio_source_text.see(tk.END)
                 
                 # 更新目标文本
                 self.audio_target_text.insert(tk.END, target_text + "\n\n")
@@ -484,8 +896,15 @@ class IntegratedTranslator:
             messagebox.showwarning("警告", "请输入要翻译的文本")
             return
             
-        # 在新线程中执行翻译，避免界面卡顿
-        threading.Thread(target=self._text_translate_worker, args=(input_text,), daemon=True).start()
+        # 提交给翻译服务，完成后在界面线程中显示结果
+        try:
+            future = self.mt_service.submit(input_text, self.text_translation_mode.get(),
+                                            priority=PRIORITY_TEXT, block=False)
+        except queue.Full:
+            messagebox.showwarning("警告", "翻译请求过多，请稍后再试")
+            return
+        self.text_status_var.set("翻译中...")
+        future.add_done_callback(lambda future: self.root.after(0, self._on_text_translated, future))
         
     def initialize_offline_translation(self):
         """初始化离线翻译模型"""
@@ -494,98 +913,118 @@ class IntegratedTranslator:
             return
             
         try:
-            # 更新包索引
-            argostranslate.package.update_package_index()
-            available_packages = argostranslate.package.get_available_packages()
-            
-            # 检查并安装中英翻译包
-            zh_to_en_installed = False
-            en_to_zh_installed = False
-            
-            installed_packages = argostranslate.package.get_installed_packages()
-            for package in installed_packages:
-                if package.from_code == "zh" and package.to_code == "en":
-                    zh_to_en_installed = True
-                elif package.from_code == "en" and package.to_code == "zh":
-                    en_to_zh_installed = True
-            
-            # 安装缺失的翻译包
-            for package in available_packages:
-                if package.from_code == "zh" and package.to_code == "en" and not zh_to_en_installed:
-                    print("正在下载中文到英文翻译模型...")
-                    argostranslate.package.install_from_path(package.download())
-                    zh_to_en_installed = True
-                elif package.from_code == "en" and package.to_code == "zh" and not en_to_zh_installed:
-                    print("正在下载英文到中文翻译模型...")
-                    argostranslate.package.install_from_path(package.download())
-                    en_to_zh_installed = True
-            
-            self.translation_ready = zh_to_en_installed and en_to_zh_installed
-            if self.translation_ready:
-                print("离线翻译模型初始化完成")
-            else:
-                print("警告: 部分翻译模型未能安装")
+            # 先查本地清单、已安装的翻译包和本地 .argosmodel 目录，不访问网络
+            missing = ensure_local_packages(package_dir=self.ARGOS_PACKAGE_DIR)
+            if missing and self.DOWNLOAD_MISSING_MODELS:
+                print(f"缺少翻译包 {missing}，正在后台下载，完成前使用备用翻译方案")
+                start_download(self.on_models_downloaded)
+                return
+            self.load_translators(missing)
                 
         except Exception as e:
             print(f"离线翻译初始化失败: {e}")
             self.translation_ready = False
     
+    def on_models_downloaded(self, missing, error):
+        """后台下载翻译包结束（在下载线程中调用，翻译对象也在该线程中预热，不阻塞界面）"""
+        if error is not None:
+            print(f"翻译包下载失败: {error}")
+            return
+        try:
+            self.load_translators(missing)
+        except Exception as e:
+            print(f"离线翻译初始化失败: {e}")
+    
+    def load_translators(self, missing):
+        """翻译包齐全时解析并预热翻译对象"""
+        if not missing:
+            self.translators.load()
+        self.translation_ready = self.translators.ready
+        if self.translation_ready:
+            print("离线翻译模型初始化完成")
+        else:
+            print(f"警告: 缺少翻译包 {missing}")
+    
     def translate_with_quality_mode(self, text, mode):
-        """根据质量模式翻译文本"""
+        """根据质量模式翻译文本；离线模型就绪时译文按 (原文, 翻译方向, 质量模式) 缓存"""
         try:
             quality = self.translation_model_type.get().split()[0]  # 提取质量级别
-            
-            # 根据质量模式选择不同的翻译策略
-            if quality == "fast":
-                # 快速模式：直接翻译
-                if mode == "en_to_zh":
-                    if self.translation_ready:
-                        return argostranslate.translate.translate(text, "en", "zh")
-                    else:
-                        return f"[快速翻译] {text}"  # 备用方案
-                else:
-                    if self.translation_ready:
-                        return argostranslate.translate.translate(text, "zh", "en")
-                    else:
-                        return f"[Fast Translation] {text}"  # 备用方案
-            
-            elif quality == "balanced":
-                # 平衡模式：分句翻译
-                sentences = self.split_sentences(text)
-                translated_sentences = []
-                
-                for sentence in sentences:
-                    if mode == "en_to_zh":
-                        if self.translation_ready:
-                            translated = argostranslate.translate.translate(sentence.strip(), "en", "zh")
-                        else:
-                            translated = f"[平衡翻译] {sentence.strip()}"
-                    else:
-                        if self.translation_ready:
-                            translated = argostranslate.translate.translate(sentence.strip(), "zh", "en")
-                        else:
-                            translated = f"[Balanced Translation] {sentence.strip()}"
-                    translated_sentences.append(translated)
-                
-                return " ".join(translated_sentences)
-            
-            else:  # accurate
-                # 精确模式：多次翻译取最佳结果
-                if self.translation_ready:
-                    if mode == "en_to_zh":
-                        result1 = argostranslate.translate.translate(text, "en", "zh")
-                        # 可以添加更多翻译引擎的结果进行比较
-                        return result1
-                    else:
-                        result1 = argostranslate.translate.translate(text, "zh", "en")
-                        return result1
-                else:
-                    return f"[精确翻译] {text}" if mode == "en_to_zh" else f"[Accurate Translation] {text}"
+            if not self.translation_ready:
+                return self._translate_with_quality_mode(text, mode, quality)  # 备用方案的结果不缓存
+            translation = self.translation_cache.get(text, mode, quality)
+            if translation is None:
+                translation, cacheable = self.translate_with_memory(text, mode, quality)
+                if cacheable:
+                    self.translation_cache.put(text, mode, quality, translation)
+            return translation
                     
         except Exception as e:
             print(f"翻译错误: {e}")
             return f"翻译失败: {text}"
     
+    def translate_with_memory(self, text, mode, quality):
+        """翻译记忆中有相同的原文时直接使用其译文，否则运行翻译模型并记入翻译记忆
+
+        返回 (译文, 是否可以放入翻译缓存)：宽松匹配得到的译文不放入缓存
+        """
+        if self.translation_memory is None:
+            return self._translate_with_quality_mode(text, mode, quality), True
+        translation, fuzzy = self.translation_memory.translate(
+            text, mode, quality, lambda source: self._translate_with_quality_mode(source, mode, quality))
+        return translation, not fuzzy
+    
+    def open_translation_memory(self):
+        """打开持久化翻译记忆，失败时只使用进程内缓存"""
+        if not self.TRANSLATION_MEMORY_PATH:
+            return None
+        try:
+            memory = TranslationMemory(self.TRANSLATION_MEMORY_PATH, fuzzy_threshold=self.TM_FUZZY_THRESHOLD)
+            print(f"翻译记忆: {self.TRANSLATION_MEMORY_PATH}（{len(memory)} 条）")
+            return memory
+        except Exception as e:
+            print(f"翻译记忆打开失败，只使用进程内缓存: {e}")
+            return None
+    
+    def _translate_with_quality_mode(self, text, mode, quality):
+        """按质量模式实际调用翻译模型，出错时抛出异常（不缓存）"""
+        # 根据质量模式选择不同的翻译策略
+        if quality == "fast":
+            # 快速模式：直接翻译
+            if mode == "en_to_zh":
+                if self.translation_ready:
+                    return self.translators.translate(text, mode)
+                else:
+                    return f"[快速翻译] {text}"  # 备用方案
+            else:
+                if self.translation_ready:
+                    return self.translators.translate(text, mode)
+                else:
+                    return f"[Fast Translation] {text}"  # 备用方案
+        
+        elif quality == "balanced":
+            # 平衡模式：分句后在一次模型调用中批量翻译，译文保持原来的句子顺序
+            sentences = self.split_sentences(text)
+            if self.translation_ready:
+                translated_sentences = self.batch_translator.translate(sentences, mode)
+            else:
+                label = "[平衡翻译]" if mode == "en_to_zh" else "[Balanced Translation]"
+                translated_sentences = [f"{label} {sentence.strip()}" for sentence in sentences]
+            
+            return " ".join(translated_sentences)
+        
+        else:  # accurate
+            # 精确模式：多次翻译取最佳结果
+            if self.translation_ready:
+                if mode == "en_to_zh":
+                    result1 = self.translators.translate(text, mode)
+                    # 可以添加更多翻译引擎的结果进行比较
+                    return result1
+                else:
+                    result1 = self.translators.translate(text, mode)
+                    return result1
+            else:
+                return f"[精确翻译] {text}" if mode == "en_to_zh" else f"[Accurate Translation] {text}"
+    
     def split_sentences(self, text):
         """分割句子"""
         import re
@@ -593,23 +1032,19 @@ class IntegratedTranslator:
         sentences = re.split(r'[.!?。！？]', text)
         return [s.strip() for s in sentences if s.strip()]
     
-    def _text_translate_worker(self, text):
-        """文本翻译工作线程"""
+    def _on_text_translated(self, future):
+        """文本翻译请求完成（在界面线程中调用）"""
         try:
-            self.text_status_var.set("翻译中...")
-            
-            # 使用新的翻译方法
-            mode = self.text_translation_mode.get()
-            translated = self.translate_with_quality_mode(text, mode)
+            translated = future.result()
             
             # 更新输出文本区域
-            self.root.after(0, self._update_text_output, translated)
-            self.root.after(0, lambda: self.text_status_var.set("翻译完成"))
+            self._update_text_output(translated)
+            self.text_status_var.set(f"翻译完成 | {self.translation_cache.summary()}")
             
         except Exception as e:
             error_msg = f"翻译失败: {str(e)}"
-            self.root.after(0, lambda: self.text_status_var.set(error_msg))
-            self.root.after(0, lambda: messagebox.showerror("错误", error_msg))
+            self.text_status_var.set(error_msg)
+            messagebox.showerror("错误", error_msg)
             
     def _update_text_output(self, translated_text):
         """更新文本输出区域"""
@@ -619,8 +1054,11 @@ class IntegratedTranslator:
         self.text_output_text.config(state=tk.DISABLED)
         
     def run(self):
-        """运行应用程序"""
+        """运行应用程序，退出时停止翻译服务，并把尚未写入的翻译记忆写入数据库"""
         self.root.mainloop()
+        self.mt_service.shutdown(timeout=5)
+        if self.translation_memory is not None:
+            self.translation_memory.close()
 
 def main():
     """主函数"""
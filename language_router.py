@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+中英双向会话的语言路由
+auto 模式下每句话用Whisper在已经算好的编码器输出上识别语言（不额外编码），
+再按识别结果选择英译中或中译英。同一说话轮次（语句之间停顿不超过 turn_gap 秒）
+内复用第一次的识别结果，轮次结束或超过 max_turn 秒后重新识别。
+"""
+
+# 识别出的语言 -> 翻译方向
+DIRECTIONS = {"en": "en_to_zh", "zh": "zh_to_en"}
+AUTO_MODE = "auto"
+
+
+def source_language(mode):
+    """翻译方向对应的源语言，auto 模式返回None（由Whisper识别）"""
+    if mode == AUTO_MODE:
+        return None
+    return 'en' if mode == "en_to_zh" else 'zh'
+
+
+class LanguageRouter:
+    """按说话轮次缓存识别出的语言
+
+    language_for(start) 在转录前调用：仍在当前轮次内时返回缓存的语言，否则返回None表示需要识别；
+    route(language, start, end, has_speech) 在转录后调用，返回这一段的翻译方向。
+    """
+
+    def __init__(self, languages=("en", "zh"), turn_gap=2.0, max_turn=30.0):
+        """
+        languages: 候选语言（同时作为 transcribe 的 language_candidates），须在 DIRECTIONS 中
+        turn_gap: 两句话之间的停顿超过该时长（秒）视为新的说话轮次
+        max_turn: 一个轮次最长复用识别结果的时长（秒），到时重新识别，避免换人说话没有停顿时一直用错语言
+        """
+        self.languages = tuple(languages)
+        self.turn_gap = turn_gap
+        self.max_turn = max_turn
+        self.detections = 0  # 实际识别的次数
+        self.switches = 0  # 语言切换次数
+        self.reset()
+
+    def reset(self):
+        self.language = None  # 当前轮次的语言，None表示下一段需要识别
+        self._last_language = None
+        self._turn_start = None
+        self._last_end = None
+
+    def end_turn(self):
+        """结束当前说话轮次（例如跳过了一段静音），下一段重新识别语言"""
+        self.language = None
+
+    def language_for(self, start=None):
+        """转录从 start 秒开始的音频前调用，返回缓存的语言或None（需要识别）"""
+        if self.language is None or start is None or self._last_end is None:
+            return None
+        if start - self._last_end > self.turn_gap or start - self._turn_start > self.max_turn:
+            self.end_turn()  # 新的说话轮次
+        return self.language
+
+    def route(self, language, start=None, end=None, has_speech=True):
+        """记录一段转录的语言，返回其翻译方向
+
+        has_speech=False（没有转录出文本）时结束当前轮次，下一段重新识别
+        """
+        if language not in self.languages:
+            language = self.languages[0]
+        if not has_speech:
+            self.end_turn()
+            return DIRECTIONS[language]
+
+        if self.language is None:
+            # 新轮次的第一段：语言是刚识别出来的
+            self.detections += 1
+            if self._last_language is not None and language != self._last_language:
+                self.switches += 1
+                print(f"[语言] 切换为 {language}")
+            self._turn_start = start
+            self.language = language
+        self._last_language = language
+        self._last_end = end
+        return DIRECTIONS[language]
+
+    def switched(self, language):
+        """language 与上一段的语言不同（用于切换时清空上下文）"""
+        return self._last_language is not None and language != self._last_language
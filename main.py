@@ -1,13 +1,22 @@
-import soundcard as sc
 import numpy as np
-import whisper
 import translators as ts
 import torch
 import os
 import sys
 import time
+import argparse
 import threading
 import queue
+from audio_sources import (AudioSourceExhausted, ReplaySource, SyntheticSource,
+                           default_loopback_source, list_soundcard_sources)
+from ring_buffer import AudioRingBuffer
+from vad import UtteranceSegmenter
+from stitching import TranscriptStitcher, SegmentCommitter
+from prompt_context import RollingPrompt
+from decoding_presets import QUALITY_MODES, preset_options
+from language_router import AUTO_MODE, LanguageRouter, source_language as mode_source_language
+from whisper_decode import IncrementalLogMel
+from asr_engine import ASR_BACKENDS, create_engine
 
 # --- Configuration ---
 SAMPLE_RATE = 16000  # Whisper model's required sample rate
@@ -16,7 +25,73 @@ OVERLAP = 1  # seconds - 重叠时间，确保句子不被截断
 MODEL_SIZE = "small" # "tiny", "base", "small", "medium", "large" - 使用更准确的模型
 FORCE_CPU = False  # 启用GPU模式，提升性能
 MIN_AUDIO_LENGTH = 1.0  # 最小音频长度（秒），过短的音频片段将被跳过
-TRANSLATION_MODE = "en_to_zh"  # "en_to_zh" (英文转中文) 或 "zh_to_en" (中文转英文)
+TRANSLATION_MODE = "en_to_zh"  # "en_to_zh" (英文转中文)、"zh_to_en" (中文转英文) 或 "auto" (每句识别中英文并选择方向)
+SEGMENTATION_MODE = "vad"  # "vad" (按语音停顿切分) 或 "fixed" (固定INTERVAL/OVERLAP窗口)
+VAD_BLOCK = 0.5  # seconds - VAD模式下每次录制的时长
+VAD_MAX_UTTERANCE = 15  # seconds - 单句最长时长，超过后强制切分
+VAD_HANGOVER = 0.5  # seconds - 连续静音超过该时长视为一句话结束
+STREAMING = False  # 流式字幕：说话过程中定期重新转录，临时结果以灰色显示（需要vad分句）
+STREAM_STEP = 0.5  # seconds - 流式模式下两次重新转录的间隔
+CARRY_TAIL = True  # 固定窗口模式下只提交远离窗口末尾的分段，未完成的句子连同音频留到下一窗口；False时使用OVERLAP重叠去重
+COMMIT_GUARD = 1.0  # seconds - 结束时间距窗口末尾不足该值的分段留到下一窗口
+ROLLING_PROMPT = True  # 用最近提交的转录文本作为下一次转录的提示，False时每次使用固定的initial_prompt
+PROMPT_MAX_TOKENS = 48  # 滚动提示最多保留的token数，越长解码越慢
+TRIM_ENCODER = True  # 编码器只处理真实音频长度而不是补零到30秒，False时使用原始的model.transcribe
+CPU_INT8 = True  # CPU推理时对线性层做动态int8量化，GPU上不生效
+ASR_BACKEND = "whisper"  # "whisper" (openai-whisper) 或 "faster-whisper" (CTranslate2)
+ASR_THREADS = 0  # faster-whisper每次推理使用的CPU线程数，0为自动
+QUALITY_MODE = "balanced"  # 解码预设: "fast"、"balanced" 或 "accurate"，限制温度回退次数和每块的解码时间
+DRAFT_MODEL = None  # 投机解码的草稿模型（例如 "tiny"），贪心解码时由它猜token、MODEL_SIZE模型验证，输出不变；None关闭
+
+def parse_args():
+    """
+    命令行参数：不带参数时与原来一样交互选择模式并捕获系统音频
+    """
+    parser = argparse.ArgumentParser(description="实时音频翻译 (命令行版)")
+    parser.add_argument("--mode", choices=["en_to_zh", "zh_to_en", AUTO_MODE], help="翻译模式，不指定时交互选择")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--wav", help="回放WAV文件代替声卡采集")
+    source.add_argument("--synthetic", action="store_true", help="使用合成测试信号代替声卡采集")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="回放/合成音频的速度倍数，0表示不限速（用于测吞吐量）")
+    parser.add_argument("--duration", type=float, default=60.0, help="合成信号时长（秒）")
+    parser.add_argument("--stream", action="store_true", help="启用流式字幕（临时结果灰色显示）")
+    parser.add_argument("--no-trim", action="store_true", help="使用原始的30秒补零编码路径（用于对比）")
+    parser.add_argument("--no-int8", action="store_true", help="CPU推理时不做int8量化，保持fp32")
+    parser.add_argument("--backend", choices=ASR_BACKENDS, help="语音识别引擎")
+    parser.add_argument("--threads", type=int, help="faster-whisper每次推理使用的CPU线程数")
+    parser.add_argument("--quality", choices=QUALITY_MODES, help="解码预设（温度回退次数和解码时间预算）")
+    parser.add_argument("--draft", help="投机解码的草稿模型，例如 tiny（仅whisper引擎的贪心解码）")
+    return parser.parse_args()
+
+def open_audio_source(args):
+    """
+    根据命令行参数选择音频源，声卡不可用时返回None
+    """
+    if args.wav:
+        return ReplaySource.from_wav(args.wav, speed=args.speed)
+    if args.synthetic:
+        return SyntheticSource(SAMPLE_RATE, speed=args.speed, duration=args.duration)
+
+    # Get the default speaker for loopback recording (system audio)
+    try:
+        source = default_loopback_source()
+        print(f"Capturing audio from: {source.name}")
+        return source
+    except Exception as e:
+        print(f"Error getting default speaker loopback: {e}")
+        # Fallback: try to find any loopback microphone
+        try:
+            loopback_mics = list_soundcard_sources(include_loopback=True)
+        except Exception as sc_error:
+            print(f"声卡不可用: {sc_error}")
+            return None
+        loopback_mics = [mic for mic in loopback_mics if 'loopback' in mic.name.lower() or 'stereo mix' in mic.name.lower()]
+        if not loopback_mics:
+            print("No loopback devices found. Please enable 'Stereo Mix' or similar in your audio settings.")
+            return None
+        print(f"Using loopback device: {loopback_mics[0].name}")
+        return loopback_mics[0]
 
 def get_translation_mode():
     """
@@ -25,23 +100,173 @@ def get_translation_mode():
     print("请选择翻译模式:")
     print("1. 英文转中文 (English to Chinese)")
     print("2. 中文转英文 (Chinese to English)")
+    print("3. 自动识别中英文 (Auto)")
     
     while True:
-        choice = input("请输入选择 (1 或 2): ").strip()
+        choice = input("请输入选择 (1、2 或 3): ").strip()
         if choice == "1":
             return "en_to_zh"
         elif choice == "2":
             return "zh_to_en"
+        elif choice == "3":
+            return AUTO_MODE
         else:
-            print("无效选择，请输入 1 或 2")
+            print("无效选择，请输入 1、2 或 3")
+
+def source_language(mode=None):
+    """
+    翻译模式（默认为当前翻译模式）下的源语言，auto模式下为None（由Whisper识别）
+    """
+    return mode_source_language(mode or TRANSLATION_MODE)
+
+def transcribe_options(language=None):
+    """
+    按源语言（默认为当前翻译模式的源语言）返回语言之外的转录参数，语言未知时不使用固定提示
+    """
+    language = language or source_language()
+    if language == "en":
+        initial_prompt = "This is a conversation in English."  # 提供上下文提示
+    elif language == "zh":
+        initial_prompt = "这是一段中文对话。"  # 提供中文上下文提示
+    else:
+        initial_prompt = None
+    
+    return dict(
+        fp16=torch.cuda.is_available(),
+        task='transcribe',  # 明确指定任务
+        **preset_options(QUALITY_MODE),  # 解码预设：温度、beam/best_of、回退次数和解码时间预算
+        length_penalty=1.0,  # 不惩罚长句子
+        suppress_tokens="-1",  # 不抑制任何token
+        initial_prompt=initial_prompt
+    )
+
+def transcribe_result(engine, audio_data, mel=None, context=None, at=None, router=None):
+    """
+    按当前翻译模式转录一段音频，返回包含分段时间戳的完整结果
+    mel为增量计算好的梅尔谱时不再从音频重新计算
+    context为滚动提示（RollingPrompt）时用它代替固定的initial_prompt，at为这段音频的起始时间（秒）
+    router为语言路由（auto模式）时，新的说话轮次在候选语言中识别语言，识别结果在返回值的"language"中
+    """
+    language = router.language_for(at) if router is not None else source_language()
+    options = transcribe_options(language)
+    if context is not None:
+        options["initial_prompt"] = context.text(at) or options["initial_prompt"]
+    if language is None and router is not None:
+        options["language_candidates"] = router.languages
+    return engine.transcribe(audio_data, language=language, mel=mel, **options)
+
+def translate_and_print(source_text, timestamp=None, mode=None):
+    """
+    按翻译方向（默认为当前翻译模式）翻译文本并打印译文
+    """
+    timestamp = timestamp or time.strftime("%H:%M:%S")
+    try:
+        if (mode or TRANSLATION_MODE) == "en_to_zh":
+            # 翻译为中文
+            target_text = ts.translate_text(source_text, from_language='en', to_language='zh-CN')
+            print(f"[{timestamp}] Chinese: {target_text}")
+        else:
+            # 翻译为英文
+            target_text = ts.translate_text(source_text, from_language='zh-CN', to_language='en')
+            print(f"[{timestamp}] English: {target_text}")
+    except Exception as e:
+        print(f"[{timestamp}] 翻译失败: {e}")
+
+def create_stitcher():
+    """固定窗口模式的拼接方式，返回 (拼接器, 环形缓冲区需要容纳的秒数)"""
+    language = source_language() or 'en'  # auto模式下每个窗口转录后按识别结果更新
+    if CARRY_TAIL:
+        # 尾部最多留半个间隔，每次只录制补足一个间隔的新音频，窗口不超过 INTERVAL + OVERLAP
+        return SegmentCommitter(language, guard=COMMIT_GUARD, max_carry=INTERVAL / 2), INTERVAL + OVERLAP
+    return TranscriptStitcher(language, overlap=OVERLAP), INTERVAL + OVERLAP
+
+def transcribe_and_translate(engine, audio_data, stitcher=None, window_start=0.0, mel=None, final=False,
+                             context=None, router=None):
+    """
+    转录一段音频并翻译，结果直接打印
+    传入stitcher时，按窗口起始时间（秒）只输出上一窗口没有输出过的文本；final表示最后一个窗口
+    传入context时以滚动提示转录，输出的文本再加入上下文
+    传入router时（auto模式）按识别出的语言选择翻译方向
+    """
+    result = transcribe_result(engine, audio_data, mel, context, window_start, router)
+    window_end = window_start + len(audio_data) / SAMPLE_RATE
+    mode = TRANSLATION_MODE
+    if router is not None:
+        detected = result.get("language")
+        if context is not None and router.switched(detected):
+            context.reset("语言切换")
+        mode = router.route(detected, window_start, window_end, has_speech=bool(result.get("text", "").strip()))
+        if stitcher is not None:
+            stitcher.language = source_language(mode)
+    if stitcher is not None:
+        source_text = stitcher.stitch(result, window_start, window_end, final=final).strip()
+    else:
+        source_text = result.get("text", "").strip()
+    if context is not None:
+        context.update(result, source_text, window_end)
+    
+    # 过滤过短的转录结果，中文字符较短，调整过滤条件
+    min_length = 3 if mode == "en_to_zh" else 1
+    if not source_text or len(source_text) <= min_length:
+        return
+    
+    timestamp = time.strftime("%H:%M:%S")
+    source_name = "English" if mode == "en_to_zh" else "Chinese"
+    print(f"\n[{timestamp}] {source_name}: {source_text}")
+    translate_and_print(source_text, timestamp, mode)
+
+def print_stream_events(events, state):
+    """
+    显示流式转录事件：已提交文本正常显示，临时文本以灰色显示在同一行末尾，
+    凑成完整句子的已提交文本送去翻译
+    """
+    for kind, text in events:
+        if kind == "commit":
+            separator = "" if TRANSLATION_MODE == "zh_to_en" or not state["line"] else " "
+            state["line"] += separator + text
+        elif kind == "partial":
+            state["partial"] = text
+        elif kind == "translate":
+            print(f"\r\033[K{state['line']}")
+            state["line"] = ""
+            state["partial"] = ""
+            translate_and_print(text)
+            continue
+        print(f"\r\033[K{state['line']} \033[90m{state['partial']}\033[0m", end="", flush=True)
+
+def transcribe_utterance(engine, utterance, context=None, router=None):
+    """
+    VAD切出的一句话：过滤过短片段，音量标准化后转录并翻译
+    """
+    audio_data = utterance.audio
+    if len(audio_data) < SAMPLE_RATE * MIN_AUDIO_LENGTH:
+        return
+    max_val = np.max(np.abs(audio_data))
+    if max_val > 0:
+        audio_data *= 0.8 / max_val  # 标准化到80%音量
+    transcribe_and_translate(engine, audio_data, window_start=utterance.start_sample / SAMPLE_RATE, context=context,
+                             router=router)
 
 def main():
     """
     Main function to capture, transcribe, and translate audio.
     """
+    args = parse_args()
+    
     # 获取翻译模式
-    global TRANSLATION_MODE
-    TRANSLATION_MODE = get_translation_mode()
+    global TRANSLATION_MODE, STREAMING, TRIM_ENCODER, CPU_INT8, ASR_BACKEND, ASR_THREADS, QUALITY_MODE, DRAFT_MODEL
+    STREAMING = STREAMING or args.stream
+    TRIM_ENCODER = TRIM_ENCODER and not args.no_trim
+    CPU_INT8 = CPU_INT8 and not args.no_int8
+    ASR_BACKEND = args.backend or ASR_BACKEND
+    ASR_THREADS = ASR_THREADS if args.threads is None else args.threads
+    QUALITY_MODE = args.quality or QUALITY_MODE
+    DRAFT_MODEL = args.draft or DRAFT_MODEL
+    TRANSLATION_MODE = args.mode or get_translation_mode()
+    if TRANSLATION_MODE == AUTO_MODE and STREAMING:
+        # 流式字幕在一句话说完之前就要显示，需要事先确定源语言
+        print("auto模式下每句话结束后才能识别语言，已关闭流式字幕")
+        STREAMING = False
     # --- Initialization ---
     print("Initializing...")
     
@@ -64,137 +289,125 @@ def main():
 
     # Load Whisper model
     print(f"Loading Whisper model ({MODEL_SIZE})...")
-    model = whisper.load_model(MODEL_SIZE, device=device)
+    engine = create_engine(ASR_BACKEND, MODEL_SIZE, device, int8=CPU_INT8,
+                           trim_encoder=TRIM_ENCODER, intra_threads=ASR_THREADS, draft_model=DRAFT_MODEL)
+    print(f"识别引擎: {engine.name}")
+    print(f"模型预热完成，耗时 {engine.warmup(language=source_language() or 'en'):.1f} 秒")
     
-    # Get the default speaker for loopback recording (system audio)
-    try:
-        default_speaker = sc.get_microphone(sc.default_speaker().name, include_loopback=True)
-        print(f"Capturing audio from: {default_speaker.name}")
-    except Exception as e:
-        print(f"Error getting default speaker loopback: {e}")
-        # Fallback: try to find any loopback microphone
-        loopback_mics = sc.all_microphones(include_loopback=True)
-        loopback_mics = [mic for mic in loopback_mics if 'loopback' in mic.name.lower() or 'stereo mix' in mic.name.lower()]
-        if not loopback_mics:
-            print("No loopback devices found. Please enable 'Stereo Mix' or similar in your audio settings.")
-            return
-        default_speaker = loopback_mics[0]
-        print(f"Using loopback device: {default_speaker.name}")
+    # 选择音频源：系统音频回环、WAV回放或合成信号
+    audio_source = open_audio_source(args)
+    if audio_source is None:
+        return
+    print(f"音频源: {audio_source.name}")
 
     # --- Main Loop ---
     print("\n--- Starting Real-time Translation ---")
     if TRANSLATION_MODE == "en_to_zh":
         print("模式: 英文转中文 - Playing audio on your system. The English transcription and Chinese translation will appear below.")
-    else:
+    elif TRANSLATION_MODE == "zh_to_en":
         print("模式: 中文转英文 - Playing audio on your system. The Chinese transcription and English translation will appear below.")
+    else:
+        print("模式: 自动识别中英文 - Each utterance is transcribed in the detected language and translated the other way.")
+    
+    # 固定窗口模式下去掉重复转录的文本（或把未完成的句子留到下一窗口）
+    stitcher, window_history = create_stitcher()
+    # 音频环形缓冲区保存上一窗口的重叠部分或未提交的尾部
+    audio_buffer = AudioRingBuffer(SAMPLE_RATE * window_history, SAMPLE_RATE)
+    # 语音端点检测，只把完整的语句送入Whisper
+    segmenter = UtteranceSegmenter(SAMPLE_RATE, max_utterance=VAD_MAX_UTTERANCE, hangover=VAD_HANGOVER)
+    # 滚动提示：最近提交的文本作为下一次转录的上下文
+    context = (RollingPrompt(transcribe_options()["initial_prompt"], max_tokens=PROMPT_MAX_TOKENS)
+               if ROLLING_PROMPT else None)
+    # auto模式下按说话轮次识别语言、选择翻译方向
+    router = LanguageRouter() if TRANSLATION_MODE == AUTO_MODE else None
+    # 流式转录在VAD语句内部每STREAM_STEP秒重新转录一次（auto模式下不使用）
+    streamer = engine.stream(segmenter, source_language() or 'en', step=STREAM_STEP, normalize=0.8, context=context,
+                             **transcribe_options())
+    stream_state = {"line": "", "partial": ""}
+    # 固定窗口模式下梅尔谱增量计算，重叠部分不再重复做STFT
+    mel_features = IncrementalLogMel(engine.n_mels, history=window_history) if engine.n_mels else None
     
-    # 音频缓冲区用于重叠录制
-    audio_buffer = np.array([], dtype=np.float32)
+    # 吞吐量统计，便于在不同版本之间对比
+    captured_samples = 0
+    start_time = time.perf_counter()
     
-    with default_speaker.recorder(samplerate=SAMPLE_RATE, channels=1) as recorder:
+    with audio_source.recorder(samplerate=SAMPLE_RATE, channels=1) as recorder:
         while True:
             try:
+                if SEGMENTATION_MODE == "vad":
+                    # 短块录制并送入VAD，说话人停顿时立即转录这一句
+                    data = recorder.record(numframes=int(SAMPLE_RATE * VAD_BLOCK))
+                    captured_samples += len(data)
+                    if STREAMING:
+                        print_stream_events(streamer.feed(data.astype(np.float32).reshape(-1)), stream_state)
+                        continue
+                    for utterance in segmenter.feed(data.astype(np.float32).reshape(-1)):
+                        transcribe_utterance(engine, utterance, context, router)
+                    continue
+                
                 # Record audio from system output for the given interval
-                data = recorder.record(numframes=SAMPLE_RATE * INTERVAL)
+                data = recorder.record(numframes=stitcher.samples_needed(SAMPLE_RATE * INTERVAL, SAMPLE_RATE))
+                captured_samples += len(data)
                 
                 # 检查音频数据质量
                 if len(data) == 0 or np.max(np.abs(data)) < 0.001:
+                    if context is not None:
+                        context.reset("静音")  # 跳过的静音不计入样本时钟，直接清空上下文
+                    if router is not None:
+                        router.end_turn()
                     continue  # 跳过静音或无效数据
                 
                 # Convert to float32 numpy array
-                current_audio = data.astype(np.float32).flatten()
+                current_audio = data.astype(np.float32).reshape(-1)
                 
-                # 音频预处理：音量标准化
+                # 音频预处理：音量标准化（原地缩放，避免额外分配）
                 max_val = np.max(np.abs(current_audio))
                 if max_val > 0:
-                    current_audio = current_audio / max_val * 0.8  # 标准化到80%音量
-                
-                # 实现重叠录制：将当前音频与缓冲区合并
-                if len(audio_buffer) > 0:
-                    # 保留上一段音频的重叠部分
-                    overlap_samples = int(SAMPLE_RATE * OVERLAP)
-                    if len(audio_buffer) >= overlap_samples:
-                        overlap_audio = audio_buffer[-overlap_samples:]
-                        # 合并重叠音频和当前音频
-                        audio_data = np.concatenate([overlap_audio, current_audio])
-                    else:
-                        audio_data = np.concatenate([audio_buffer, current_audio])
-                else:
-                    audio_data = current_audio
+                    current_audio *= 0.8 / max_val  # 标准化到80%音量
                 
-                # 更新缓冲区
-                audio_buffer = current_audio
+                # 写入环形缓冲区后直接取"上一段重叠部分（或未提交的尾部） + 当前音频"的视图
+                audio_buffer.append(current_audio)
+                if mel_features:
+                    mel_features.feed(current_audio)
+                audio_data, window_start = stitcher.window(audio_buffer, len(current_audio))
+                mel = mel_features.last(len(audio_data)) if mel_features else None
                 
                 # 检查音频长度是否足够
                 audio_duration = len(audio_data) / SAMPLE_RATE
                 if audio_duration < MIN_AUDIO_LENGTH:
                     continue
 
-                # 根据翻译模式进行转录和翻译
-                if TRANSLATION_MODE == "en_to_zh":
-                    # 英文转中文模式
-                    result = model.transcribe(
-                        audio_data, 
-                        fp16=torch.cuda.is_available(),
-                        language='en',  # 明确指定语言为英文
-                        task='transcribe',  # 明确指定任务
-                        temperature=0.0,  # 降低随机性
-                        best_of=1,  # 减少计算量但保持质量
-                        beam_size=1,  # 简化beam search
-                        patience=1.0,  # 提高耐心等待完整句子
-                        length_penalty=1.0,  # 不惩罚长句子
-                        suppress_tokens="-1",  # 不抑制任何token
-                        initial_prompt="This is a conversation in English."  # 提供上下文提示
-                    )
-                    source_text = result.get("text", "").strip()
-                    
-                    if source_text and len(source_text) > 3:  # 过滤过短的转录结果
-                        timestamp = time.strftime("%H:%M:%S")
-                        print(f"\n[{timestamp}] English: {source_text}")
-                        
-                        # 翻译为中文
-                        try:
-                            target_text = ts.translate_text(source_text, from_language='en', to_language='zh-CN')
-                            print(f"[{timestamp}] Chinese: {target_text}")
-                        except Exception as e:
-                            print(f"[{timestamp}] 翻译失败: {e}")
-                            continue
-                            
-                else:
-                    # 中文转英文模式
-                    result = model.transcribe(
-                        audio_data, 
-                        fp16=torch.cuda.is_available(),
-                        language='zh',  # 明确指定语言为中文
-                        task='transcribe',  # 明确指定任务
-                        temperature=0.0,  # 降低随机性
-                        best_of=1,  # 减少计算量但保持质量
-                        beam_size=1,  # 简化beam search
-                        patience=1.0,  # 提高耐心等待完整句子
-                        length_penalty=1.0,  # 不惩罚长句子
-                        suppress_tokens="-1",  # 不抑制任何token
-                        initial_prompt="这是一段中文对话。"  # 提供中文上下文提示
-                    )
-                    source_text = result.get("text", "").strip()
-                    
-                    if source_text and len(source_text) > 1:  # 中文字符较短，调整过滤条件
-                        timestamp = time.strftime("%H:%M:%S")
-                        print(f"\n[{timestamp}] Chinese: {source_text}")
-                        
-                        # 翻译为英文
-                        try:
-                            target_text = ts.translate_text(source_text, from_language='zh-CN', to_language='en')
-                            print(f"[{timestamp}] English: {target_text}")
-                        except Exception as e:
-                            print(f"[{timestamp}] 翻译失败: {e}")
-                            continue
+                # 根据翻译模式进行转录和翻译，只输出上一窗口没有输出过的文本
+                transcribe_and_translate(engine, audio_data, stitcher, window_start, mel, context=context, router=router)
 
+            except AudioSourceExhausted:
+                # 回放结束：转录尚未结束的最后一句
+                if SEGMENTATION_MODE == "vad" and STREAMING:
+                    print_stream_events(streamer.flush(), stream_state)
+                elif SEGMENTATION_MODE == "fixed" and CARRY_TAIL:
+                    audio_data, window_start = stitcher.window(audio_buffer, 0)
+                    if len(audio_data) >= SAMPLE_RATE * MIN_AUDIO_LENGTH:
+                        mel = mel_features.last(len(audio_data)) if mel_features else None
+                        transcribe_and_translate(engine, audio_data, stitcher, window_start, mel, final=True,
+                                                 context=context, router=router)
+                else:
+                    utterance = segmenter.flush()
+                    if SEGMENTATION_MODE == "vad" and utterance is not None:
+                        transcribe_utterance(engine, utterance, context, router)
+                print("\n--- 音频源已播放完毕 ---")
+                break
             except KeyboardInterrupt:
                 print("\n--- Stopping Real-time Translation ---")
                 break
             except Exception as e:
                 print(f"An error occurred: {e}")
                 break
+    
+    elapsed = time.perf_counter() - start_time
+    audio_seconds = captured_samples / SAMPLE_RATE
+    if elapsed > 0 and audio_seconds > 0:
+        print(f"处理音频 {audio_seconds:.1f} 秒，耗时 {elapsed:.1f} 秒，"
+              f"吞吐量 {audio_seconds / elapsed:.2f}x 实时")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
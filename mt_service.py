@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+机器翻译服务
+音频翻译和文本翻译共用一组翻译工作线程：请求放入有界的请求队列，submit 立即返回 Future。
+音频流水线提交后就可以继续处理下一句，文本翻译也不再每次点击新建线程，
+两边同时运行的翻译数由工作线程数统一控制。文本翻译是交互操作，优先于积压的音频请求。
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+
+MT_WORKERS = 2  # 默认工作线程数
+PRIORITY_TEXT = 0  # 文本翻译请求（用户在等待结果）
+PRIORITY_AUDIO = 1  # 音频翻译请求
+
+
+class TranslationService:
+    """带请求队列和工作线程池的翻译服务，可被多个线程共用"""
+
+    def __init__(self, translate_fn, workers=MT_WORKERS, queue_size=32):
+        """
+        translate_fn(*args) -> str: 实际的翻译函数，会在多个工作线程中同时调用，须线程安全
+        workers: 工作线程数，即同时进行的翻译数
+        queue_size: 最多等待的请求数，队列满时 submit 按 block/timeout 等待或抛出 queue.Full
+        """
+        self.translate_fn = translate_fn
+        self.workers = workers
+        self._requests = queue.PriorityQueue(queue_size)
+        self._order = itertools.count()  # 同一优先级内先进先出
+        self._threads = []
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def pending(self):
+        """等待工作线程处理的请求数"""
+        return self._requests.qsize()
+
+    def start(self):
+        """启动工作线程（已启动时不重复启动）"""
+        if self._threads:
+            return self
+        self._threads = [threading.Thread(target=self._worker, name=f"mt-worker-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def submit(self, *args, priority=PRIORITY_AUDIO, block=True, timeout=None):
+        """提交翻译请求 translate_fn(*args)，返回 Future"""
+        future = Future()
+        self._requests.put((priority, next(self._order), future, args), block=block, timeout=timeout)
+        return future
+
+    def _worker(self):
+        while True:
+            _, _, future, args = self._requests.get()
+            if future is None:
+                break  # shutdown
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.translate_fn(*args))
+                with self._lock:
+                    self.completed += 1
+            except Exception as e:
+                future.set_exception(e)
+                with self._lock:
+                    self.failed += 1
+
+    def shutdown(self, timeout=None):
+        """处理完已排队的请求后停止工作线程，timeout不为None时等待线程退出"""
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            # 排在所有请求之后
+            self._requests.put((float("inf"), next(self._order), None, ()))
+        if timeout is not None:
+            for thread in threads:
+                thread.join(timeout)
+
+    def summary(self):
+        """一行统计，用于控制台"""
+        return f"翻译服务: {self.workers} 个工作线程，完成 {self.completed}，失败 {self.failed}，等待 {self.pending}"
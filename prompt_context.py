@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+滚动转录上下文
+用最近提交的转录文本（最多 max_tokens 个token）代替固定的 initial_prompt，
+让解码器在相邻窗口/语句之间保持连贯；提示长度有上限，解码耗时保持可预期。
+长时间静音或检测到幻觉（重复、压缩比过高、静音上的低置信度输出）时清空上下文，
+避免错误文本通过提示一直传递下去。
+"""
+
+from whisper.tokenizer import get_tokenizer
+
+
+class RollingPrompt:
+    """跨窗口的转录提示
+
+    text(at) 返回下一次转录应使用的 initial_prompt；update(result, text, at) 在文本提交后调用。
+    at 是音频时钟上的秒数（例如窗口或语句的起止时间），用于判断中间是否隔了长时间静音。
+    """
+
+    def __init__(self, base_prompt=None, max_tokens=48, silence_reset=5.0,
+                 compression_ratio_threshold=2.4, logprob_threshold=-1.0, no_speech_threshold=0.6):
+        """
+        base_prompt: 没有上下文时使用的固定提示
+        max_tokens: 上下文最多保留的token数（Whisper本身允许约224个，越长解码越慢）
+        silence_reset: 两次提交之间的静音超过该时长（秒）时清空上下文
+        其余阈值与 whisper.transcribe 的同名参数含义相同，用于判断幻觉
+        """
+        self.base_prompt = base_prompt
+        self.max_tokens = max_tokens
+        self.silence_reset = silence_reset
+        self.compression_ratio_threshold = compression_ratio_threshold
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.tokenizer = get_tokenizer(multilingual=True)
+        self.resets = 0
+        self.reset()
+
+    def reset(self, reason=None):
+        """清空上下文，之后回到 base_prompt"""
+        if reason and getattr(self, "_tokens", None):
+            self.resets += 1
+            print(f"[上下文] {reason}，清空转录上下文")
+        self._tokens = []
+        self._last_text = ""
+        self._last_time = None
+
+    def observe(self, at):
+        """即将转录从 at 秒开始的音频，距上次提交的静音过长时清空上下文"""
+        if self._last_time is not None and at - self._last_time > self.silence_reset:
+            self.reset(f"静音 {at - self._last_time:.1f} 秒")
+
+    def text(self, at=None):
+        """下一次转录的 initial_prompt，at 为这次转录的音频起点（秒）"""
+        if at is not None:
+            self.observe(at)
+        if not self._tokens:
+            return self.base_prompt
+        # 截断处可能落在多字节字符中间，去掉解码出的替换字符
+        return self.tokenizer.decode(self._tokens).lstrip("�").strip() or self.base_prompt
+
+    def update(self, result, text, at=None):
+        """提交一段转录文本；result 判定为幻觉时不加入上下文并清空
+
+        result: 该段的转录结果（含 segments），text: 其中实际提交的文本，at: 该段结束的时间（秒）
+        返回 result 是否被判定为幻觉
+        """
+        reason = self.hallucination(result, text)
+        if reason:
+            self.reset(reason)
+            return True
+        text = text.strip()
+        if text:
+            self._tokens = (self._tokens + self.tokenizer.encode(" " + text))[-self.max_tokens:]
+            self._last_text = text
+        if at is not None and text:
+            self._last_time = at
+        return False
+
+    def hallucination(self, result, text):
+        """返回幻觉原因，正常时返回None"""
+        text = text.strip()
+        if text and text == self._last_text:
+            return "与上一段文本完全重复"
+        for segment in result.get("segments", []):
+            ratio = segment.get("compression_ratio")
+            if ratio is not None and self.compression_ratio_threshold is not None \
+                    and ratio > self.compression_ratio_threshold:
+                return f"压缩比 {ratio:.2f} 过高（重复输出）"
+            no_speech = segment.get("no_speech_prob")
+            logprob = segment.get("avg_logprob")
+            if (no_speech is not None and logprob is not None and no_speech > self.no_speech_threshold
+                    and logprob < self.logprob_threshold):
+                return "静音上的低置信度输出"
+        return None
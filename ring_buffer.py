@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音频环形缓冲区
+固定容量、预分配内存，长时间运行内存占用保持不变
+"""
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """固定容量的float32环形缓冲区
+
+    内部使用两倍容量的镜像存储：每个样本同时写入 i 和 i+capacity 两个位置，
+    因此任意不超过容量的"最近N个样本"都是一段连续内存，可以直接返回视图而无需拷贝。
+
+    total_samples 是单调递增的样本时钟（累计写入的样本数），可用于换算绝对时间。
+    返回的视图不可原地修改，且在下一次 append 之后可能被覆盖，需要跨 append 保存时请自行 copy()。
+    """
+
+    def __init__(self, capacity, sample_rate=16000):
+        self.capacity = int(capacity)
+        if self.capacity <= 0:
+            raise ValueError("capacity必须大于0")
+        self.sample_rate = sample_rate
+        self._data = np.zeros(self.capacity * 2, dtype=np.float32)
+        self._write_pos = 0  # 下一个样本在 [0, capacity) 中的写入位置
+        self.total_samples = 0
+
+    def __len__(self):
+        return min(self.total_samples, self.capacity)
+
+    @property
+    def duration(self):
+        """缓冲区中音频的时长（秒）"""
+        return len(self) / self.sample_rate
+
+    @property
+    def start_sample(self):
+        """缓冲区中最早样本的时钟位置"""
+        return self.total_samples - len(self)
+
+    def clear(self):
+        """清空缓冲区并重置样本时钟"""
+        self._write_pos = 0
+        self.total_samples = 0
+
+    def append(self, samples):
+        """追加样本，超出容量时覆盖最旧的数据"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        n = len(samples)
+        if n == 0:
+            return
+        self.total_samples += n
+        if n >= self.capacity:
+            # 只保留最后capacity个样本
+            samples = samples[-self.capacity:]
+            self._data[:self.capacity] = samples
+            self._data[self.capacity:] = samples
+            self._write_pos = 0
+            return
+
+        pos = self._write_pos
+        first = min(n, self.capacity - pos)
+        self._data[pos:pos + first] = samples[:first]
+        self._data[pos + self.capacity:pos + self.capacity + first] = samples[:first]
+        rest = n - first
+        if rest:
+            self._data[:rest] = samples[first:]
+            self._data[self.capacity:self.capacity + rest] = samples[first:]
+        self._write_pos = (pos + n) % self.capacity
+
+    def last(self, num_samples):
+        """返回最近 num_samples 个样本的视图（不拷贝，请勿原地修改）"""
+        num_samples = max(0, min(int(num_samples), len(self)))
+        end = self._write_pos + self.capacity
+        return self._data[end - num_samples:end]
+
+    def last_seconds(self, seconds):
+        """返回最近 seconds 秒音频的视图"""
+        return self.last(int(seconds * self.sample_rate))
+
+    def since(self, sample_index):
+        """返回从样本时钟 sample_index 到当前的视图，早于缓冲区起点的部分被截断"""
+        return self.last(self.total_samples - max(sample_index, self.start_sample))
+
+    def get(self):
+        """返回缓冲区中全部音频的视图"""
+        return self.last(len(self))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实时率自适应控制
+统计每块音频的处理耗时与音频时长之比（实时率RTF），滚动窗口内的RTF接近1说明转录跟不上采集，
+此时沿档位表逐级降低模型大小、beam/best_of或窗口长度；有余量时再逐级恢复。
+每次决策都会打印出来，便于调整阈值。
+"""
+
+import time
+from collections import deque, namedtuple
+
+MODEL_ORDER = ["tiny", "base", "small", "medium", "large"]
+
+# 一个运行档位；beam_size/best_of 为None表示贪心解码
+RTFLevel = namedtuple("RTFLevel", ["model_size", "beam_size", "best_of", "interval"])
+
+
+def describe_level(level):
+    decoding = f"beam={level.beam_size}, best_of={level.best_of}" if level.beam_size else "贪心解码"
+    return f"{level.model_size} / {decoding} / 窗口{level.interval}秒"
+
+
+def decode_options(level):
+    """档位对应的解码参数，贪心档位的 beam_size/best_of 为None"""
+    return {"beam_size": level.beam_size, "best_of": level.best_of}
+
+
+def apply_level(options, level):
+    """用档位的解码参数替换 options（例如解码预设）中的搜索设置，档位为None的参数从 options 中去掉"""
+    options = dict(options)
+    for key, value in decode_options(level).items():
+        if value is None:
+            options.pop(key, None)
+        else:
+            options[key] = value
+    return options
+
+
+def build_ladder(model_size, interval, short_interval=3, min_model="tiny", beam_size=None, best_of=None):
+    """从最准确到最快排列的档位表
+
+    第一档使用所选解码预设的 beam_size/best_of，之后依次为：贪心解码（预设本身是贪心时省略）
+    -> 缩短窗口 -> 逐级换用更小的模型（不小于 min_model）
+    short_interval 为None时不缩短窗口（VAD分段不使用固定窗口）
+    """
+    levels = [RTFLevel(model_size, beam_size, best_of, interval)]
+    if beam_size or best_of:
+        levels.append(RTFLevel(model_size, None, None, interval))
+    if short_interval is not None and short_interval < interval:
+        levels.append(RTFLevel(model_size, None, None, short_interval))
+        interval = short_interval
+    if model_size in MODEL_ORDER:
+        lowest = MODEL_ORDER.index(min_model)
+        for smaller in reversed(MODEL_ORDER[lowest:MODEL_ORDER.index(model_size)]):
+            levels.append(RTFLevel(smaller, None, None, interval))
+    return levels
+
+
+class RTFController:
+    """按滚动窗口内的实时率在档位表上升降级
+
+    record() 每处理完一块音频调用一次，档位改变时返回新档位，否则返回None。
+    为避免来回振荡，改变档位后清空统计并至少等待 cooldown 块才会再次调整。
+    """
+
+    def __init__(self, levels, start_level=0, window=20, high=0.9, low=0.5, cooldown=10, verbose=False):
+        """
+        levels: 从最准确到最快排列的档位列表
+        window: 计算实时率的滚动窗口（音频块数）
+        high: 实时率超过该值时降级
+        low: 实时率低于该值时升级
+        verbose: 为True时每次评估（包括保持不变）都打印
+        """
+        self.levels = list(levels)
+        self.index = start_level
+        self.high = high
+        self.low = low
+        self.cooldown = cooldown
+        self.verbose = verbose
+        self._samples = deque(maxlen=window)
+        self._since_change = 0
+        self._at_limit = False
+        self.history = deque(maxlen=1000)  # 最近的 (时间, 实时率, 动作, 档位序号)，用于事后分析阈值
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    @property
+    def rtf(self):
+        """滚动窗口内的实时率：处理耗时之和 / 音频时长之和"""
+        audio = sum(a for a, _ in self._samples)
+        return sum(e for _, e in self._samples) / audio if audio > 0 else 0.0
+
+    def reset(self):
+        self._samples.clear()
+        self._since_change = 0
+        self._at_limit = False
+
+    def record(self, audio_seconds, elapsed_seconds):
+        """记录一块音频的处理耗时，必要时调整档位"""
+        self._samples.append((audio_seconds, elapsed_seconds))
+        self._since_change += 1
+        if len(self._samples) < self._samples.maxlen // 2 or self._since_change < self.cooldown:
+            return None
+
+        rtf = self.rtf
+        if rtf > self.high:
+            return self._step(+1, rtf, f"实时率 {rtf:.2f} > {self.high}")
+        if rtf < self.low:
+            return self._step(-1, rtf, f"实时率 {rtf:.2f} < {self.low}")
+        self._log(rtf, "保持", f"实时率 {rtf:.2f} 在 [{self.low}, {self.high}] 内，保持 {describe_level(self.level)}",
+                  verbose_only=True)
+        self._at_limit = False
+        return None
+
+    def _step(self, direction, rtf, reason):
+        target = self.index + direction
+        if not 0 <= target < len(self.levels):
+            action = "已是最快档位" if direction > 0 else "已是最准确档位"
+            # 到达档位表两端时只在第一次打印
+            self._log(rtf, action, f"{reason}，{action}: {describe_level(self.level)}", verbose_only=self._at_limit)
+            self._at_limit = True
+            return None
+
+        old = self.level
+        self.index = target
+        action = "降级" if direction > 0 else "升级"
+        self._log(rtf, action, f"{reason}，{action}: {describe_level(old)} -> {describe_level(self.level)}")
+        self.reset()
+        return self.level
+
+    def _log(self, rtf, action, message, verbose_only=False):
+        self.history.append((time.time(), rtf, action, self.index))
+        if self.verbose or not verbose_only:
+            print(f"[自适应] {message}")
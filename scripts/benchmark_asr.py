@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音识别基准测试
+把测试音频按实时翻译的窗口长度切块，分别用不同的转录方式处理，
+对比每块的延迟、实时率(RTF)以及词错误率(WER，中文为字错误率CER)。
+
+用法:
+    python scripts/benchmark_asr.py --model small --wav sample.wav
+    python scripts/benchmark_asr.py --wav a.wav b.wav --ref a.txt b.txt --chunk 6
+    python scripts/benchmark_asr.py --synthetic 60      # 无测试音频时只测延迟
+
+未提供参考文本时，以第一个方案（默认为stock，即原始的30秒补零路径）的输出作为参考。
+int8 方案总是在CPU上运行，与fp32对比时请加 --device cpu。
+"""
+
+import os
+import sys
+import copy
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import whisper
+
+import whisper_decode
+from audio_sources import SyntheticSource, load_wav, resample
+from streaming import split_units, unit_key
+
+SAMPLE_RATE = 16000
+
+INITIAL_PROMPTS = {
+    "en": "This is a clear English speech. Please transcribe accurately.",
+    "zh": "以下是普通话的句子。",
+}
+
+
+def _transcribe_options(language):
+    return dict(
+        language=language,
+        initial_prompt=INITIAL_PROMPTS.get(language),
+        temperature=0.0,
+        beam_size=1,
+    )
+
+
+def stock_variant(model, audio, language):
+    """原始 model.transcribe：每块补零到30秒"""
+    return whisper_decode.transcribe(model, audio, trim_encoder=False, **_transcribe_options(language))["text"]
+
+
+def trimmed_variant(model, audio, language):
+    """编码器只处理真实音频长度"""
+    return whisper_decode.transcribe(model, audio, trim_encoder=True, **_transcribe_options(language))["text"]
+
+
+_int8_models = {}
+
+
+def int8_variant(model, audio, language):
+    """CPU上的int8动态量化模型（首次调用时从fp32模型复制并量化）"""
+    if id(model) not in _int8_models:
+        _int8_models[id(model)] = whisper_decode.quantize_int8(copy.deepcopy(model).cpu())
+    return trimmed_variant(_int8_models[id(model)], audio, language)
+
+
+# 方案名 -> 函数(model, audio, language) -> 文本；新的优化在这里注册即可参与对比
+VARIANTS = {
+    "stock": stock_variant,
+    "trimmed": trimmed_variant,
+    "int8": int8_variant,
+}
+
+
+def error_rate(reference, hypothesis, language):
+    """编辑距离错误率：英文按词(WER)，中文按字(CER)，忽略大小写和标点"""
+    ref = [k for k in (unit_key(u) for u in split_units(reference, language)) if k]
+    hyp = [k for k in (unit_key(u) for u in split_units(hypothesis, language)) if k]
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def load_inputs(args):
+    """返回 [(名称, 16kHz音频, 参考文本或None)]"""
+    inputs = []
+    refs = args.ref or []
+    for index, path in enumerate(args.wav or []):
+        audio, rate = load_wav(path)
+        reference = None
+        if index < len(refs):
+            reference = Path(refs[index]).read_text(encoding="utf-8").strip()
+        else:
+            sidecar = Path(path).with_suffix(".txt")
+            if sidecar.exists():
+                reference = sidecar.read_text(encoding="utf-8").strip()
+        inputs.append((os.path.basename(path), resample(audio, rate, SAMPLE_RATE), reference))
+
+    if args.synthetic:
+        source = SyntheticSource(SAMPLE_RATE, speed=0, duration=args.synthetic)
+        with source.recorder(SAMPLE_RATE, channels=1) as recorder:
+            audio = recorder.record(int(args.synthetic * SAMPLE_RATE))[:, 0]
+        inputs.append((source.name, audio, None))
+    return inputs
+
+
+def run_variant(name, model, audio, language, chunk_samples):
+    """逐块转录，返回 (完整文本, 每块延迟列表)"""
+    fn = VARIANTS[name]
+    texts, latencies = [], []
+    for start in range(0, len(audio), chunk_samples):
+        chunk = audio[start:start + chunk_samples]
+        if len(chunk) < SAMPLE_RATE // 2:
+            continue
+        t0 = time.perf_counter()
+        text = fn(model, chunk, language)
+        latencies.append(time.perf_counter() - t0)
+        texts.append(text.strip())
+    joiner = "" if language == "zh" else " "
+    return joiner.join(t for t in texts if t), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语音识别延迟/准确率基准测试")
+    parser.add_argument("--model", default="small", help="Whisper模型大小")
+    parser.add_argument("--device", default=None, help="cpu 或 cuda，默认自动选择")
+    parser.add_argument("--language", default="en", choices=["en", "zh"])
+    parser.add_argument("--wav", nargs="*", help="测试音频（WAV）")
+    parser.add_argument("--ref", nargs="*", help="参考文本文件，与 --wav 一一对应；缺省时查找同名.txt")
+    parser.add_argument("--synthetic", type=float, default=0, help="追加指定秒数的合成信号（只测延迟）")
+    parser.add_argument("--chunk", type=float, default=6.0, help="每块音频时长（秒）")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--warmup", type=int, default=1, help="正式计时前的预热次数")
+    args = parser.parse_args()
+
+    inputs = load_inputs(args)
+    if not inputs:
+        parser.error("请至少提供 --wav 或 --synthetic")
+
+    print(f"加载Whisper模型 {args.model} ...")
+    model = whisper.load_model(args.model, device=args.device)
+    print(f"设备: {model.device}")
+
+    chunk_samples = int(args.chunk * SAMPLE_RATE)
+    warmup_audio = inputs[0][1][:chunk_samples]
+    for name in args.variants:
+        for _ in range(args.warmup):
+            VARIANTS[name](model, warmup_audio, args.language)
+
+    rows = []
+    for input_name, audio, reference in inputs:
+        duration = len(audio) / SAMPLE_RATE
+        print(f"\n=== {input_name} ({duration:.1f}秒) ===")
+        outputs = {}
+        for name in args.variants:
+            text, latencies = run_variant(name, model, audio, args.language, chunk_samples)
+            outputs[name] = (text, latencies)
+
+        baseline = reference if reference is not None else outputs[args.variants[0]][0]
+        ref_label = "参考文本" if reference is not None else args.variants[0]
+        for name in args.variants:
+            text, latencies = outputs[name]
+            total = sum(latencies)
+            rate = error_rate(baseline, text, args.language)
+            rows.append((input_name, name, statistics.median(latencies) if latencies else 0.0,
+                         max(latencies, default=0.0), total / duration, rate, ref_label))
+            print(f"[{name}] {text[:120]}")
+
+    metric = "CER" if args.language == "zh" else "WER"
+    print(f"\n{'输入':<20} {'方案':<10} {'中位延迟':>8} {'最大延迟':>8} {'RTF':>6} {metric:>6}  对比基准")
+    for input_name, name, median, worst, rtf, rate, ref_label in rows:
+        print(f"{input_name[:20]:<20} {name:<10} {median:>7.2f}s {worst:>7.2f}s {rtf:>6.3f} {rate:>6.1%}  {ref_label}")
+
+
+if __name__ == "__main__":
+    main()
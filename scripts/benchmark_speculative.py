@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投机解码基准测试
+把测试音频按实时翻译的窗口长度切块，每块先用目标模型编码一次，再分别用普通贪心解码和
+草稿模型投机解码（可指定多个每轮草稿token数）解码，对比解码速度（token/秒）、
+目标模型前向次数和草稿接受率，并逐块检查两者输出的token是否完全相同。
+投机解码的计时包含草稿模型的编码器。
+
+用法:
+    python scripts/benchmark_speculative.py --model small --draft tiny --wav sample.wav
+    python scripts/benchmark_speculative.py --model medium --draft tiny --device cpu --int8 --wav sample.wav
+    python scripts/benchmark_speculative.py --synthetic 30 --draft-tokens 2 4 6
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch
+
+import whisper_decode
+from benchmark_asr import INITIAL_PROMPTS, SAMPLE_RATE, load_inputs
+from speculative_decoding import DraftModel
+
+
+def decode_chunk(model, mel, language, draft=None):
+    """贪心解码一块音频（不含目标模型的编码），返回 (token列表, 耗时)"""
+    audio_features = whisper_decode.encode(model, mel)
+    start = time.perf_counter()
+    result = whisper_decode.decode_with_fallback(
+        model, audio_features, (0.0,), compression_ratio_threshold=None, logprob_threshold=None,
+        no_speech_threshold=None, greedy_task=draft.task_factory(mel) if draft is not None else None,
+        language=language, prompt=INITIAL_PROMPTS.get(language), fp16=mel.dtype == torch.float16,
+    )
+    return result.tokens, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="投机解码速度基准测试")
+    parser.add_argument("--model", default="small", help="目标模型大小")
+    parser.add_argument("--draft", default="tiny", help="草稿模型大小")
+    parser.add_argument("--draft-tokens", type=int, nargs="+", default=[4], help="每轮草稿token数，可指定多个")
+    parser.add_argument("--device", default=None, help="cpu 或 cuda，默认自动选择")
+    parser.add_argument("--int8", action="store_true", help="CPU上对两个模型做int8动态量化")
+    parser.add_argument("--language", default="en", choices=["en", "zh"])
+    parser.add_argument("--wav", nargs="*", help="测试音频（WAV）")
+    parser.add_argument("--ref", nargs="*", help=argparse.SUPPRESS)
+    parser.add_argument("--synthetic", type=float, default=0, help="追加指定秒数的合成信号")
+    parser.add_argument("--chunk", type=float, default=6.0, help="每块音频时长（秒）")
+    args = parser.parse_args()
+
+    inputs = load_inputs(args)
+    if not inputs:
+        parser.error("请至少提供 --wav 或 --synthetic")
+    device = args.device or ("cuda" if torch.cuda.is_available() else "cpu")
+
+    print(f"加载目标模型 {args.model} 和草稿模型 {args.draft} ...")
+    model = whisper_decode.load_model(args.model, device=device, int8=args.int8)
+    draft_model = whisper_decode.load_model(args.draft, device=device, int8=args.int8)
+    drafts = {n: DraftModel(draft_model, n) for n in args.draft_tokens}
+    if not drafts[args.draft_tokens[0]].compatible(model):
+        parser.error(f"{args.draft} 与 {args.model} 的词表或梅尔通道数不同，不能作为草稿模型")
+    print(f"设备: {device}{' int8' if args.int8 else ''}")
+
+    chunk_samples = int(args.chunk * SAMPLE_RATE)
+    mels = []
+    for _, audio, _ in inputs:
+        for start in range(0, len(audio), chunk_samples):
+            chunk = audio[start:start + chunk_samples]
+            if len(chunk) >= SAMPLE_RATE // 2:
+                mel = whisper_decode.log_mel(model, chunk)
+                mels.append(mel.half() if device == "cuda" else mel)
+
+    # 预热两种解码路径
+    decode_chunk(model, mels[0], args.language)
+    decode_chunk(model, mels[0], args.language, drafts[args.draft_tokens[0]])
+
+    baseline_tokens, baseline_time = [], 0.0
+    for mel in mels:
+        tokens, elapsed = decode_chunk(model, mel, args.language)
+        baseline_tokens.append(tokens)
+        baseline_time += elapsed
+    total_tokens = sum(len(tokens) for tokens in baseline_tokens)
+
+    rows = [("贪心解码", total_tokens / baseline_time, total_tokens, "-", "-", "-")]
+    for n, draft in drafts.items():
+        draft.reset_stats()
+        elapsed, mismatches = 0.0, 0
+        for mel, expected in zip(mels, baseline_tokens):
+            tokens, seconds = decode_chunk(model, mel, args.language, draft)
+            elapsed += seconds
+            mismatches += tokens != expected
+        rows.append((f"投机解码 k={n}", total_tokens / elapsed, draft.target_forwards,
+                     f"{draft.acceptance:.1%}", f"{baseline_time / elapsed:.2f}x", f"{mismatches}/{len(mels)}"))
+
+    print(f"\n{len(mels)} 块音频，共 {total_tokens} 个token")
+    print(f"{'方案':<14} {'token/秒':>9} {'目标前向':>8} {'接受率':>7} {'加速':>6} {'输出不同':>8}")
+    for name, speed, forwards, acceptance, speedup, mismatches in rows:
+        print(f"{name:<14} {speed:>9.1f} {forwards:>8} {acceptance:>7} {speedup:>6} {mismatches:>8}")
+
+
+if __name__ == "__main__":
+    main()
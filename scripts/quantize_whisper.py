@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出int8量化的Whisper检查点
+量化后的检查点可以直接作为模型名加载（whisper_decode.load_model），省去每次启动时的量化步骤。
+
+用法:
+    python scripts/quantize_whisper.py medium models/medium-int8.pt
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import whisper_decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出int8动态量化的Whisper模型")
+    parser.add_argument("model", help="模型大小（tiny/base/small/medium/large）或whisper检查点路径")
+    parser.add_argument("output", help="输出文件路径（.pt）")
+    args = parser.parse_args()
+
+    print(f"加载并量化 {args.model} ...")
+    model = whisper_decode.load_model(args.model, device="cpu", int8=True)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    whisper_decode.save_quantized(model, args.output)
+    print(f"已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
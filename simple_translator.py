@@ -9,42 +9,32 @@ from tkinter import ttk, messagebox, scrolledtext
 import threading
 import sys
 import os
+from translation_cache import TranslationCache
+from translator_registry import TranslatorRegistry
+from argos_packages import ensure_local_packages, start_download
 
 # 全局变量
-translator = None
 models_installed = False
+translation_cache = TranslationCache()  # 重复的输入直接返回缓存的译文
+translators = TranslatorRegistry(("zh-en", "en-zh"))  # 模型安装后解析并预热
 
 def lazy_import():
     """延迟导入翻译库"""
-    global translator
     try:
         import argostranslate.package
-        import argostranslate.translate
-        translator = argostranslate.translate
         return True
     except ImportError:
         return False
 
 def install_models():
-    """安装翻译模型"""
+    """准备翻译模型：只使用本地已安装的或 ARGOS_PACKAGE_DIR 中的翻译包，缺少时返回False"""
     global models_installed
     try:
-        import argostranslate.package
-        
-        # 更新包索引
-        argostranslate.package.update_package_index()
-        available_packages = argostranslate.package.get_available_packages()
-        
-        # 安装中英翻译包
-        packages_to_install = []
-        for package in available_packages:
-            if (package.from_code == 'zh' and package.to_code == 'en') or \
-               (package.from_code == 'en' and package.to_code == 'zh'):
-                packages_to_install.append(package)
-        
-        for package in packages_to_install:
-            argostranslate.package.install_from_path(package.download())
-        
+        missing = ensure_local_packages()
+        if missing:
+            print(f"缺少翻译包: {missing}")
+            return False
+        translators.load()
         models_installed = True
         return True
     except Exception as e:
@@ -104,10 +94,19 @@ class SimpleTranslator:
                 if install_models():
                     self.status_var.set("就绪")
                 else:
-                    self.status_var.set("模型安装失败")
+                    # 本地没有翻译包时才联网下载
+                    self.status_var.set("正在后台下载模型...")
+                    start_download(downloaded)
             else:
                 self.status_var.set("缺少翻译库")
         
+        def downloaded(missing, error):
+            if error is None and not missing and install_models():
+                self.status_var.set("就绪")
+            else:
+                print(f"模型下载失败: {error or missing}")
+                self.status_var.set("模型安装失败")
+        
         threading.Thread(target=check, daemon=True).start()
     
     def translate(self):
@@ -123,12 +122,11 @@ class SimpleTranslator:
         def do_translate():
             try:
                 direction = self.direction_var.get()
-                from_code = direction.split('-')[0]
-                to_code = direction.split('-')[1]
-                
-                result = translator.translate(text, from_code, to_code)
+                result = translation_cache.translate(
+                    text, direction, None, lambda source: translators.translate(source, direction))
                 self.output_text.delete("1.0", tk.END)
                 self.output_text.insert("1.0", result)
+                self.status_var.set(f"就绪 | {translation_cache.summary()}")
             except Exception as e:
                 messagebox.showerror("错误", f"翻译失败: {str(e)}")
         
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+投机解码
+CPU上解码器逐token前向，占每块音频延迟的很大一部分。这里用tiny模型（草稿模型）贪心地连续猜出若干token，
+再由选定的大模型（目标模型）一次前向同时算出这些位置的logits：从头接受与目标模型贪心选择相同的token，
+第一个不同的位置改用目标模型的选择，两个模型的KV缓存截断到已确定的位置后进入下一轮。
+每个输出token都是目标模型在同样前缀上（经过同样的logit过滤）的argmax，结果与贪心解码相同；
+草稿猜得越准，目标模型的前向次数越少。只替换温度为0、不做beam搜索的解码。
+"""
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from whisper.decoding import GreedyDecoder
+
+from whisper_decode import FeatureDecodingTask, encode
+
+DRAFT_TOKENS = 4  # 每轮草稿token数
+
+
+def _attention(attn, q, k, v, mask=None):
+    """多头注意力，mask 为bool张量（True表示可见）"""
+    q = q.view(*q.shape[:2], attn.n_head, -1).permute(0, 2, 1, 3)
+    k = k.view(*k.shape[:2], attn.n_head, -1).permute(0, 2, 1, 3)
+    v = v.view(*v.shape[:2], attn.n_head, -1).permute(0, 2, 1, 3)
+    out = F.scaled_dot_product_attention(q, k, v, attn_mask=mask)
+    return out.permute(0, 2, 1, 3).flatten(start_dim=2)
+
+
+class KVCacheDecoder:
+    """带可截断KV缓存的文本解码器前向计算
+
+    whisper自带的KV缓存钩子只能逐个token追加，一次输入多个新token时因果掩码也没有考虑已缓存的位置；
+    这里自己维护每层自注意力的key/value，一次前向可以处理任意多个新token，并能截断回之前的长度。
+    """
+
+    def __init__(self, model, audio_features):
+        self.decoder = model.decoder
+        self.dtype = audio_features.dtype
+        # 交叉注意力的key/value只依赖编码器输出，只计算一次
+        self.cross = [(block.cross_attn.key(audio_features), block.cross_attn.value(audio_features))
+                      for block in self.decoder.blocks]
+        self.keys = [None] * len(self.decoder.blocks)
+        self.values = [None] * len(self.decoder.blocks)
+        self.length = 0  # 已缓存的位置数
+        self.forwards = 0
+
+    @torch.no_grad()
+    def logits(self, tokens):
+        """输入接在已缓存位置之后的新token (1, n)，返回每个位置预测下一个token的logits (1, n, n_vocab)"""
+        decoder = self.decoder
+        offset, n = self.length, tokens.shape[-1]
+        x = decoder.token_embedding(tokens) + decoder.positional_embedding[offset:offset + n]
+        x = x.to(self.dtype)
+        # 新token能看到全部已缓存的位置和排在它前面的新token
+        mask = None
+        if n > 1:
+            mask = torch.ones(n, offset + n, dtype=torch.bool, device=x.device).tril(offset)
+        for i, block in enumerate(decoder.blocks):
+            h = block.attn_ln(x)
+            k, v = block.attn.key(h), block.attn.value(h)
+            if self.keys[i] is not None:
+                k = torch.cat([self.keys[i], k], dim=1)
+                v = torch.cat([self.values[i], v], dim=1)
+            self.keys[i], self.values[i] = k, v
+            x = x + block.attn.out(_attention(block.attn, block.attn.query(h), k, v, mask))
+            h = block.cross_attn_ln(x)
+            x = x + block.cross_attn.out(_attention(block.cross_attn, block.cross_attn.query(h), *self.cross[i]))
+            x = x + block.mlp(block.mlp_ln(x))
+        x = decoder.ln(x)
+        self.length += n
+        self.forwards += 1
+        return (x @ torch.transpose(decoder.token_embedding.weight.to(x.dtype), 0, 1)).float()
+
+    def truncate(self, length):
+        """丢弃 length 之后的缓存位置（被拒绝的草稿token）"""
+        if length < self.length:
+            self.keys = [k[:, :length] for k in self.keys]
+            self.values = [v[:, :length] for v in self.values]
+            self.length = length
+
+
+class DraftModel:
+    """投机解码的草稿模型及其统计
+
+    n_tokens: 每轮猜测的token数，草稿准确时越大越快，猜错时浪费的草稿计算也越多
+    """
+
+    def __init__(self, model, n_tokens=DRAFT_TOKENS):
+        self.model = model
+        self.n_tokens = n_tokens
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.drafted = 0  # 草稿token总数
+        self.accepted = 0  # 被目标模型接受的草稿token数
+        self.tokens = 0  # 输出token数
+        self.target_forwards = 0  # 目标模型解码器前向次数（普通贪心解码等于输出token数）
+
+    @property
+    def acceptance(self):
+        return self.accepted / self.drafted if self.drafted else 0.0
+
+    def compatible(self, model):
+        """与目标模型共用词表和梅尔通道数时才能打草稿（例如tiny不能给large-v3打草稿）"""
+        return (self.model.dims.n_vocab == model.dims.n_vocab
+                and self.model.dims.n_mels == model.dims.n_mels)
+
+    def task_factory(self, mel):
+        """返回一段音频的 decode_with_fallback greedy_task 参数
+
+        草稿模型的编码器输出在第一次创建任务时才计算，只做beam搜索时不编码
+        """
+        features = []
+
+        def create_task(model, options, audio_features):
+            if not features:
+                features.append(encode(self.model, mel))
+            return SpeculativeDecodingTask(model, options, audio_features, self, features[0])
+        return create_task
+
+
+class SpeculativeDecodingTask(FeatureDecodingTask):
+    """用草稿模型加速的贪心解码
+
+    只替换 _main_loop，初始token、logit过滤和结果整理与 DecodingTask 相同
+    """
+
+    def __init__(self, model, options, audio_features, draft, draft_features):
+        super().__init__(model, options, audio_features)
+        if not isinstance(self.decoder, GreedyDecoder) or options.temperature != 0:
+            raise ValueError("投机解码只用于温度为0、不做beam搜索的贪心解码")
+        self.draft = draft
+        self.draft_features = draft_features
+
+    def _main_loop(self, audio_features, tokens):
+        if tokens.shape[0] != 1:
+            raise ValueError("投机解码每次只解码一段音频")
+        target = KVCacheDecoder(self.model, audio_features)
+        draft = KVCacheDecoder(self.draft.model, self.draft_features)
+        sum_logprobs = torch.zeros(1, device=audio_features.device)
+        no_speech_probs = [np.nan]
+
+        steps = 0
+        while True:
+            length = tokens.shape[-1]
+            guesses = self._draft(draft, tokens, min(self.draft.n_tokens, self.sample_len - steps - 1,
+                                                     self.n_ctx - length))
+            # 目标模型一次前向：尚未输入过的已确定token和全部草稿token
+            offset = target.length
+            new_tokens = torch.tensor([guesses], dtype=tokens.dtype, device=tokens.device)
+            logits = target.logits(torch.cat([tokens[:, offset:], new_tokens], dim=-1))
+            if steps == 0 and self.tokenizer.no_speech is not None:
+                probs_at_sot = logits[:, self.sot_index - offset].float().softmax(dim=-1)
+                no_speech_probs = probs_at_sot[:, self.tokenizer.no_speech].tolist()
+
+            # 与普通贪心解码逐步相同地选出下一个token，选择与草稿一致时继续看下一个位置
+            completed = False
+            accepted = 0
+            for j in range(len(guesses) + 1):
+                step_logits = logits[:, length - 1 - offset + j]
+                for logit_filter in self.logit_filters:
+                    logit_filter.apply(step_logits, tokens)
+                tokens, completed = self.decoder.update(tokens, step_logits, sum_logprobs)
+                steps += 1
+                completed = completed or tokens.shape[-1] > self.n_ctx or steps >= self.sample_len
+                if completed or j == len(guesses) or tokens[0, -1].item() != guesses[j]:
+                    break
+                accepted += 1
+
+            self.draft.drafted += len(guesses)
+            self.draft.accepted += accepted
+            self.draft.target_forwards += 1
+            if completed:
+                break
+            # 最后一个确定的token还没有输入过两个模型，下一轮与新的草稿一起输入
+            target.truncate(tokens.shape[-1] - 1)
+            draft.truncate(tokens.shape[-1] - 1)
+
+        self.draft.tokens += steps
+        return tokens, sum_logprobs, no_speech_probs
+
+    def _draft(self, draft, tokens, n):
+        """草稿模型接着已确定的token贪心地猜 n 个token，猜到结束符时提前停止"""
+        guesses = []
+        if n <= 0:
+            return guesses
+        prefix = tokens
+        logits = draft.logits(tokens[:, draft.length:])[:, -1]
+        while True:
+            for logit_filter in self.logit_filters:
+                logit_filter.apply(logits, prefix)
+            guess = logits.argmax(dim=-1)
+            guesses.append(guess.item())
+            if guesses[-1] == self.tokenizer.eot or len(guesses) == n:
+                return guesses
+            prefix = torch.cat([prefix, guess[:, None]], dim=-1)
+            logits = draft.logits(guess[:, None])[:, -1]
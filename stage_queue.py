@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线阶段之间的有界队列
+接口与 queue.Queue 相同（put/get/put_nowait/get_nowait/empty/qsize），队列满时按策略处理：
+- block: 阻塞生产者，把压力传回上一阶段（可设超时，超时抛出 queue.Full）
+- drop_oldest: 丢弃最旧的元素，保证生产者不被阻塞、输出尽量接近实时
+- merge: 把新元素与队尾（时间上相邻）的元素合并，例如把相邻音频块拼接成一块；
+  合并后超过 max_item_size 时退化为丢弃最旧的元素
+所有丢弃和合并都有计数，便于观察过载情况。
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+QUEUE_POLICIES = ("block", "drop_oldest", "merge")
+
+
+def merge_audio(older, newer):
+    """merge 策略的音频合并函数：按时间顺序拼接"""
+    return np.concatenate([older, newer])
+
+
+def merge_text(older, newer):
+    """merge 策略的待翻译文本合并函数：元素为 (文本, 翻译方向)，方向相同时拼接文本，方向不同时不合并"""
+    if older[1] != newer[1]:
+        return None
+    return f"{older[0]} {newer[0]}", older[1]
+
+
+def merge_partial_events(older, newer):
+    """merge 策略的流式字幕事件合并函数：连续的临时文本只保留最新的一条，其余事件不合并"""
+    if older[0] == "partial" and newer[0] == "partial":
+        return newer
+    return None
+
+
+class BoundedQueue:
+    """带过载策略和计数的有界队列"""
+
+    def __init__(self, maxsize, policy="block", merge_fn=None, max_item_size=None, name="queue"):
+        """
+        maxsize: 最多容纳的元素个数
+        policy: "block"、"drop_oldest" 或 "merge"
+        merge_fn(older, newer) -> merged: merge 策略的合并函数，返回None表示不能合并（退化为丢弃最旧的元素）
+        max_item_size: merge 策略下合并结果的最大长度（len），为None时不限制
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}，可选: {', '.join(QUEUE_POLICIES)}")
+        if policy == "merge" and merge_fn is None:
+            raise ValueError("merge 策略需要提供 merge_fn")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.merge_fn = merge_fn
+        self.max_item_size = max_item_size
+        self.name = name
+
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+        self.put_count = 0
+        self.dropped = 0
+        self.merged = 0
+        self.blocked_seconds = 0.0
+
+    def qsize(self):
+        with self._lock:
+            return len(self._items)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return self.qsize() >= self.maxsize
+
+    def put(self, item, block=True, timeout=None):
+        """放入元素；只有 block 策略会等待，等待超时或 block=False 时抛出 queue.Full"""
+        with self._not_full:
+            if len(self._items) >= self.maxsize:
+                if self.policy == "block":
+                    self._wait_for_space(block, timeout)
+                elif self.policy == "merge" and self._merge_into_tail(item):
+                    self.put_count += 1
+                    return
+                else:
+                    self._items.popleft()
+                    self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._not_empty.notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        """取出最旧的元素，超时或 block=False 且队列为空时抛出 queue.Empty"""
+        with self._not_empty:
+            if not block:
+                if not self._items:
+                    raise queue.Empty
+            elif not self._not_empty.wait_for(lambda: self._items, timeout):
+                raise queue.Empty
+            item = self._items.popleft()
+            self._not_full.notify()
+            return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def stats(self):
+        """计数快照"""
+        with self._lock:
+            return {"name": self.name, "policy": self.policy, "size": len(self._items), "put": self.put_count,
+                    "dropped": self.dropped, "merged": self.merged, "blocked_seconds": self.blocked_seconds}
+
+    def _wait_for_space(self, block, timeout):
+        if not block:
+            raise queue.Full
+        start = time.perf_counter()
+        has_space = self._not_full.wait_for(lambda: len(self._items) < self.maxsize, timeout)
+        self.blocked_seconds += time.perf_counter() - start
+        if not has_space:
+            raise queue.Full
+
+    def _merge_into_tail(self, item):
+        """与队尾元素合并，成功时返回True"""
+        merged = self.merge_fn(self._items[-1], item)
+        if merged is None or (self.max_item_size is not None and len(merged) > self.max_item_size):
+            return False
+        self._items[-1] = merged
+        self.merged += 1
+        return True
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+固定窗口模式的转录拼接，两种方式接口相同（samples_needed() 取下一窗口需要的新音频，
+window() 取窗口，stitch() 取新文本）：
+- TranscriptStitcher: 每个窗口都重新包含上一窗口末尾的OVERLAP秒，
+  根据Whisper的分段（或逐词）时间戳和文本对齐，去掉已经输出过的内容
+- SegmentCommitter: 只提交结束时间离窗口边缘足够远的分段，末尾未完成的分段
+  连同其音频留到下一窗口，已提交的语音不会重复解码，被窗口截断的句子也能完整转录
+"""
+
+from streaming import split_units, join_units, unit_key
+
+
+class TranscriptStitcher:
+    """根据绝对时间去除重叠窗口中的重复文本
+
+    window_start 为窗口第一个样本的绝对时间（秒），可由 AudioRingBuffer 的样本时钟换算。
+    """
+
+    def __init__(self, language, tolerance=0.2, max_overlap_units=30, overlap=1.0):
+        """
+        tolerance: 时间戳误差容限（秒），结束时间不晚于已输出时间+容限的分段直接丢弃
+        max_overlap_units: 文本对齐时最多比较的词（字）数
+        overlap: window() 在新音频之前额外包含的上一窗口音频（秒）
+        """
+        self.language = language
+        self.tolerance = tolerance
+        self.max_overlap_units = max_overlap_units
+        self.overlap = overlap
+        self.reset()
+
+    def reset(self):
+        self.emitted_until = 0.0  # 已输出文本覆盖到的绝对时间
+        self._tail = []  # 最近输出的词（字），用于文本对齐
+
+    def samples_needed(self, interval_samples, sample_rate):
+        """下一窗口需要的新音频样本数：每个窗口都是一个完整间隔"""
+        return interval_samples
+
+    def window(self, buffer, new_samples):
+        """从环形缓冲区取"上一段重叠部分 + 最新 new_samples 个样本"，返回 (音频视图, 窗口起始秒数)"""
+        audio = buffer.last(new_samples + int(self.overlap * buffer.sample_rate))
+        return audio, (buffer.total_samples - len(audio)) / buffer.sample_rate
+
+    def stitch(self, result, window_start, window_end=None, final=False):
+        """输入 model.transcribe 的结果，返回本窗口中尚未输出过的文本（window_end、final 不使用）"""
+        units = []
+        for segment in result.get("segments", []):
+            start = window_start + segment["start"]
+            end = window_start + segment["end"]
+            if end <= self.emitted_until + self.tolerance:
+                continue  # 整段都在已输出范围内
+
+            words = segment.get("words")
+            if words:
+                # 有逐词时间戳时按词中点精确裁剪
+                kept = [w["word"] for w in words
+                        if window_start + (w["start"] + w["end"]) / 2 > self.emitted_until]
+                segment_units = split_units("".join(kept), self.language)
+            else:
+                segment_units = split_units(segment["text"], self.language)
+                if start < self.emitted_until:
+                    # 跨越边界的分段：用文本对齐去掉与已输出内容重复的开头
+                    segment_units = segment_units[self._overlap_length(segment_units):]
+
+            units.extend(segment_units)
+            self.emitted_until = max(self.emitted_until, end)
+
+        if not result.get("segments") and result.get("text"):
+            # 没有分段信息时退化为纯文本对齐
+            units = split_units(result["text"], self.language)
+            units = units[self._overlap_length(units):]
+
+        self._tail = (self._tail + units)[-self.max_overlap_units:]
+        return join_units(units, self.language)
+
+    def _overlap_length(self, units):
+        """已输出文本的末尾与 units 开头的最长重合长度"""
+        tail_keys = [unit_key(u) for u in self._tail]
+        head_keys = [unit_key(u) for u in units[:self.max_overlap_units]]
+        for length in range(min(len(tail_keys), len(head_keys)), 0, -1):
+            if tail_keys[-length:] == head_keys[:length]:
+                return length
+        return 0
+
+
+class SegmentCommitter:
+    """按分段时间戳提交稳定分段，窗口末尾未完成的分段留给下一窗口
+
+    window() 从上次提交到的位置开始取音频，因此每个窗口 = 上一窗口未提交的尾部 + 新音频。
+    新音频只需补足一个间隔（samples_needed()），窗口长度不随留下的尾部增长，尾部也不会被反复解码。
+    """
+
+    def __init__(self, language, guard=1.0, max_carry=5.0):
+        """
+        guard: 结束时间距窗口末尾不足 guard 秒的分段视为可能被截断，留到下一窗口
+        max_carry: 留到下一窗口的音频上限（秒），超过时强制提交全部分段，
+            应小于间隔，使每个窗口至少有 间隔 - max_carry 秒新音频
+        """
+        self.language = language
+        self.guard = guard
+        self.max_carry = max_carry
+        self.reset()
+
+    def reset(self):
+        self.committed_until = 0.0  # 已提交文本覆盖到的绝对时间（秒）
+        self.window_end = 0.0  # 上一窗口的结束时间（秒）
+
+    @property
+    def carried(self):
+        """上一窗口留下的未提交音频（秒）"""
+        return max(self.window_end - self.committed_until, 0.0)
+
+    def samples_needed(self, interval_samples, sample_rate):
+        """下一窗口需要的新音频样本数：间隔减去已留下的尾部（最多减去 max_carry），窗口总长保持一个间隔"""
+        return max(interval_samples - int(round(min(self.carried, self.max_carry) * sample_rate)), 1)
+
+    def window(self, buffer, new_samples=None):
+        """从环形缓冲区取"未提交的尾部 + 新音频"，返回 (音频视图, 窗口起始秒数)"""
+        start_sample = max(int(round(self.committed_until * buffer.sample_rate)), buffer.start_sample)
+        return buffer.since(start_sample), start_sample / buffer.sample_rate
+
+    def stitch(self, result, window_start, window_end, final=False):
+        """提交 window_end - guard 之前结束的分段，返回提交的文本
+
+        final=True 时（例如回放结束）提交全部分段
+        """
+        segments = result.get("segments", [])
+        if not segments:
+            text = result.get("text", "").strip()
+            # 没有分段信息时只能整体提交；静音窗口只保留末尾 guard 秒，以免丢失刚开始的语音
+            self._advance(window_end if text or final else window_end - self.guard, window_end)
+            return text
+
+        edge = window_end - (0.0 if final else self.guard)
+        committed = []
+        for segment in segments:
+            if window_start + segment["end"] > edge:
+                break
+            committed.append(segment)
+        if len(committed) < len(segments) and window_end - self._end(committed, window_start) > self.max_carry:
+            committed = segments  # 尾部过长：不再等待，全部提交
+
+        self._advance(self._end(committed, window_start), window_end)
+        units = []
+        for segment in committed:
+            units.extend(split_units(segment["text"], self.language))
+        return join_units(units, self.language)
+
+    def _end(self, segments, window_start):
+        return window_start + segments[-1]["end"] if segments else self.committed_until
+
+    def _advance(self, until, window_end):
+        self.committed_until = max(self.committed_until, min(until, window_end))
+        self.window_end = max(self.window_end, window_end)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式转录
+说话过程中每隔约500ms重新转录正在增长的语句，连续两次转录一致的前缀才提交（LocalAgreement），
+不稳定的尾部作为灰色的临时字幕显示。只有已提交的文本会送去翻译。
+"""
+
+import re
+
+SENTENCE_END = re.compile(r'[.!?。！？]')
+MAX_ALIGN_UNITS = 16  # 最终转录与已提交文本对齐时最多比较的单位数
+
+
+def split_units(text, language):
+    """把转录文本切分成比较单位：中文按字，其他语言按空格分词"""
+    if language == "zh":
+        return [ch for ch in text if not ch.isspace()]
+    return text.split()
+
+
+def join_units(units, language):
+    return "".join(units) if language == "zh" else " ".join(units)
+
+
+def unit_key(unit):
+    """比较时忽略大小写和首尾标点，避免标点抖动导致不一致"""
+    return unit.strip(".,!?;:\"'()，。！？；：、“”‘’（）").lower()
+
+
+class LocalAgreement:
+    """LocalAgreement-2 提交策略
+
+    每次得到新的转录假设后，与上一次假设求最长公共前缀，
+    其中尚未提交的部分即可提交；剩余部分为不稳定的临时文本。
+    """
+
+    def __init__(self, language):
+        self.language = language
+        self.reset()
+
+    def reset(self):
+        self._previous = []
+        self.committed = []
+
+    def update(self, text):
+        """输入新的转录假设，返回 (新提交的文本, 临时文本)"""
+        units = split_units(text, self.language)
+        agreed = 0
+        for old, new in zip(self._previous, units):
+            if unit_key(old) != unit_key(new):
+                break
+            agreed += 1
+        self._previous = units
+
+        new_units = units[len(self.committed):agreed] if agreed > len(self.committed) else []
+        self.committed.extend(new_units)
+        partial = units[max(agreed, len(self.committed)):]
+        return join_units(new_units, self.language), join_units(partial, self.language)
+
+    def finalize(self, text):
+        """语句结束，最终转录中尚未提交的部分全部提交
+
+        整句的最终转录可能修改或合并已提交部分的词，不能按位置截取，
+        而是找到已提交文本的末尾在最终转录中的位置，只提交其后的部分
+        """
+        units = split_units(text, self.language)
+        remaining = units[self._committed_end(units):]
+        self.reset()
+        return join_units(remaining, self.language)
+
+    def _committed_end(self, units):
+        """已提交文本的末尾在 units 中对应的位置
+
+        取已提交文本最长的、在 units 中出现的末尾片段，有多处时取最接近已提交长度的一处；
+        都对不上时按已提交的单位数截取
+        """
+        committed = [unit_key(u) for u in self.committed]
+        keys = [unit_key(u) for u in units]
+        for length in range(min(len(committed), MAX_ALIGN_UNITS), 0, -1):
+            tail = committed[-length:]
+            ends = [end for end in range(length, len(keys) + 1) if keys[end - length:end] == tail]
+            if ends:
+                return min(ends, key=lambda end: abs(end - len(committed)))
+        return min(len(committed), len(units))
+
+
+class StreamingTranscriber:
+    """在 UtteranceSegmenter 之上实现流式转录
+
+    feed() 返回事件列表，每个事件为 (类型, 文本)：
+    - "partial": 当前不稳定的临时文本（空字符串表示清除临时文本）
+    - "commit": 新提交、不会再改变的文本
+    - "translate": 已提交且凑成完整句子（或语句结束）的文本，应送去翻译
+    """
+
+    def __init__(self, segmenter, transcribe_fn, language, step=0.5, min_decode=1.0, context=None):
+        """
+        transcribe_fn(audio) -> str 或 dict: 转录一段音频，返回原始文本或 transcribe 的结果字典
+        step: 说话过程中两次重新转录之间至少间隔的音频时长（秒）
+        min_decode: 语句至少达到该时长才开始流式转录
+        context: RollingPrompt，每句结束时把最终文本加入上下文，供后续语句作为提示
+        """
+        self.segmenter = segmenter
+        self.transcribe_fn = transcribe_fn
+        self.context = context
+        self.step_samples = int(step * segmenter.sample_rate)
+        self.min_decode_samples = int(min_decode * segmenter.sample_rate)
+        self.agreement = LocalAgreement(language)
+        self._samples_since_decode = 0
+        self._untranslated = []
+
+    @property
+    def language(self):
+        return self.agreement.language
+
+    def set_language(self, language):
+        """切换语言时丢弃当前语句的状态"""
+        self.agreement = LocalAgreement(language)
+        self._untranslated = []
+
+    def reset(self):
+        self.segmenter.reset()
+        self.agreement.reset()
+        self._samples_since_decode = 0
+        self._untranslated = []
+
+    def feed(self, audio, decode_partial=True):
+        """输入一段音频，返回事件列表
+
+        decode_partial=False 时只处理语句结束，不做中间的流式转录（转录积压时用于追赶实时）
+        """
+        events = []
+        self._samples_since_decode += len(audio)
+
+        for utterance in self.segmenter.feed(audio):
+            remaining = self.agreement.finalize(self._final_text(utterance))
+            self._commit(remaining, events, utterance_end=True)
+            events.append(("partial", ""))
+            self._samples_since_decode = 0
+
+        current = self.segmenter.current_audio
+        if (decode_partial and self.segmenter.in_speech and len(current) >= self.min_decode_samples
+                and self._samples_since_decode >= self.step_samples):
+            self._samples_since_decode = 0
+            committed, partial = self.agreement.update(self._transcribe(current, self.segmenter.current_start)["text"])
+            self._commit(committed, events)
+            events.append(("partial", partial))
+        return events
+
+    def flush(self):
+        """停止录音时结束当前语句"""
+        events = []
+        utterance = self.segmenter.flush()
+        if utterance is not None:
+            remaining = self.agreement.finalize(self._final_text(utterance))
+            self._commit(remaining, events, utterance_end=True)
+        elif self._untranslated:
+            self._commit("", events, utterance_end=True)
+        events.append(("partial", ""))
+        return events
+
+    def _transcribe(self, audio, start_sample):
+        if self.context is not None:
+            self.context.observe(start_sample / self.segmenter.sample_rate)
+        result = self.transcribe_fn(audio)
+        if isinstance(result, str):
+            result = {"text": result, "segments": []}
+        return result
+
+    def _final_text(self, utterance):
+        """转录结束的语句，最终文本加入上下文"""
+        result = self._transcribe(utterance.audio, utterance.start_sample)
+        if self.context is not None:
+            end = (utterance.start_sample + len(utterance.audio)) / self.segmenter.sample_rate
+            self.context.update(result, result["text"], end)
+        return result["text"]
+
+    def _commit(self, text, events, utterance_end=False):
+        if text:
+            events.append(("commit", text))
+            self._untranslated.append(text)
+
+        pending = join_units(self._untranslated, self.language)
+        if utterance_end:
+            sentence, rest = pending, ""
+        else:
+            # 只翻译到最后一个句末标点为止，剩余部分等待后续提交
+            ends = [m.end() for m in SENTENCE_END.finditer(pending)]
+            if not ends:
+                return
+            sentence, rest = pending[:ends[-1]], pending[ends[-1]:]
+
+        if sentence.strip():
+            events.append(("translate", sentence.strip()))
+        self._untranslated = [rest.strip()] if rest.strip() else []
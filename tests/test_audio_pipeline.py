@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""音频流水线停止时的收尾"""
+
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_pipeline import AudioPipeline
+from mt_service import TranslationService
+
+
+class FakeRecorder:
+    def record(self, numframes):
+        time.sleep(0.01)
+        return np.zeros((numframes, 1), dtype=np.float32)
+
+
+@contextmanager
+def open_recorder():
+    yield FakeRecorder()
+
+
+def slow_translate(text, mode):
+    time.sleep(0.3)
+    return f"{mode}:{text}"
+
+
+def make_pipeline(service, results, drain_timeout=3.0):
+    counter = iter(range(1000))
+    return AudioPipeline(
+        open_recorder=open_recorder, block_frames=160,
+        process_audio=lambda audio: [(str(next(counter)), "en_to_zh")],
+        translate_fn=None, on_result=lambda item, target: results.append((item, target)),
+        submit_fn=lambda item: service.submit(*item), max_in_flight=2, drain_timeout=drain_timeout,
+    )
+
+
+def test_stop_delivers_in_flight_translations_and_joins_threads():
+    service = TranslationService(slow_translate, workers=2).start()
+    results = []
+    pipeline = make_pipeline(service, results)
+    pipeline.start()
+    time.sleep(0.2)  # 两个请求正在翻译
+    assert pipeline.stop(timeout=2)
+    assert not pipeline.alive
+    delivered = [item[0] for item, _ in results]
+    assert delivered == [str(i) for i in range(len(delivered))]
+    assert len(delivered) >= 2
+    service.shutdown(timeout=2)
+
+
+def test_stop_gives_up_after_drain_timeout():
+    service = TranslationService(slow_translate, workers=1).start()
+    results = []
+    pipeline = make_pipeline(service, results, drain_timeout=0.05)
+    pipeline.start()
+    time.sleep(0.1)
+    assert pipeline.stop(timeout=2)
+    assert results == []
+    service.shutdown(timeout=2)
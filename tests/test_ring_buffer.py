@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""AudioRingBuffer 的回绕、样本时钟和 since()"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ring_buffer import AudioRingBuffer
+
+
+def ramp(start, stop):
+    return np.arange(start, stop, dtype=np.float32)
+
+
+def test_wraps_around_and_keeps_latest_samples():
+    buffer = AudioRingBuffer(10, sample_rate=10)
+    buffer.append(ramp(0, 7))
+    buffer.append(ramp(7, 16))  # 写入位置跨过容量边界
+    assert len(buffer) == 10
+    assert buffer.total_samples == 16
+    assert buffer.start_sample == 6
+    np.testing.assert_array_equal(buffer.get(), ramp(6, 16))
+    np.testing.assert_array_equal(buffer.last(4), ramp(12, 16))
+    assert buffer.duration == 1.0
+
+
+def test_append_longer_than_capacity():
+    buffer = AudioRingBuffer(10)
+    buffer.append(ramp(0, 3))
+    buffer.append(ramp(3, 28))
+    assert buffer.start_sample == 18
+    np.testing.assert_array_equal(buffer.get(), ramp(18, 28))
+    buffer.append(ramp(28, 31))
+    np.testing.assert_array_equal(buffer.get(), ramp(21, 31))
+
+
+def test_since_uses_sample_clock_and_truncates():
+    buffer = AudioRingBuffer(10)
+    for start in range(0, 25, 5):
+        buffer.append(ramp(start, start + 5))
+    np.testing.assert_array_equal(buffer.since(20), ramp(20, 25))
+    np.testing.assert_array_equal(buffer.since(17), ramp(17, 25))
+    # 早于缓冲区起点的部分被截断
+    np.testing.assert_array_equal(buffer.since(3), ramp(15, 25))
+    assert len(buffer.since(25)) == 0
+
+
+def test_clear_resets_clock():
+    buffer = AudioRingBuffer(10)
+    buffer.append(ramp(0, 12))
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.total_samples == 0
+    buffer.append(ramp(0, 3))
+    np.testing.assert_array_equal(buffer.since(0), ramp(0, 3))
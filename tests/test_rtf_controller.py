@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""实时率档位与解码预设的组合"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from decoding_presets import preset_options
+from rtf_controller import RTFController, RTFLevel, apply_level, build_ladder
+
+
+def preset_ladder(quality, model_size="small", interval=5):
+    preset = preset_options(quality)
+    return build_ladder(model_size, interval, beam_size=preset.get("beam_size"), best_of=preset.get("best_of"))
+
+
+def test_greedy_level_removes_accurate_beam_search():
+    options = apply_level(preset_options("accurate"), RTFLevel("small", None, None, 5))
+    assert "beam_size" not in options
+    assert "best_of" not in options
+    assert options["max_fallbacks"] == 3
+
+
+def test_greedy_level_removes_balanced_best_of():
+    options = apply_level(preset_options("balanced"), preset_ladder("balanced")[1])
+    assert "beam_size" not in options
+    assert "best_of" not in options
+
+
+def test_beam_level_overrides_preset():
+    options = apply_level(preset_options("fast"), RTFLevel("small", 5, 5, 5))
+    assert options["beam_size"] == 5
+    assert options["best_of"] == 5
+
+
+def test_top_level_keeps_selected_preset():
+    for quality in ("fast", "balanced", "accurate"):
+        options = preset_options(quality)
+        assert apply_level(options, preset_ladder(quality)[0]) == options
+
+
+def test_greedy_preset_has_no_beam_level():
+    ladder = preset_ladder("fast")
+    assert all(level.beam_size is None and level.best_of is None for level in ladder)
+    assert [level.model_size for level in ladder] == ["small", "small", "base", "tiny"]
+
+
+def test_controller_starts_at_preset_and_steps_down():
+    controller = RTFController(preset_ladder("accurate"), window=4, cooldown=2)
+    assert controller.level.beam_size == 5
+    for _ in range(2):
+        controller.record(1.0, 2.0)
+    assert controller.level.beam_size is None
+    for _ in range(4):
+        controller.record(1.0, 0.1)
+    assert controller.index == 0
+    assert controller.record(1.0, 0.1) is None  # 第一档之上没有更准确的档位
+
+
+def test_vad_ladder_has_no_interval_levels():
+    ladder = build_ladder("small", 5, short_interval=None, beam_size=5, best_of=5)
+    assert {level.interval for level in ladder} == {5}
+    assert [level.model_size for level in ladder] == ["small", "small", "base", "tiny"]
+
+
+def test_rtf_uses_transcribed_audio_duration():
+    controller = RTFController(build_ladder("small", 5), window=4, cooldown=2)
+    controller.record(6.0, 3.0)
+    controller.record(4.0, 2.0)
+    assert controller.rtf == 0.5
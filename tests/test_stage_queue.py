@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""BoundedQueue 的过载策略和计数"""
+
+import queue
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from stage_queue import BoundedQueue, merge_audio, merge_text
+
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+
+def test_drop_oldest_counts_drops():
+    q = BoundedQueue(2, policy="drop_oldest")
+    for i in range(5):
+        q.put(i)
+    assert drain(q) == [3, 4]
+    stats = q.stats()
+    assert stats["put"] == 5 and stats["dropped"] == 3 and stats["merged"] == 0
+
+
+def test_merge_audio_into_tail():
+    q = BoundedQueue(2, policy="merge", merge_fn=merge_audio)
+    for i in range(4):
+        q.put(np.full(2, i, dtype=np.float32))
+    first, tail = drain(q)
+    np.testing.assert_array_equal(first, [0, 0])
+    np.testing.assert_array_equal(tail, [1, 1, 2, 2, 3, 3])
+    assert q.put_count == 4 and q.merged == 2 and q.dropped == 0
+
+
+def test_merge_falls_back_to_drop_when_too_large():
+    q = BoundedQueue(2, policy="merge", merge_fn=merge_audio, max_item_size=4)
+    for i in range(4):
+        q.put(np.full(2, i, dtype=np.float32))
+    # 第三块合并进队尾（长度4），第四块超过 max_item_size，丢弃最旧的一块
+    items = drain(q)
+    assert [list(item) for item in items] == [[1, 1, 2, 2], [3, 3]]
+    assert q.merged == 1 and q.dropped == 1
+
+
+def test_merge_text_only_same_direction():
+    q = BoundedQueue(1, policy="merge", merge_fn=merge_text)
+    q.put(("hello", "en_to_zh"))
+    q.put(("world", "en_to_zh"))
+    q.put(("你好", "zh_to_en"))
+    assert drain(q) == [("你好", "zh_to_en")]
+    assert q.merged == 1 and q.dropped == 1
+
+
+def test_block_policy_raises_full():
+    q = BoundedQueue(1, policy="block")
+    q.put(1)
+    with pytest.raises(queue.Full):
+        q.put(2, block=False)
+    with pytest.raises(queue.Full):
+        q.put(2, timeout=0.01)
+    assert q.blocked_seconds > 0
+    assert drain(q) == [1]
+    with pytest.raises(queue.Empty):
+        q.get(timeout=0.01)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BoundedQueue(1, policy="spill")
+    with pytest.raises(ValueError):
+        BoundedQueue(1, policy="merge")
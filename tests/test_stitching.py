@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""SegmentCommitter 留下尾部时的窗口长度"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ring_buffer import AudioRingBuffer
+from stitching import SegmentCommitter
+
+RATE = 100
+INTERVAL = 5
+OVERLAP = 1
+
+
+def run_windows(committer, buffer, results):
+    """按 samples_needed() 补足新音频并依次提交各窗口，返回每个窗口的长度（秒）"""
+    lengths = []
+    for result in results:
+        buffer.append(np.zeros(committer.samples_needed(RATE * INTERVAL, RATE), dtype=np.float32))
+        audio, window_start = committer.window(buffer)
+        lengths.append(len(audio) / RATE)
+        committer.stitch(result, window_start, window_start + len(audio) / RATE)
+    return lengths
+
+
+def test_carried_tail_shortens_new_audio():
+    committer = SegmentCommitter("en", guard=1.0, max_carry=INTERVAL / 2)
+    buffer = AudioRingBuffer(RATE * (INTERVAL + OVERLAP), RATE)
+    # 每个窗口都有一个贴近末尾的分段被留下
+    result = {"segments": [{"start": 0.0, "end": 2.5, "text": "one"}, {"start": 2.5, "end": 4.8, "text": "two"}]}
+    lengths = run_windows(committer, buffer, [result] * 4)
+    assert lengths == [INTERVAL] * 4
+    assert committer.carried == 2.5
+
+
+def test_long_carry_is_bounded_by_max_carry():
+    committer = SegmentCommitter("en", guard=1.0, max_carry=INTERVAL / 2)
+    buffer = AudioRingBuffer(RATE * (INTERVAL + OVERLAP), RATE)
+    # 整个窗口都是一个未结束的分段：尾部超过 max_carry 时强制提交
+    result = {"segments": [{"start": 0.0, "end": 4.9, "text": "long"}]}
+    lengths = run_windows(committer, buffer, [result] * 3)
+    assert max(lengths) <= INTERVAL + OVERLAP
+    assert committer.carried <= INTERVAL / 2
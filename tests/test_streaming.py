@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""LocalAgreement 语句结束时的提交"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from streaming import LocalAgreement
+
+
+def committed_agreement(*hypotheses, language="en"):
+    agreement = LocalAgreement(language)
+    for text in hypotheses:
+        agreement.update(text)
+    return agreement
+
+
+def test_finalize_emits_only_new_units():
+    agreement = committed_agreement("we can not go", "we can not go there")
+    assert agreement.committed == ["we", "can", "not", "go"]
+    assert agreement.finalize("We can not go there today.") == "there today."
+
+
+def test_finalize_aligns_when_committed_words_merge():
+    agreement = committed_agreement("we can not go", "we can not go there")
+    # "can not" 合并成一个词，按位置截取会重复输出 "there"
+    assert agreement.finalize("we cannot go there today") == "there today"
+
+
+def test_finalize_aligns_when_final_inserts_words():
+    agreement = committed_agreement("so we went", "so we went home")
+    # 最终转录在已提交部分前面多出一个词，按位置截取会丢掉 "home"
+    assert agreement.finalize("and so we went home") == "home"
+
+
+def test_finalize_without_commit_emits_everything():
+    agreement = LocalAgreement("zh")
+    assert agreement.finalize("你好世界") == "你好世界"
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""TranslationCache 的LRU淘汰和命中统计"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from translation_cache import TranslationCache
+
+
+def test_evicts_least_recently_used():
+    cache = TranslationCache(maxsize=2)
+    cache.put("one", "en_to_zh", "fast", "一")
+    cache.put("two", "en_to_zh", "fast", "二")
+    assert cache.get("one", "en_to_zh", "fast") == "一"  # one 变为最近使用
+    cache.put("three", "en_to_zh", "fast", "三")
+    assert len(cache) == 2
+    assert cache.get("two", "en_to_zh", "fast") is None
+    assert cache.get("one", "en_to_zh", "fast") == "一"
+    assert cache.get("three", "en_to_zh", "fast") == "三"
+
+
+def test_key_includes_direction_and_quality_and_normalizes_whitespace():
+    cache = TranslationCache()
+    cache.put("  good   morning ", "en_to_zh", "fast", "早上好")
+    assert cache.get("good morning", "en_to_zh", "fast") == "早上好"
+    assert cache.get("good morning", "en_to_zh", "accurate") is None
+    assert cache.get("good morning", "zh_to_en", "fast") is None
+    assert cache.get("Good morning", "en_to_zh", "fast") is None
+
+
+def test_translate_counts_hits_and_skips_failures():
+    cache = TranslationCache(maxsize=4)
+    calls = []
+
+    def translate_fn(text):
+        calls.append(text)
+        return text.upper()
+
+    assert cache.translate("hi", "en_to_zh", None, translate_fn) == "HI"
+    assert cache.translate("hi", "en_to_zh", None, translate_fn) == "HI"
+    assert calls == ["hi"]
+
+    def fail(text):
+        raise RuntimeError("model not ready")
+
+    with pytest.raises(RuntimeError):
+        cache.translate("bye", "en_to_zh", None, fail)
+    assert len(cache) == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_zero_size_disables_caching():
+    cache = TranslationCache(maxsize=0)
+    cache.put("hi", "en_to_zh", None, "嗨")
+    assert len(cache) == 0
+    assert cache.get("hi", "en_to_zh", None) is None
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""翻译记忆的精确匹配与宽松匹配"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from translation_memory import TranslationMemory
+
+
+def memory_with(entries, **kwargs):
+    memory = TranslationMemory(":memory:", **kwargs)
+    for source, target in entries:
+        memory.add(source, "en_to_zh", "balanced", target)
+    memory.flush()
+    return memory
+
+
+def test_exact_lookup_pending_and_flushed():
+    memory = TranslationMemory(":memory:", batch_size=100, flush_interval=1e9)
+    memory.add("Hello  world", "en_to_zh", "fast", "你好世界")
+    assert memory.lookup("Hello world", "en_to_zh", "fast") == "你好世界"  # 尚未写入也能命中
+    memory.flush()
+    assert memory.lookup(" Hello world ", "en_to_zh", "fast") == "你好世界"
+    assert memory.lookup("Hello world", "zh_to_en", "fast") is None
+    assert memory.lookup("Hello world", "en_to_zh", "accurate") is None
+    assert len(memory) == 1
+
+
+def test_exact_only_by_default():
+    memory = memory_with([("I can go to the store today", "我今天可以去商店")])
+    assert memory.lookup("i can go to the store today!", "en_to_zh", "balanced") is None
+
+
+def test_fuzzy_rejects_opposite_meaning():
+    memory = memory_with([("I can go to the store today", "我今天可以去商店"), ("He is not here", "他不在这里")],
+                         fuzzy_threshold=0.5)
+    assert memory.lookup("I can not go to the store today", "en_to_zh", "balanced") is None
+    assert memory.lookup("I cant go to the store today", "en_to_zh", "balanced") is None
+    assert memory.lookup("She is not here", "en_to_zh", "balanced") is None
+
+
+def test_fuzzy_accepts_case_and_punctuation_only():
+    memory = memory_with([("I can go to the store today", "我今天可以去商店")], fuzzy_threshold=0.5)
+    translation, fuzzy = memory.match("i can go to the store, today!", "en_to_zh", "balanced")
+    assert translation == "我今天可以去商店"
+    assert fuzzy
+    assert memory.match("I can go to the store today", "en_to_zh", "balanced") == ("我今天可以去商店", False)
+
+
+def test_translate_records_misses():
+    memory = TranslationMemory(":memory:")
+    calls = []
+    translate = lambda text: calls.append(text) or f"译:{text}"
+    assert memory.translate("Good morning", "en_to_zh", None, translate) == ("译:Good morning", False)
+    assert memory.translate("Good morning", "en_to_zh", None, translate) == ("译:Good morning", False)
+    assert calls == ["Good morning"]
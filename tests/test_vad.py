@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""UtteranceSegmenter 的分句、前导音频和静音保持（hangover）"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from vad import UtteranceSegmenter
+
+RATE = 16000
+FRAME = 480  # 30ms
+PRE_ROLL_FRAMES = 6  # 0.2秒
+HANGOVER_FRAMES = 16  # 0.5秒
+
+
+def silence(frames, seed=0):
+    return (np.random.default_rng(seed).standard_normal(frames * FRAME) * 1e-4).astype(np.float32)
+
+
+def tone(frames):
+    t = np.arange(frames * FRAME) / RATE
+    return (0.5 * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def segment(*parts, block=FRAME * 5, **kwargs):
+    """按 block 个样本一块送入分句器，返回结束的片段和分句器"""
+    segmenter = UtteranceSegmenter(RATE, **kwargs)
+    audio = np.concatenate(parts)
+    utterances = []
+    for start in range(0, len(audio), block):
+        utterances.extend(segmenter.feed(audio[start:start + block]))
+    return utterances, segmenter
+
+
+def test_utterance_ends_after_hangover():
+    utterances, segmenter = segment(silence(20), tone(30), silence(30))
+    assert len(utterances) == 1
+    utterance = utterances[0]
+    assert utterance.start_sample == (20 - PRE_ROLL_FRAMES) * FRAME
+    assert len(utterance.audio) == (PRE_ROLL_FRAMES + 30 + HANGOVER_FRAMES) * FRAME
+    assert not segmenter.in_speech
+
+
+def test_pause_shorter_than_hangover_keeps_one_utterance():
+    utterances, _ = segment(silence(20), tone(20), silence(HANGOVER_FRAMES - 4, seed=1), tone(20), silence(30))
+    assert len(utterances) == 1
+    assert len(utterances[0].audio) == (PRE_ROLL_FRAMES + 20 + HANGOVER_FRAMES - 4 + 20 + HANGOVER_FRAMES) * FRAME
+
+
+def test_pause_longer_than_hangover_splits():
+    utterances, _ = segment(silence(20), tone(20), silence(30, seed=1), tone(20), silence(30, seed=2))
+    assert len(utterances) == 2
+    assert utterances[1].start_sample == (20 + 20 + 30 - PRE_ROLL_FRAMES) * FRAME
+
+
+def test_short_noise_is_dropped():
+    utterances, _ = segment(silence(20), tone(5), silence(30))
+    assert utterances == []
+
+
+def test_max_utterance_forces_split_and_flush_returns_rest():
+    utterances, segmenter = segment(silence(20), tone(120), max_utterance=1.5)
+    assert len(utterances) >= 2
+    assert all(len(utterance.audio) <= 1.5 * RATE + FRAME * (PRE_ROLL_FRAMES + 1) for utterance in utterances)
+    # 强制切分时说话仍在继续，片段首尾相接
+    assert utterances[1].start_sample == utterances[0].start_sample + len(utterances[0].audio)
+    assert segmenter.in_speech
+    rest = segmenter.flush()
+    assert rest is not None
+    assert rest.start_sample + len(rest.audio) == (20 + 120) * FRAME
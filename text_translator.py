@@ -10,9 +10,11 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import threading
 import time
+from translation_cache import TranslationCache
+from translator_registry import TranslatorRegistry
+from argos_packages import ensure_local_packages, start_download
 try:
     import argostranslate.package
-    import argostranslate.translate
     ARGOS_AVAILABLE = True
 except ImportError:
     ARGOS_AVAILABLE = False
@@ -29,6 +31,8 @@ class TextTranslator:
         
         # 初始化离线翻译
         self.translation_ready = False
+        self.translation_cache = TranslationCache()  # 重复的输入直接返回缓存的译文
+        self.translators = TranslatorRegistry()  # 初始化后解析并预热两个翻译方向
         
         self.setup_ui()
         self.initialize_offline_translation()
@@ -119,44 +123,39 @@ class TextTranslator:
             
         try:
             print("正在初始化离线翻译模型...")
-            # 更新包索引
-            argostranslate.package.update_package_index()
-            available_packages = argostranslate.package.get_available_packages()
-            
-            # 检查并安装中英翻译包
-            zh_to_en_installed = False
-            en_to_zh_installed = False
-            
-            installed_packages = argostranslate.package.get_installed_packages()
-            for package in installed_packages:
-                if package.from_code == "zh" and package.to_code == "en":
-                    zh_to_en_installed = True
-                elif package.from_code == "en" and package.to_code == "zh":
-                    en_to_zh_installed = True
-            
-            # 安装缺失的翻译包
-            for package in available_packages:
-                if package.from_code == "zh" and package.to_code == "en" and not zh_to_en_installed:
-                    print("正在下载中文到英文翻译模型...")
-                    argostranslate.package.install_from_path(package.download())
-                    zh_to_en_installed = True
-                elif package.from_code == "en" and package.to_code == "zh" and not en_to_zh_installed:
-                    print("正在下载英文到中文翻译模型...")
-                    argostranslate.package.install_from_path(package.download())
-                    en_to_zh_installed = True
-            
-            self.translation_ready = zh_to_en_installed and en_to_zh_installed
-            if self.translation_ready:
-                print("离线翻译模型初始化完成")
-            else:
-                print("警告: 部分翻译模型未能安装")
-                messagebox.showwarning("警告", "部分翻译模型未能安装，翻译功能可能受限")
+            # 先查本地清单、已安装的翻译包和本地 .argosmodel 目录（ARGOS_PACKAGE_DIR），不访问网络
+            missing = ensure_local_packages()
+            if missing:
+                print(f"缺少翻译包 {missing}，正在后台下载...")
+                self.status_var.set("正在后台下载翻译模型...")
+                start_download(self._on_models_downloaded)
+                return
+            self.translators.load()
+            self.translation_ready = self.translators.ready
+            print("离线翻译模型初始化完成")
                 
         except Exception as e:
             print(f"离线翻译初始化失败: {e}")
             self.translation_ready = False
             messagebox.showerror("错误", f"离线翻译初始化失败: {e}")
     
+    def _on_models_downloaded(self, missing, error):
+        """后台下载翻译包结束（在下载线程中调用）"""
+        try:
+            if error is not None:
+                raise error
+            if missing:
+                raise Exception(f"缺少翻译包 {missing}")
+            self.translators.load()
+            self.translation_ready = self.translators.ready
+            print("离线翻译模型初始化完成")
+            self.root.after(0, lambda: self.status_var.set("就绪"))
+        except Exception as e:
+            error_msg = f"翻译模型下载失败: {e}"
+            print(error_msg)
+            self.root.after(0, lambda: self.status_var.set(error_msg))
+            self.root.after(0, lambda: messagebox.showwarning("警告", f"{error_msg}，翻译功能可能受限"))
+    
     def _translate_worker(self, text):
         """翻译工作线程"""
         try:
@@ -165,17 +164,14 @@ class TextTranslator:
             if not self.translation_ready:
                 raise Exception("离线翻译模型未就绪，请检查argostranslate安装")
             
-            # 根据翻译模式选择翻译方向
-            if self.translation_mode.get() == "zh_to_en":
-                # 中文转英文
-                translated = argostranslate.translate.translate(text, "zh", "en")
-            else:
-                # 英文转中文
-                translated = argostranslate.translate.translate(text, "en", "zh")
+            # 翻译模式即翻译方向（zh_to_en 或 en_to_zh）
+            mode = self.translation_mode.get()
+            translated = self.translation_cache.translate(
+                text, mode, None, lambda source: self.translators.translate(source, mode))
             
             # 更新输出文本区域
             self.root.after(0, self._update_output, translated)
-            self.root.after(0, lambda: self.status_var.set("翻译完成"))
+            self.root.after(0, lambda: self.status_var.set(f"翻译完成 | {self.translation_cache.summary()}"))
             
         except Exception as e:
             error_msg = f"翻译失败: {str(e)}"
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+翻译结果缓存
+实时语音和字幕里重复很多：问候语、人名、口头禅以及重叠窗口带来的重复句子，
+而每次调用 argostranslate.translate.translate 都要完整运行一遍翻译模型。
+这里按 (规范化后的原文, 翻译方向, 质量模式) 缓存译文，超出容量时淘汰最久未使用的条目，
+并统计命中/未命中次数。音频翻译线程和文本翻译线程可以共用同一个缓存。
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+TRANSLATION_CACHE_SIZE = 1024  # 默认缓存条目数
+
+
+def normalize_text(text):
+    """缓存键使用的原文：去掉首尾空白、合并连续空白（大小写和标点会影响译文，保持不变）"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class TranslationCache:
+    """线程安全的LRU翻译缓存
+
+    translate(text, direction, quality, translate_fn) 命中时直接返回缓存的译文，
+    否则调用 translate_fn(text) 并缓存结果；translate_fn 抛出异常时不缓存。
+    """
+
+    def __init__(self, maxsize=TRANSLATION_CACHE_SIZE):
+        """maxsize: 最多缓存的条目数，0表示不缓存（只统计未命中次数）"""
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, text, direction, quality=None):
+        """缓存的译文，未命中时返回None"""
+        key = (normalize_text(text), direction, quality)
+        with self._lock:
+            translation = self._entries.get(key)
+            if translation is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return translation
+
+    def put(self, text, direction, quality, translation):
+        if self.maxsize <= 0:
+            return
+        key = (normalize_text(text), direction, quality)
+        with self._lock:
+            self._entries[key] = translation
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def translate(self, text, direction, quality, translate_fn):
+        """带缓存的翻译；翻译在锁外进行，不同线程可以同时翻译不同的文本"""
+        translation = self.get(text, direction, quality)
+        if translation is None:
+            translation = translate_fn(text)
+            self.put(text, direction, quality, translation)
+        return translation
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """计数快照"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def summary(self):
+        """一行统计，用于状态栏和控制台"""
+        stats = self.stats()
+        return (f"翻译缓存命中 {stats['hits']}/{stats['hits'] + stats['misses']} ({stats['hit_rate']:.0%})，"
+                f"{stats['size']}/{stats['maxsize']} 条")
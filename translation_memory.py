@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化翻译记忆
+系列节目每期都会重复同样的台词，进程内的翻译缓存重启后就没有了。
+这里把译文保存在SQLite数据库中：
+- 精确匹配：按 (翻译方向, 质量模式, 规范化原文) 的哈希直接查找
+- 宽松匹配（默认关闭）：原文按字符n-gram建立倒排索引，取共享n-gram最多的候选，
+  只有去掉大小写、标点和多余空白后与查询完全相同的候选才复用其译文。
+  不按相似度复用：字符n-gram相似度很高的句子意思可能相反（"I can go" 与 "I can not go"）
+- 批量写入：新译文先放在内存里（精确匹配立即可见），攒够一批或超过间隔后在一个事务中写入
+在调用 argostranslate 之前查询，重复的内容不再运行翻译模型。
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from translation_cache import normalize_text
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".realtime_translator", "translation_memory.db")
+NGRAM = 3
+MAX_QUERY_GRAMS = 256  # 模糊查询最多使用的n-gram数（SQLite单条语句的参数个数有限）
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    hash TEXT UNIQUE NOT NULL,
+    scope TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    grams INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ngrams (
+    scope TEXT NOT NULL,
+    gram TEXT NOT NULL,
+    entry_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ngrams_lookup ON ngrams (scope, gram);
+"""
+
+
+def ngrams(text, n=NGRAM):
+    """小写文本首尾补空格后的字符n-gram集合，中英文通用"""
+    text = f" {text.lower()} "
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def loose_text(text):
+    """宽松匹配用的原文：小写、去掉标点、合并连续空白"""
+    text = "".join(ch for ch in text.lower() if not unicodedata.category(ch).startswith("P"))
+    return " ".join(text.split())
+
+
+class TranslationMemory:
+    """SQLite翻译记忆，可被多个线程共用
+
+    translate(text, direction, quality, translate_fn) 命中时返回记忆中的译文，
+    否则调用 translate_fn(text) 并记录结果；同时返回是否为宽松匹配，宽松匹配的译文不应再放入 TranslationCache。
+    """
+
+    def __init__(self, path=DEFAULT_PATH, fuzzy_threshold=None, batch_size=32, flush_interval=5.0):
+        """
+        path: 数据库文件路径，":memory:" 表示只在内存中
+        fuzzy_threshold: 开启宽松匹配时候选的最低n-gram Dice相似度（0~1），
+            候选还必须在去掉大小写、标点和多余空白后与原文相同；None（默认）表示只做精确匹配
+        batch_size/flush_interval: 待写入条目达到该数量或距上次写入超过该秒数时写入数据库
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.fuzzy_threshold = fuzzy_threshold
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._pending = {}  # 哈希 -> (scope, 原文, 译文)，尚未写入数据库
+        self._last_flush = time.monotonic()
+
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope(direction, quality):
+        return f"{direction}/{quality or ''}"
+
+    def _hash(self, scope, source):
+        return hashlib.sha1(f"{scope}\x1f{source}".encode("utf-8")).hexdigest()
+
+    def lookup(self, text, direction, quality=None):
+        """记忆中的译文，先精确匹配再宽松匹配，都没有时返回None"""
+        return self.match(text, direction, quality)[0]
+
+    def match(self, text, direction, quality=None):
+        """返回 (译文, 是否为宽松匹配)，未命中时译文为None"""
+        source = normalize_text(text)
+        scope = self._scope(direction, quality)
+        key = self._hash(scope, source)
+        with self._lock:
+            if key in self._pending:
+                self.exact_hits += 1
+                return self._pending[key][2], False
+            row = self._db.execute("SELECT target FROM entries WHERE hash = ?", (key,)).fetchone()
+            if row is not None:
+                self.exact_hits += 1
+                return row[0], False
+            translation = self._fuzzy_lookup(source, scope) if self.fuzzy_threshold is not None else None
+            if translation is None:
+                self.misses += 1
+                return None, False
+            self.fuzzy_hits += 1
+            return translation, True
+
+    def _fuzzy_lookup(self, source, scope):
+        query = sorted(ngrams(source))[:MAX_QUERY_GRAMS]
+        placeholders = ",".join("?" * len(query))
+        rows = self._db.execute(
+            f"SELECT e.source, e.target, e.grams, COUNT(*) AS shared FROM ngrams n "
+            f"JOIN entries e ON e.id = n.entry_id "
+            f"WHERE n.scope = ? AND n.gram IN ({placeholders}) "
+            f"GROUP BY n.entry_id ORDER BY shared DESC LIMIT 10",
+            (scope, *query)).fetchall()
+        loose = loose_text(source)
+        for candidate, target, grams, shared in rows:
+            score = 2 * shared / (len(query) + grams)
+            if score >= self.fuzzy_threshold and loose_text(candidate) == loose:
+                return target
+        return None
+
+    def add(self, text, direction, quality, translation):
+        """记录一条译文，达到批量大小或写入间隔时写入数据库"""
+        source = normalize_text(text)
+        scope = self._scope(direction, quality)
+        with self._lock:
+            self._pending[self._hash(scope, source)] = (scope, source, translation)
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def translate(self, text, direction, quality, translate_fn):
+        """先查记忆，未命中时翻译并记录，返回 (译文, 是否为宽松匹配)；translate_fn 抛出异常时不记录"""
+        translation, fuzzy = self.match(text, direction, quality)
+        if translation is None:
+            translation = translate_fn(text)
+            self.add(text, direction, quality, translation)
+        return translation, fuzzy
+
+    def flush(self):
+        """在一个事务中写入所有待写入的条目"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            now = time.time()
+            with self._db:
+                for key, (scope, source, target) in pending.items():
+                    row = self._db.execute("SELECT id FROM entries WHERE hash = ?", (key,)).fetchone()
+                    if row is not None:
+                        # 原文相同，n-gram索引不变，只更新译文
+                        self._db.execute("UPDATE entries SET target = ? WHERE id = ?", (target, row[0]))
+                        continue
+                    grams = ngrams(source)
+                    entry_id = self._db.execute(
+                        "INSERT INTO entries (hash, scope, source, target, grams, created) VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, scope, source, target, len(grams), now)).lastrowid
+                    self._db.executemany("INSERT INTO ngrams (scope, gram, entry_id) VALUES (?, ?, ?)",
+                                         [(scope, gram, entry_id) for gram in grams])
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0] + len(self._pending)
+
+    def stats(self):
+        """计数快照"""
+        with self._lock:
+            lookups = self.exact_hits + self.fuzzy_hits + self.misses
+            return {"exact_hits": self.exact_hits, "fuzzy_hits": self.fuzzy_hits, "misses": self.misses,
+                    "hit_rate": (self.exact_hits + self.fuzzy_hits) / lookups if lookups else 0.0,
+                    "pending": len(self._pending)}
+
+    def summary(self):
+        """一行统计，用于控制台"""
+        stats = self.stats()
+        return (f"翻译记忆 {len(self)} 条，精确命中 {stats['exact_hits']}，模糊命中 {stats['fuzzy_hits']}，"
+                f"未命中 {stats['misses']}")
+
+    def close(self):
+        """写入剩余条目并关闭数据库"""
+        self.flush()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Argos翻译对象注册表
+argostranslate.translate.translate(text, from_code, to_code) 每次调用都要重新遍历已安装的语言、
+构建翻译链。这里在离线翻译初始化完成后一次性解析各翻译方向的翻译对象并预热（加载CTranslate2模型），
+之后 translate(text, direction) 直接调用已解析的对象，不再有逐次查找的开销。
+"""
+
+import threading
+
+# 翻译方向 -> (源语言, 目标语言)
+DIRECTIONS = {"en_to_zh": ("en", "zh"), "zh_to_en": ("zh", "en")}
+WARMUP_TEXT = {"en": "Hello.", "zh": "你好。"}
+
+
+def direction_codes(direction):
+    """翻译方向的语言代码，支持 "en_to_zh" 和 "en-zh" 两种写法"""
+    if direction in DIRECTIONS:
+        return DIRECTIONS[direction]
+    from_code, _, to_code = direction.replace("_to_", "-").partition("-")
+    return from_code, to_code
+
+
+class TranslatorRegistry:
+    """按翻译方向保存已解析、已预热的argos翻译对象，可被多个线程共用"""
+
+    def __init__(self, directions=tuple(DIRECTIONS)):
+        self.directions = tuple(directions)
+        self._translations = {}  # (源语言, 目标语言) -> argos翻译对象
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return all(direction_codes(direction) in self._translations for direction in self.directions)
+
+    def load(self, warm=True):
+        """解析所有翻译方向，缺少翻译包时抛出 LookupError
+
+        warm: 每个方向先翻译一句短文本，使CTranslate2模型在第一次真正翻译之前就加载好
+        """
+        import argostranslate.translate
+
+        with self._lock:
+            languages = {language.code: language for language in argostranslate.translate.get_installed_languages()}
+            translations = {}
+            for direction in self.directions:
+                from_code, to_code = direction_codes(direction)
+                translation = None
+                if from_code in languages and to_code in languages:
+                    translation = languages[from_code].get_translation(languages[to_code])
+                if translation is None:
+                    raise LookupError(f"未安装 {from_code}->{to_code} 翻译包")
+                if warm:
+                    translation.translate(WARMUP_TEXT.get(from_code, "Hello."))
+                translations[(from_code, to_code)] = translation
+            self._translations = translations
+        return self
+
+    def translation(self, direction):
+        """翻译方向的argos翻译对象，未加载时抛出 KeyError"""
+        codes = direction_codes(direction)
+        try:
+            return self._translations[codes]
+        except KeyError:
+            raise KeyError(f"翻译方向 {direction} 未加载") from None
+
+    def translate(self, text, direction):
+        return self.translation(direction).translate(text)
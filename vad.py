@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音活动检测与分句
+基于短时能量和过零率的纯CPU端点检测，在说话停顿处切出长度可变的语音片段，
+静音不会再送入Whisper
+"""
+
+from collections import deque, namedtuple
+import numpy as np
+
+# start_sample: 片段第一个样本在输入流中的位置（样本时钟）
+Utterance = namedtuple("Utterance", ["start_sample", "audio"])
+
+
+class EnergyVAD:
+    """能量 + 过零率的帧级语音检测
+
+    噪声基底随非语音帧自适应更新，能量高出基底 threshold_db 判为语音；
+    能量略低但过零率处于清辅音范围的帧也判为语音，避免切掉 s/sh/f 等音。
+    过零率过高的帧视为宽带噪声。
+    """
+
+    def __init__(self, threshold_db=10.0, min_energy_db=-55.0,
+                 fricative_zcr=0.15, noise_zcr=0.5, floor_adapt=0.05):
+        self.threshold_db = threshold_db
+        self.min_energy_db = min_energy_db
+        self.fricative_zcr = fricative_zcr
+        self.noise_zcr = noise_zcr
+        self.floor_adapt = floor_adapt
+        self.noise_floor_db = None
+
+    def reset(self):
+        self.noise_floor_db = None
+
+    def is_speech(self, frames):
+        """frames: (n_frames, frame_len) 数组，返回每帧是否为语音的布尔数组"""
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        decisions = np.zeros(len(frames), dtype=bool)
+        for i, (e, z) in enumerate(zip(energy_db, zcr)):
+            if self.noise_floor_db is None:
+                self.noise_floor_db = e
+            floor = max(self.noise_floor_db, self.min_energy_db)
+            voiced = e > floor + self.threshold_db and z < self.noise_zcr
+            fricative = (e > floor + self.threshold_db / 2
+                         and self.fricative_zcr < z < self.noise_zcr)
+            decisions[i] = voiced or fricative
+
+            # 噪声基底：遇到更安静的帧立即下调，非语音帧缓慢跟踪
+            if e < self.noise_floor_db:
+                self.noise_floor_db = e
+            elif not decisions[i]:
+                self.noise_floor_db += self.floor_adapt * (e - self.noise_floor_db)
+        return decisions
+
+
+class UtteranceSegmenter:
+    """把连续音频流切分成语音片段
+
+    - 检测到语音后开始累积，连续静音超过 hangover 秒时结束当前片段
+    - 片段长度达到 max_utterance 秒时强制切分
+    - 片段开头保留 pre_roll 秒的前导音频，避免切掉首个音节
+    - 有效语音少于 min_speech 秒的片段视为噪声丢弃
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=30, max_utterance=15.0,
+                 hangover=0.5, min_speech=0.3, pre_roll=0.2, vad=None):
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.max_samples = int(sample_rate * max_utterance)
+        self.hangover_frames = max(1, int(hangover * 1000 / frame_ms))
+        self.min_speech_frames = max(1, int(min_speech * 1000 / frame_ms))
+        self.vad = vad or EnergyVAD()
+
+        self._pre_roll = deque(maxlen=max(0, int(pre_roll * 1000 / frame_ms)))
+        self._utterance = np.empty(self.max_samples + self.frame_len * (self._pre_roll.maxlen + 1),
+                                   dtype=np.float32)
+        self._pending = np.empty(0, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        """丢弃未完成的片段并重置样本时钟"""
+        self.vad.reset()
+        self._pre_roll.clear()
+        self._pending = np.empty(0, dtype=np.float32)
+        self._clock = 0
+        self._length = 0
+        self._start_sample = 0
+        self._in_speech = False
+        self._speech_frames = 0
+        self._silence_frames = 0
+
+    @property
+    def in_speech(self):
+        return self._in_speech
+
+    @property
+    def current_start(self):
+        """正在累积的语句在样本时钟上的起点"""
+        return self._start_sample
+
+    @property
+    def current_audio(self):
+        """正在累积、尚未结束的语句音频视图（不拷贝），下一次 feed 后可能改变"""
+        return self._utterance[:self._length]
+
+    def feed(self, audio):
+        """输入一段音频，返回其中已经结束的语音片段列表"""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if len(self._pending):
+            audio = np.concatenate([self._pending, audio])
+        n_frames = len(audio) // self.frame_len
+        self._pending = audio[n_frames * self.frame_len:].copy()
+        if n_frames == 0:
+            return []
+
+        frames = audio[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        decisions = self.vad.is_speech(frames)
+
+        utterances = []
+        for frame, speech in zip(frames, decisions):
+            utterance = self._process_frame(frame, speech)
+            if utterance is not None:
+                utterances.append(utterance)
+            self._clock += self.frame_len
+        return utterances
+
+    def flush(self):
+        """结束当前片段（例如停止录音时），返回片段或None"""
+        if not self._in_speech:
+            return None
+        return self._finish()
+
+    def _process_frame(self, frame, speech):
+        if not self._in_speech:
+            if not speech:
+                self._pre_roll.append(frame.copy())
+                return None
+            # 语音开始：先写入前导音频
+            self._in_speech = True
+            self._start_sample = self._clock - len(self._pre_roll) * self.frame_len
+            for previous in self._pre_roll:
+                self._write(previous)
+            self._pre_roll.clear()
+
+        self._write(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silence_frames = 0
+        else:
+            self._silence_frames += 1
+
+        if self._silence_frames >= self.hangover_frames:
+            return self._finish()
+        if self._length >= self.max_samples:
+            # 强制切分时说话仍在继续，下一个片段直接从语音状态开始
+            return self._finish(continuing=self._silence_frames == 0)
+        return None
+
+    def _write(self, frame):
+        self._utterance[self._length:self._length + len(frame)] = frame
+        self._length += len(frame)
+
+    def _finish(self, continuing=False):
+        utterance = None
+        if self._speech_frames >= self.min_speech_frames:
+            utterance = Utterance(self._start_sample, self._utterance[:self._length].copy())
+        self._length = 0
+        self._speech_frames = 0
+        self._silence_frames = 0
+        self._in_speech = continuing
+        self._start_sample = self._clock + self.frame_len
+        return utterance
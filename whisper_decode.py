@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+短音频Whisper解码
+whisper.transcribe 会把每段音频补零到30秒再送入编码器，5~6秒的片段编码器要多做约5倍的计算。
+这里只对真实音频长度（加少量余量）计算梅尔谱，编码时截取对应长度的位置编码，
+再用编码结果直接解码。音频超过30秒或关闭 trim_encoder 时回退到原始的 model.transcribe，
+便于对比两种路径的准确率和延迟。
+CPU上可以对线性层做动态int8量化，small更快、medium也能接近实时。
+"""
+
+import time
+import numpy as np
+import torch
+import torch.nn.functional as F
+import whisper
+from whisper.audio import HOP_LENGTH, N_FFT, N_FRAMES, N_SAMPLES, SAMPLE_RATE, mel_filters
+from whisper.decoding import DecodingOptions, DecodingTask
+from whisper.model import ModelDimensions, Whisper
+from whisper.tokenizer import get_tokenizer
+
+TRIM_MARGIN = 1.0  # 秒，编码时在真实音频之后保留的静音余量
+TIME_PRECISION = HOP_LENGTH * 2 / SAMPLE_RATE  # 每个时间戳token代表的秒数
+DEFAULT_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+
+
+def _use_plain_linear(module):
+    """把whisper自定义的Linear子类换回nn.Linear，quantize_dynamic只按精确类型匹配
+
+    whisper.model.Linear 只是在前向时把权重转换为输入的数据类型，fp32下与nn.Linear等价
+    """
+    for child in module.modules():
+        if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+            child.__class__ = torch.nn.Linear
+    return module
+
+
+def quantize_int8(model):
+    """对所有线性层做动态int8量化（权重int8，激活在运行时量化），只适用于CPU推理
+
+    注意力和MLP的线性层占编码器和解码器的绝大部分计算量，卷积、LayerNorm和词嵌入保持fp32
+    """
+    if model.device.type != "cpu":
+        raise ValueError("int8动态量化只支持CPU模型")
+    model.eval()
+    return torch.quantization.quantize_dynamic(_use_plain_linear(model), {torch.nn.Linear},
+                                               dtype=torch.qint8, inplace=True)
+
+
+def save_quantized(model, path):
+    """保存int8量化后的模型，之后可用 load_model 直接加载，无需再次量化"""
+    torch.save({"dims": model.dims.__dict__, "int8": True, "model_state_dict": model.state_dict()}, path)
+
+
+def load_model(name, device="cpu", int8=False):
+    """加载Whisper模型
+
+    name 可以是模型大小（tiny/base/small/medium/large）、whisper检查点路径
+    或 save_quantized 保存的int8检查点；int8=True 且在CPU上时加载后做动态量化
+    """
+    if str(name).endswith(".pt"):
+        checkpoint = torch.load(name, map_location="cpu", weights_only=False)
+        if checkpoint.get("int8"):
+            if device != "cpu":
+                raise ValueError("int8量化检查点只能在CPU上运行")
+            model = quantize_int8(Whisper(ModelDimensions(**checkpoint["dims"])))
+            model.load_state_dict(checkpoint["model_state_dict"])
+            return model
+
+    model = whisper.load_model(name, device=device)
+    if int8:
+        if device == "cpu":
+            model = quantize_int8(model)
+        else:
+            print("int8量化只用于CPU推理，GPU上保持原精度")
+    return model
+
+
+class FeatureDecodingTask(DecodingTask):
+    """直接使用已计算好的编码器输出进行解码的 DecodingTask
+
+    原版 DecodingTask 只有在输入形状恰好为 (n_audio_ctx, n_audio_state) 时才跳过编码器，
+    截短后的编码结果长度不同，需要在这里显式提供。
+    """
+
+    def __init__(self, model, options, audio_features):
+        super().__init__(model, options)
+        self.audio_features = audio_features
+
+    def _get_audio_features(self, mel):
+        return self.audio_features
+
+
+def log_mel(model, audio, margin=TRIM_MARGIN):
+    """计算真实长度（加余量）的梅尔谱，帧数补齐为偶数以匹配编码器的步长2卷积
+
+    返回 shape = (n_mels, n_frames) 的张量；超过30秒时返回None
+    """
+    if not torch.is_tensor(audio):
+        audio = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+    padding = int(margin * SAMPLE_RATE)
+    padding += -(len(audio) + padding) % (HOP_LENGTH * 2)
+    if len(audio) + padding > N_SAMPLES:
+        return None
+    return whisper.log_mel_spectrogram(audio, model.dims.n_mels, padding=padding, device=model.device)
+
+
+class IncrementalLogMel:
+    """增量梅尔谱计算，用于互相重叠的转录窗口
+
+    持续输入采集到的音频，只为新增样本计算STFT帧并缓存未归一化的log10梅尔帧；
+    取窗口时拼接缓存帧，再做与 whisper.log_mel_spectrogram 相同的动态范围截断和缩放
+    （该步骤依赖整个窗口的最大值，只能在取窗口时完成，计算量与帧数成正比且很小）。
+
+    帧k的中心位于第 k*HOP_LENGTH 个样本，需要其后 N_FFT/2 个样本才能算出；
+    尚缺后续样本的末尾帧在取窗口时临时按补零计算，与对窗口音频补零后整体计算的结果一致。
+    流开头与whisper一样做反射补齐；窗口开头的帧使用前面真实的音频而不是反射补齐。
+    """
+
+    def __init__(self, n_mels=80, history=30.0):
+        """history: 缓存的梅尔帧覆盖的时长（秒），应不小于转录窗口长度"""
+        self.n_mels = n_mels
+        self.capacity = int(history * SAMPLE_RATE) // HOP_LENGTH
+        self._filters = mel_filters("cpu", n_mels)
+        self._window = torch.hann_window(N_FFT)
+        self.reset()
+
+    def reset(self):
+        self._frames = torch.empty(self.n_mels, 2 * self.capacity)  # 未归一化的log10梅尔帧
+        self._count = 0  # _frames 中的有效帧数
+        self._first_frame = 0  # _frames[:, 0] 对应的绝对帧序号
+        self._buffer = np.zeros(0, dtype=np.float32)  # 计算后续帧还需要的音频
+        self._buffer_start = 0  # _buffer[0] 对应的绝对样本序号，流开头反射补齐后为负数
+        self._padded = False
+        self.total_samples = 0
+
+    @property
+    def next_frame(self):
+        """下一个尚未缓存的帧序号"""
+        return self._first_frame + self._count
+
+    def feed(self, audio):
+        """输入新采集的音频，计算所有已经可以确定的新帧"""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if len(audio) == 0:
+            return
+        self._buffer = np.concatenate([self._buffer, audio])
+        self.total_samples += len(audio)
+
+        if not self._padded:
+            if len(self._buffer) <= N_FFT // 2:
+                return
+            # 与 torch.stft(center=True) 相同的开头反射补齐
+            self._buffer = np.concatenate([self._buffer[1:N_FFT // 2 + 1][::-1], self._buffer])
+            self._buffer_start = -(N_FFT // 2)
+            self._padded = True
+
+        last_frame = (self.total_samples - N_FFT // 2) // HOP_LENGTH
+        if last_frame >= self.next_frame:
+            self._append(self._compute(self._buffer, self.next_frame, last_frame + 1))
+            keep_from = self.next_frame * HOP_LENGTH - N_FFT // 2
+            self._buffer = self._buffer[keep_from - self._buffer_start:]
+            self._buffer_start = keep_from
+
+    def last(self, num_samples, margin=TRIM_MARGIN, device=None):
+        """最近 num_samples 个样本（加 margin 秒补零）的归一化梅尔谱
+
+        返回值与 log_mel(model, 最近的音频, margin) 形状相同；
+        窗口超出缓存范围或超过30秒时返回None，由调用方直接从音频计算
+        """
+        padding = int(margin * SAMPLE_RATE)
+        padding += -(num_samples + padding) % (HOP_LENGTH * 2)
+        n_frames = (num_samples + padding) // HOP_LENGTH
+        start_frame = (self.total_samples - num_samples) // HOP_LENGTH
+        end_frame = start_frame + n_frames
+        if not self._padded or n_frames > N_FRAMES or start_frame < self._first_frame:
+            return None
+
+        cached_end = min(end_frame, self.next_frame)
+        parts = [self._frames[:, start_frame - self._first_frame:cached_end - self._first_frame]]
+        if end_frame > cached_end:
+            # 末尾帧缺少后续样本：按窗口之后全为零计算，不写入缓存
+            needed = (end_frame - 1) * HOP_LENGTH + N_FFT // 2 - self.total_samples
+            tail = np.concatenate([self._buffer, np.zeros(max(needed, 0), dtype=np.float32)])
+            parts.append(self._compute(tail, cached_end, end_frame))
+
+        log_spec = torch.cat(parts, dim=1)
+        log_spec = torch.maximum(log_spec, log_spec.max() - 8.0)
+        log_spec = (log_spec + 4.0) / 4.0
+        return log_spec.to(device) if device is not None else log_spec
+
+    def _compute(self, buffer, first, end):
+        """计算帧 [first, end) 的未归一化log10梅尔谱"""
+        offset = first * HOP_LENGTH - N_FFT // 2 - self._buffer_start
+        length = (end - first - 1) * HOP_LENGTH + N_FFT
+        samples = torch.from_numpy(np.ascontiguousarray(buffer[offset:offset + length]))
+        stft = torch.stft(samples, N_FFT, HOP_LENGTH, window=self._window, center=False, return_complex=True)
+        mel_spec = self._filters @ (stft.abs() ** 2)
+        return torch.clamp(mel_spec, min=1e-10).log10()
+
+    def _append(self, frames):
+        n = frames.shape[1]
+        if n >= self.capacity:
+            self._first_frame = self.next_frame + n - self.capacity
+            self._frames[:, :self.capacity] = frames[:, -self.capacity:]
+            self._count = self.capacity
+            return
+        if self._count + n > self._frames.shape[1]:
+            # 空间用完时把最近的帧移到开头，均摊后每帧只拷贝常数次
+            keep = self.capacity - n
+            self._frames[:, :keep] = self._frames[:, self._count - keep:self._count].clone()
+            self._first_frame += self._count - keep
+            self._count = keep
+        self._frames[:, self._count:self._count + n] = frames
+        self._count += n
+
+
+@torch.no_grad()
+def encode(model, mel):
+    """可变长度的编码器前向计算，位置编码按实际帧数截取
+
+    mel: shape = (n_mels, n_frames) 或 (batch, n_mels, n_frames)，n_frames 不超过3000
+    """
+    if mel.ndim == 2:
+        mel = mel.unsqueeze(0)
+    encoder = model.encoder
+    x = F.gelu(encoder.conv1(mel))
+    x = F.gelu(encoder.conv2(x))
+    x = x.permute(0, 2, 1)
+    x = (x + encoder.positional_embedding[:x.shape[1]]).to(x.dtype)
+    for block in encoder.blocks:
+        x = block(x)
+    return encoder.ln_post(x)
+
+
+@torch.no_grad()
+def detect_language(model, audio_features, tokenizer=None, candidates=None):
+    """在已有的编码器输出上检测语言，不再重复编码
+
+    candidates: 只在这些语言代码中选择（例如 ("en", "zh")），为None时不限制
+    返回 (语言代码, 各语言概率字典)
+    """
+    tokenizer = tokenizer or get_tokenizer(model.is_multilingual, num_languages=model.num_languages)
+    if audio_features.ndim == 2:
+        audio_features = audio_features.unsqueeze(0)
+    x = torch.tensor([[tokenizer.sot]], device=audio_features.device)
+    logits = model.logits(x, audio_features[:1])[0, 0]
+
+    language_tokens = list(tokenizer.all_language_tokens)
+    probs = logits[language_tokens].float().softmax(dim=-1).cpu()
+    language_probs = {code: probs[i].item() for i, code in enumerate(tokenizer.all_language_codes)}
+    choices = [code for code in candidates if code in language_probs] if candidates else language_probs
+    return max(choices, key=language_probs.get), language_probs
+
+
+def limit_temperatures(temperatures, max_fallbacks=None):
+    """温度序列，最多保留首个温度之后的 max_fallbacks 次回退"""
+    if isinstance(temperatures, (int, float)):
+        temperatures = [temperatures]
+    temperatures = list(temperatures)
+    return temperatures if max_fallbacks is None else temperatures[:max_fallbacks + 1]
+
+
+def decode_with_fallback(model, audio_features, temperatures=DEFAULT_TEMPERATURES,
+                         compression_ratio_threshold=2.4, logprob_threshold=-1.0,
+                         no_speech_threshold=0.6, max_fallbacks=None, budget=None, greedy_task=None,
+                         **decode_options):
+    """与 whisper.transcribe 相同的温度回退策略，解码输入为编码器输出
+
+    max_fallbacks: 最多回退（重新解码）的次数，None表示用完全部温度
+    budget: 每次调用的解码时间预算（秒），按上一次解码耗时估计，下一次回退会超出预算时
+        不再回退，直接返回当前结果
+    greedy_task(model, options, audio_features): 温度为0且不做beam搜索时用来代替 FeatureDecodingTask，
+        例如投机解码（见 speculative_decoding.DraftModel.task_factory）
+    """
+    temperatures = limit_temperatures(temperatures, max_fallbacks)
+    start = time.perf_counter()
+
+    result = None
+    for index, t in enumerate(temperatures):
+        if index and budget is not None:
+            elapsed = time.perf_counter() - start
+            if elapsed + elapsed / index > budget:
+                break
+        kwargs = dict(decode_options)
+        if t > 0:
+            # disable beam_size and patience when t > 0
+            kwargs.pop("beam_size", None)
+            kwargs.pop("patience", None)
+        else:
+            # disable best_of when t == 0
+            kwargs.pop("best_of", None)
+
+        options = DecodingOptions(**kwargs, temperature=t)
+        if t == 0 and greedy_task is not None and not options.beam_size:
+            task = greedy_task(model, options, audio_features)
+        else:
+            task = FeatureDecodingTask(model, options, audio_features)
+        result = task.run(audio_features)[0]
+
+        needs_fallback = False
+        if compression_ratio_threshold is not None and result.compression_ratio > compression_ratio_threshold:
+            needs_fallback = True  # too repetitive
+        if logprob_threshold is not None and result.avg_logprob < logprob_threshold:
+            needs_fallback = True  # average log probability is too low
+        if (no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold
+                and logprob_threshold is not None and result.avg_logprob < logprob_threshold):
+            needs_fallback = False  # silence
+        if not needs_fallback:
+            break
+    return result
+
+
+def tokens_to_segments(tokenizer, tokens, duration):
+    """把带时间戳的token序列拆成 whisper.transcribe 格式的分段"""
+    segments = []
+    current = []
+    start = None
+
+    def close(end):
+        text_tokens = [token for token in current if token < tokenizer.eot]
+        text = tokenizer.decode(text_tokens)
+        if text.strip():
+            segments.append({"start": start or 0.0, "end": end, "text": text, "tokens": list(current)})
+
+    for token in tokens:
+        if token >= tokenizer.timestamp_begin:
+            timestamp = (token - tokenizer.timestamp_begin) * TIME_PRECISION
+            if current:
+                close(timestamp)
+                current = []
+                start = None
+            else:
+                start = timestamp
+        else:
+            current.append(token)
+    if current:
+        close(duration)
+    return segments
+
+
+def transcribe(model, audio, trim_encoder=True, margin=TRIM_MARGIN, mel=None, language=None,
+               initial_prompt=None, temperature=DEFAULT_TEMPERATURES,
+               compression_ratio_threshold=2.4, logprob_threshold=-1.0,
+               no_speech_threshold=0.6, max_fallbacks=None, decode_budget=None, language_candidates=None,
+               draft=None, **decode_options):
+    """model.transcribe 的替代接口，返回 {"text", "segments", "language"}
+
+    trim_encoder=True 时按真实音频长度编码；False 或音频超过30秒时调用原始的 model.transcribe
+    mel: 已经算好的该段音频的梅尔谱（例如 IncrementalLogMel.last() 的结果），为None时从音频计算
+    max_fallbacks/decode_budget: 温度回退次数上限和解码时间预算（秒），见 decode_with_fallback；
+        原始 model.transcribe 路径只能限制回退次数
+    language=None 时用已经算好的编码器输出识别语言（不额外编码），只在 language_candidates 中选择；
+        原始 model.transcribe 路径不限制候选语言
+    draft: 投机解码的草稿模型（speculative_decoding.DraftModel），温度为0的贪心解码改用投机解码，
+        输出不变；原始 model.transcribe 路径不使用
+    """
+    decode_options.setdefault("fp16", model.device.type == "cuda")
+    if model.device.type == "cpu":
+        decode_options["fp16"] = False  # 与whisper.transcribe一样，CPU上不使用fp16
+    if not trim_encoder:
+        mel = None
+    elif mel is None:
+        mel = log_mel(model, audio, margin)
+    else:
+        mel = mel.to(model.device)
+    if mel is None:
+        return model.transcribe(
+            audio, language=language, initial_prompt=initial_prompt,
+            temperature=tuple(limit_temperatures(temperature, max_fallbacks)),
+            compression_ratio_threshold=compression_ratio_threshold,
+            logprob_threshold=logprob_threshold, no_speech_threshold=no_speech_threshold,
+            **decode_options
+        )
+
+    if decode_options["fp16"]:
+        mel = mel.half()
+    audio_features = encode(model, mel)
+
+    if language is None:
+        language = detect_language(model, audio_features, candidates=language_candidates)[0] if model.is_multilingual else "en"
+    task = decode_options.pop("task", "transcribe")
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                              language=language, task=task)
+
+    result = decode_with_fallback(
+        model, audio_features, temperature, compression_ratio_threshold, logprob_threshold,
+        no_speech_threshold, max_fallbacks=max_fallbacks, budget=decode_budget,
+        greedy_task=draft.task_factory(mel) if draft is not None else None,
+        language=language, task=task, prompt=initial_prompt, **decode_options
+    )
+
+    # 与 whisper.transcribe 一样跳过被判定为静音的片段
+    if (no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold
+            and (logprob_threshold is None or result.avg_logprob < logprob_threshold)):
+        return {"text": "", "segments": [], "language": language}
+
+    duration = len(audio) / SAMPLE_RATE
+    segments = tokens_to_segments(tokenizer, result.tokens, duration)
+    for segment in segments:
+        segment.update(temperature=result.temperature, avg_logprob=result.avg_logprob,
+                       compression_ratio=result.compression_ratio, no_speech_prob=result.no_speech_prob)
+    text = "".join(segment["text"] for segment in segments) if segments else result.text
+    return {"text": text, "segments": segments, "language": language}